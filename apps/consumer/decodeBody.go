@@ -0,0 +1,46 @@
+package main
+
+import (
+	"encoding/json"
+	"reflect"
+
+	"github.com/ugorji/go/codec"
+)
+
+// Schema-less decoding into string-keyed maps so the result can go through
+// encoding/json and reuse the JSON struct tags and WeatherCode decoding.
+var (
+	msgpackHandle = &codec.MsgpackHandle{}
+	cborHandle    = &codec.CborHandle{}
+)
+
+func init() {
+	mapType := reflect.TypeOf(map[string]interface{}(nil))
+	msgpackHandle.MapType = mapType
+	msgpackHandle.RawToString = true
+	cborHandle.MapType = mapType
+}
+
+// decodeBody decodes a message body according to its AMQP content type.
+// Messages without a content type are JSON, as sent by older producers.
+func decodeBody(contentType string, body []byte, v interface{}) error {
+	var handle codec.Handle
+	switch contentType {
+	case "application/msgpack", "application/x-msgpack":
+		handle = msgpackHandle
+	case "application/cbor":
+		handle = cborHandle
+	default:
+		return json.Unmarshal(body, v)
+	}
+
+	var generic interface{}
+	if err := codec.NewDecoderBytes(body, handle).Decode(&generic); err != nil {
+		return err
+	}
+	asJSON, err := json.Marshal(generic)
+	if err != nil {
+		return err
+	}
+	return json.Unmarshal(asJSON, v)
+}
@@ -22,25 +22,25 @@ type Location struct {
 }
 
 type Current struct {
-	Time                     string  `json:"time"`
-	Temperature              float64 `json:"temperature"`
-	RelativeHumidity         float64 `json:"relativeHumidity"`
-	ApparentTemperature      float64 `json:"apparentTemperature"`
-	IsDay                    bool    `json:"isDay"`
-	Uv                       float64 `json:"uv"`
-	PrecipitationProbability int     `json:"precipitationProbability"`
-	WeatherCode              string  `json:"weatherCode"`
+	Time                     string      `json:"time"`
+	Temperature              float64     `json:"temperature"`
+	RelativeHumidity         float64     `json:"relativeHumidity"`
+	ApparentTemperature      float64     `json:"apparentTemperature"`
+	IsDay                    bool        `json:"isDay"`
+	Uv                       float64     `json:"uv"`
+	PrecipitationProbability int         `json:"precipitationProbability"`
+	WeatherCode              WeatherCode `json:"weatherCode"`
 }
 
 type Daily struct {
-	Date                     string  `json:"date"`
-	TemperatureMax           float64 `json:"temperatureMax"`
-	TemperatureMin           float64 `json:"temperatureMin"`
-	ApparentTemperatureMax   float64 `json:"apparentTemperatureMax"`
-	ApparentTemperatureMin   float64 `json:"apparentTemperatureMin"`
-	UVIndexMax               float64 `json:"uvIndexMax"`
-	PrecipitationProbability int     `json:"precipitationProbability"`
-	WeatherCode              string  `json:"weatherCode"`
+	Date                     string      `json:"date"`
+	TemperatureMax           float64     `json:"temperatureMax"`
+	TemperatureMin           float64     `json:"temperatureMin"`
+	ApparentTemperatureMax   float64     `json:"apparentTemperatureMax"`
+	ApparentTemperatureMin   float64     `json:"apparentTemperatureMin"`
+	UVIndexMax               float64     `json:"uvIndexMax"`
+	PrecipitationProbability int         `json:"precipitationProbability"`
+	WeatherCode              WeatherCode `json:"weatherCode"`
 }
 
 type WeatherInput struct {
@@ -48,6 +48,13 @@ type WeatherInput struct {
 	Current   Current  `json:"current"`
 	Daily     []Daily  `json:"daily"`
 	AIInsight string   `json:"aiInsight,omitempty"`
+
+	// Change-detection fields, only sent with PUBLISH_MODE=delta
+	Delta        bool     `json:"delta,omitempty"`
+	Seq          int      `json:"seq,omitempty"`
+	BaseSeq      int      `json:"baseSeq,omitempty"`
+	DailyChanges []Daily  `json:"dailyChanges,omitempty"`
+	DailyRemoved []string `json:"dailyRemoved,omitempty"`
 }
 
 // --- Transformed structure to send to NestJS ---
@@ -121,8 +128,14 @@ func main() {
 		fmt.Println("✅ Message received successfully!")
 
 		var input WeatherInput
-		if err := json.Unmarshal(msg.Body, &input); err != nil {
-			fmt.Println("❌ Invalid JSON:", err)
+		if err := decodeBody(msg.ContentType, msg.Body, &input); err != nil {
+			fmt.Println("❌ Invalid payload:", err)
+			continue
+		}
+
+		// Expand delta messages against the last full payload of the city
+		input, ok := resolveInput(input)
+		if !ok {
 			continue
 		}
 
@@ -0,0 +1,70 @@
+package main
+
+import "fmt"
+
+// Last full payload per city, so delta messages can be expanded again
+var lastInputs = map[string]WeatherInput{}
+
+// resolveInput returns the full payload for a message and whether it should
+// be forwarded. Full messages (keyframes) replace the stored payload of their
+// city; deltas are applied on top of it. A delta whose baseSeq does not match
+// the stored payload is dropped until the next keyframe resyncs the city.
+// The producer delivers at least once, so a delta that was already applied
+// (seq not after the stored one) is skipped without losing the base.
+func resolveInput(input WeatherInput) (WeatherInput, bool) {
+	city := input.Location.City
+	if !input.Delta {
+		lastInputs[city] = input
+		return input, true
+	}
+
+	base, ok := lastInputs[city]
+	if ok && input.Seq <= base.Seq {
+		fmt.Printf("↩️ Skipping redelivered delta %d of %s\n", input.Seq, city)
+		return input, false
+	}
+	if !ok || base.Seq != input.BaseSeq {
+		fmt.Printf("⚠️ Missing base for delta %d of %s, waiting for the next keyframe\n", input.Seq, city)
+		delete(lastInputs, city)
+		return input, false
+	}
+
+	merged := base
+	merged.Seq = input.Seq
+	merged.Current = input.Current
+	// Insights are only forwarded with the message that carries them
+	merged.AIInsight = input.AIInsight
+	merged.Daily = mergeDaily(base.Daily, input.DailyChanges, input.DailyRemoved)
+	lastInputs[city] = merged
+	return merged, true
+}
+
+// mergeDaily replaces rows by date, drops removed dates and appends new dates
+func mergeDaily(base []Daily, changes []Daily, removed []string) []Daily {
+	changed := make(map[string]Daily, len(changes))
+	for _, day := range changes {
+		changed[day.Date] = day
+	}
+	dropped := make(map[string]bool, len(removed))
+	for _, date := range removed {
+		dropped[date] = true
+	}
+
+	merged := make([]Daily, 0, len(base)+len(changes))
+	for _, day := range base {
+		if dropped[day.Date] {
+			continue
+		}
+		if update, ok := changed[day.Date]; ok {
+			day = update
+			delete(changed, day.Date)
+		}
+		merged = append(merged, day)
+	}
+	for _, day := range changes {
+		if _, ok := changed[day.Date]; ok {
+			merged = append(merged, day)
+		}
+	}
+	return merged
+}
@@ -0,0 +1,56 @@
+package main
+
+import "encoding/json"
+
+// WeatherCode holds the weather description sent by the producer.
+// It accepts either the Portuguese description or a compact integer
+// WMO code (WEATHER_CODE_FORMAT=wmo) and always marshals as text.
+type WeatherCode string
+
+const unknownWeather = "Desconhecido"
+
+// Same groups as apps/producer/src/utils/parsers.py
+var weatherCodeTable = func() [100]string {
+	var table [100]string
+	for i := range table {
+		table[i] = unknownWeather
+	}
+	groups := map[string][]int{
+		"Céu limpo":            {0},
+		"Parcialmente nublado": {1, 2},
+		"Nublado":              {3},
+		"Neblina":              {45, 48},
+		"Chuvisco":             {51, 53, 55, 56, 57},
+		"Chuva":                {61, 63, 65, 66, 67, 80, 81, 82},
+		"Neve":                 {71, 73, 75, 77, 85, 86},
+		"Tempestade":           {95, 96, 99},
+	}
+	for description, codes := range groups {
+		for _, code := range codes {
+			table[code] = description
+		}
+	}
+	return table
+}()
+
+func describeWeatherCode(code int) string {
+	if code < 0 || code >= len(weatherCodeTable) {
+		return unknownWeather
+	}
+	return weatherCodeTable[code]
+}
+
+func (w *WeatherCode) UnmarshalJSON(data []byte) error {
+	var text string
+	if err := json.Unmarshal(data, &text); err == nil {
+		*w = WeatherCode(text)
+		return nil
+	}
+
+	var code int
+	if err := json.Unmarshal(data, &code); err != nil {
+		return err
+	}
+	*w = WeatherCode(describeWeatherCode(code))
+	return nil
+}
@@ -0,0 +1,60 @@
+"""Serial vs concurrent AI insight generation against a fake OpenAI client
+
+Run from apps/producer:
+
+    python -m benchmarks.bench_ai_insights --locations 40 --latency 0.3
+"""
+import argparse
+import logging
+import time
+
+from benchmarks.fakes import FakeOpenAI, FakeWeatherAPIClient, make_locations
+from src.services.ai_service import AIService
+from src.services.weather_service import WeatherService
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--locations", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds per fake completion")
+    parser.add_argument("--slow-latency", type=float, default=8.0, help="seconds for the slow tail")
+    parser.add_argument("--slow-every", type=int, default=10, help="one slow call in N (0 disables)")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    service = WeatherService(api_client=FakeWeatherAPIClient())
+    # The AI service sees payloads through the insight profile, as on the tick path
+    payloads = [
+        payload.project(service.profiles["insight"])
+        for payload in service.get_weather_data_batch(make_locations(args.locations))
+    ]
+
+    # Previous behaviour: one blocking completion after another
+    client = FakeOpenAI(args.latency, args.slow_latency, args.slow_every)
+    ai_service = AIService(client=client)
+    started = time.perf_counter()
+    for payload in payloads:
+        ai_service.generate_insight(payload)
+    print(f"{'serial':>28}: {client.calls} calls, {time.perf_counter() - started:.2f}s")
+
+    # Batch API: concurrent under the rate limit, per-request deadlines
+    client = FakeOpenAI(args.latency, args.slow_latency, args.slow_every)
+    ai_service = AIService(client=client)
+    started = time.perf_counter()
+    insights = ai_service.generate_insights(payloads)
+    print(f"{'generate_insights':>28}: {client.calls} calls, {time.perf_counter() - started:.2f}s, "
+          f"{sum(i is not None for i in insights)} insights")
+
+    # Tick path: base payloads ready after the inline wait, slow ones follow up
+    client = FakeOpenAI(args.latency, args.slow_latency, args.slow_every)
+    service = WeatherService(api_client=FakeWeatherAPIClient())
+    service.ai_service = AIService(client=client)
+    started = time.perf_counter()
+    batch = service.get_weather_data_batch(make_locations(args.locations), include_ai_insight=True)
+    base_ready = time.perf_counter() - started
+    followups = service.collect_late_insights()
+    print(f"{'tick (base / follow-ups)':>28}: base payloads after {base_ready:.2f}s "
+          f"({sum('aiInsight' in p for p in batch)} with insight), "
+          f"{len(followups)} follow-ups after {time.perf_counter() - started:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Fetch latency of WeatherAPIClient: cold, warm disk tier, warm memory tier
+
+Runs the real client (openmeteo_requests + requests_cache) against
+FakeOpenMeteoAdapter, which serves FlatBuffers bodies after a simulated
+network latency. A warm disk hit still reads the SQLite row and parses the
+body; a warm memory hit returns the decoded responses. Ends with a
+concurrent run from several threads and prints the cache stats. Run from
+apps/producer:
+
+    python -m benchmarks.bench_api_cache --locations 50 --rounds 200
+"""
+import argparse
+import logging
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fakes import FakeOpenMeteoAdapter, make_locations
+from config.settings import API_CACHE, OPEN_METEO_URL
+from src.api.response_cache import ResponseCache
+from src.api.weather_client import WeatherAPIClient
+from src.services.weather_service import WeatherService
+
+def timed(fn, rounds):
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+def report(name, timings):
+    timings = sorted(timings)
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    print(f"  {name:<12} median {statistics.median(timings) * 1e3:8.3f} ms  p95 {p95 * 1e3:8.3f} ms")
+    return statistics.median(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--locations", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated network latency (s)")
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    locations = make_locations(args.locations)
+
+    with tempfile.TemporaryDirectory() as root:
+        client = WeatherAPIClient(cache_path=os.path.join(root, "cache"))
+        adapter = FakeOpenMeteoAdapter(latency=args.latency)
+        client.cache_session.mount(OPEN_METEO_URL, adapter)
+        params = WeatherService(api_client=client)._build_api_params(locations)
+
+        def cold():
+            client.cache_session.cache.clear()
+            client.memory_cache = ResponseCache(API_CACHE["memory_max_bytes"])
+            client.fetch_weather_batch(params)
+
+        def disk():
+            client.memory_cache = ResponseCache(API_CACHE["memory_max_bytes"])
+            client.fetch_weather_batch(params)
+
+        print(f"{args.locations} locations per request, {args.latency * 1e3:.0f} ms simulated latency")
+        cold_median = report("cold", timed(cold, max(args.rounds // 20, 3)))
+        disk_median = report("disk tier", timed(disk, args.rounds))
+        memory_median = report("memory tier", timed(lambda: client.fetch_weather_batch(params), args.rounds))
+        print(f"  memory vs disk {disk_median / memory_median:.0f}x, vs cold {cold_median / memory_median:.0f}x")
+
+        client.memory_cache = ResponseCache(API_CACHE["memory_max_bytes"])
+        calls_before = adapter.calls
+        with ThreadPoolExecutor(args.threads) as pool:
+            results = list(pool.map(lambda _: client.fetch_weather_batch(params), range(args.rounds)))
+        print(f"  {args.threads} threads x {args.rounds} fetches: {adapter.calls - calls_before} upstream call(s), "
+              f"{len({id(r) for r in results})} distinct response list(s)")
+        print(f"  cache stats: {client.cache_stats()}")
+
+if __name__ == "__main__":
+    main()
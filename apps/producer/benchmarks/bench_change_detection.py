@@ -0,0 +1,110 @@
+"""Message volume per change-detection mode over a simulated day
+
+Replays a day of 5-minute ticks for N locations through ChangeDetector and
+RabbitMQPublisher (against FakeBroker). Upstream responses only refresh
+hourly (requests_cache), and the forecast rows change on a fraction of
+those refreshes; every other tick only moves ``current.time``. Delta
+messages are expanded again the way the Go consumer does and checked
+against the full payload. Keyframes follow the wall clock, so within the
+simulation only the first message per location is one. Run from apps/producer:
+
+    python -m benchmarks.bench_change_detection --locations 50
+"""
+import argparse
+import copy
+import logging
+import random
+
+from benchmarks.fakes import FakeBroker, FakeWeatherAPIClient, make_locations
+from src.messaging.change_detector import CARRIED_FIELDS, ChangeDetector
+from src.messaging.publisher import RabbitMQPublisher
+from src.messaging.serializers import JSON
+from src.services.weather_service import WeatherService
+
+TICKS_PER_DAY = 24 * 12
+
+def simulate_day(base_payloads, forecast_update_rate, seed=0):
+    """Yield (tick, payloads) for a day of ticks"""
+    rng = random.Random(seed)
+    payloads = copy.deepcopy(base_payloads)
+    for tick in range(TICKS_PER_DAY):
+        if tick and tick % 12 == 0:
+            # Hourly cache refresh: new current conditions, sometimes a new forecast
+            for payload in payloads:
+                payload["current"]["temperature"] = round(payload["current"]["temperature"] + rng.uniform(-1, 1), 1)
+                if rng.random() < forecast_update_rate:
+                    for day in payload["daily"][-7:]:
+                        day["temperatureMax"] = round(day["temperatureMax"] + rng.uniform(-1, 1), 1)
+        for payload in payloads:
+            payload["current"]["time"] = f"tick {tick}"
+        batch = copy.deepcopy(payloads)
+        if tick % 12 == 0:
+            for payload in batch:
+                payload["aiInsight"] = "Hourly insight"
+        yield tick, batch
+
+def expand(stored, message):
+    """Mirror of the consumer's resolveInput; returns the full payload or None"""
+    city = message["location"]["city"]
+    if not message.get("delta"):
+        stored[city] = message
+        return message
+    base = stored.get(city)
+    if base is None or base.get("seq") != message["baseSeq"]:
+        return None
+    merged = {k: v for k, v in base.items() if k not in CARRIED_FIELDS}
+    merged.update({k: v for k, v in message.items() if k not in ("delta", "baseSeq", "dailyChanges", "dailyRemoved")})
+    changes = {day["date"]: day for day in message.get("dailyChanges", [])}
+    removed = set(message.get("dailyRemoved", []))
+    daily = [changes.pop(day["date"], day) for day in base["daily"] if day["date"] not in removed]
+    merged["daily"] = daily + list(changes.values())
+    stored[city] = merged
+    return merged
+
+def strip(payload):
+    return {k: v for k, v in payload.items() if k not in ("seq", "keyframe", "delta", "baseSeq")}
+
+def run_mode(mode, base_payloads, forecast_update_rate):
+    broker = FakeBroker()
+    publisher = RabbitMQPublisher(connection_factory=broker, serializer=JSON)
+    detector = ChangeDetector(mode=mode, keyframe_interval_seconds=6 * 3600)
+    stored = {}
+    mismatches = 0
+    for tick, payloads in simulate_day(base_payloads, forecast_update_rate):
+        start = len(broker.queues.get("weather", []))
+        detector.publish(publisher, payloads)
+        if mode == "delta":
+            expected = {p["location"]["city"]: p for p in payloads}
+            for body in broker.queues["weather"][start:]:
+                message = JSON.loads(body)
+                full = expand(stored, message)
+                if full is None or strip(full) != expected[message["location"]["city"]]:
+                    mismatches += 1
+    publisher.close()
+    bodies = broker.queues.get("weather", [])
+    return len(bodies), sum(len(body) for body in bodies), detector.stats(), mismatches
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--locations", type=int, default=50)
+    parser.add_argument("--forecast-update-rate", type=float, default=0.25,
+                        help="share of hourly refreshes that change the forecast rows")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    service = WeatherService(api_client=FakeWeatherAPIClient())
+    # Wire dicts, so the simulation can edit them in place
+    base_payloads = [payload.to_wire() for payload in service.get_weather_data_batch(make_locations(args.locations))]
+
+    print(f"{args.locations} locations x {TICKS_PER_DAY} ticks, forecast update rate {args.forecast_update_rate}")
+    baseline = None
+    for mode in ("full", "suppress", "delta"):
+        messages, size, stats, mismatches = run_mode(mode, base_payloads, args.forecast_update_rate)
+        baseline = baseline or size
+        check = f"  reconstruction mismatches {mismatches}" if mode == "delta" else ""
+        print(
+            f"  {mode:<9} {messages:7,} messages {size / 1e6:8.2f} MB ({size / baseline:5.1%})  {stats}{check}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Excel export: pandas/openpyxl + restyle vs single-pass xlsxwriter
+
+Run from apps/producer:
+
+    python -m benchmarks.bench_excel --rows 1000 10000 100000
+"""
+import argparse
+import logging
+import os
+import resource
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.fakes import FakeWeatherAPIClient, make_locations
+from src.services.export_service import ExportService
+from src.services.weather_service import WeatherService
+
+def build_frame(service, rows):
+    # Repeat real export rows from fake payloads until the frame has ``rows`` rows
+    payloads = WeatherService(api_client=FakeWeatherAPIClient()).get_weather_data_batch(make_locations(20))
+    base = pd.concat([service._prepare_dataframe(p) for p in payloads], ignore_index=True)
+    repeats = -(-rows // len(base))
+    return pd.concat([base] * repeats, ignore_index=True).iloc[:rows]
+
+def legacy_write(service, df, filename):
+    df.to_excel(filename, index=False, engine="openpyxl")
+    service._style_excel(filename)
+
+def single_pass_write(service, df, filename):
+    service._write_excel(df, filename)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    service = ExportService()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            df = build_frame(service, rows)
+            print(f"{rows:,} rows")
+            for name, writer in (("openpyxl + restyle", legacy_write), ("xlsxwriter single pass", single_pass_write)):
+                filename = os.path.join(tmp, f"{name.split()[0]}_{rows}.xlsx")
+                started = time.perf_counter()
+                writer(service, df, filename)
+                elapsed = time.perf_counter() - started
+                size = os.path.getsize(filename) / 1024
+                print(f"  {name:<24} {elapsed:8.2f}s  {size:9,.0f} KiB")
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"peak RSS of the whole run: {peak:,.0f} MiB")
+
+if __name__ == "__main__":
+    main()
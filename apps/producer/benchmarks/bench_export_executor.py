@@ -0,0 +1,63 @@
+"""Publish-path latency with inline exports vs the export process pool
+
+For each city count, times what the scheduler thread waits for: a fake
+publish of the batch followed by the exports, run inline (ExportService) or
+queued (ExportExecutor). Then times the drain of the executor on shutdown.
+Exports go to a temporary directory. Run from apps/producer:
+
+    python -m benchmarks.bench_export_executor --cities 10 50 200 --engine openpyxl
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+from benchmarks.fakes import FakeBroker, FakeWeatherAPIClient, make_locations
+from config.settings import EXCEL_WRITER, EXPORT_PATHS
+from src.messaging.publisher import RabbitMQPublisher
+from src.services.export_executor import ExportExecutor
+from src.services.export_service import ExportService
+from src.services.weather_service import WeatherService
+
+def publish_path(publisher, exporter, payloads):
+    started = time.perf_counter()
+    publisher.publish_many(payloads)
+    for payload in payloads:
+        exporter.export(payload)
+    return time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cities", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--engine", choices=["openpyxl", "xlsxwriter"], default="openpyxl")
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    EXCEL_WRITER["engine"] = args.engine
+    publisher = RabbitMQPublisher(connection_factory=FakeBroker())
+    service = WeatherService(api_client=FakeWeatherAPIClient())
+
+    print(f"Excel engine {args.engine}, {args.workers} export worker(s)")
+    print(f"  {'cities':>6} {'inline':>12} {'executor':>12} {'drain':>10}")
+    for cities in args.cities:
+        payloads = service.get_weather_data_batch(make_locations(cities))
+        with tempfile.TemporaryDirectory() as root:
+            for name in EXPORT_PATHS:
+                EXPORT_PATHS[name] = os.path.join(root, name)
+            inline = publish_path(publisher, ExportService("snapshot"), payloads)
+
+            executor = ExportExecutor("snapshot", workers=args.workers, max_in_flight=args.workers * 2,
+                                      dead_letter_path=os.path.join(root, "dead_letter"))
+            queued = publish_path(publisher, executor, payloads)
+            started = time.perf_counter()
+            executor.shutdown()
+            drain = time.perf_counter() - started
+            completed = executor.stats()["completed"]
+        print(f"  {cities:>6} {inline * 1e3:>9.1f} ms {queued * 1e3:>9.1f} ms {drain:>8.2f} s"
+              f"  ({completed}/{cities} exported)")
+    publisher.close()
+
+if __name__ == "__main__":
+    main()
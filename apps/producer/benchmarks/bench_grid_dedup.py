@@ -0,0 +1,56 @@
+"""Per-location fetch vs grid-cell dedup for a dense regional deployment
+
+Cities are placed ``--spacing`` degrees apart, so several of them fall in
+the same model grid cell. Compares upstream calls, locations sent to the
+API (one requests_cache entry each) and time per tick, with the grid
+disabled (exact coordinates only) and at ``--resolution``. Run from
+apps/producer:
+
+    python -m benchmarks.bench_grid_dedup --locations 400 --spacing 0.02 --latency 0.15
+"""
+import argparse
+import logging
+import time
+
+from benchmarks.fakes import FakeWeatherAPIClient, make_locations
+from src.services.location_index import LocationIndex
+from src.services.weather_service import WeatherService
+
+class CountingClient(FakeWeatherAPIClient):
+    """Fake client that also counts the locations requested"""
+
+    def __init__(self, latency=0.0):
+        super().__init__(latency=latency)
+        self.locations_requested = 0
+
+    def fetch_weather_batch(self, params, refresh=False):
+        self.locations_requested += len(str(params["latitude"]).split(","))
+        return super().fetch_weather_batch(params, refresh)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--locations", type=int, default=400)
+    parser.add_argument("--spacing", type=float, default=0.02, help="degrees between neighbouring cities")
+    parser.add_argument("--resolution", type=float, default=0.1, help="grid resolution in degrees")
+    parser.add_argument("--latency", type=float, default=0.15, help="simulated seconds per HTTP call")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    locations = make_locations(args.locations, spacing=args.spacing)
+
+    print(f"{args.locations} locations, {args.spacing} deg apart")
+    for name, resolution in (("exact coordinates", 0), (f"{args.resolution} deg grid", args.resolution)):
+        client = CountingClient(latency=args.latency)
+        service = WeatherService(api_client=client)
+        service.history = None
+        service.location_index = LocationIndex(resolution, locations)
+        started = time.perf_counter()
+        payloads = service.get_weather_data_batch(locations)
+        elapsed = time.perf_counter() - started
+        print(
+            f"  {name:<18} {len(payloads)} payloads, {client.calls} HTTP calls, "
+            f"{client.locations_requested} locations requested, {elapsed:.2f}s"
+        )
+
+if __name__ == "__main__":
+    main()
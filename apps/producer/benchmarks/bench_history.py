@@ -0,0 +1,72 @@
+"""Full PAST_DAYS window every tick vs daily history store + short windows
+
+The legacy setup requests past_days=30 of hourly and daily data on every
+tick. With the history store, the hourly series is limited to the current
+hour's neighbourhood and, once the finalized days are stored, only the last
+refresh days plus the forecast are requested. Reports values returned by
+the fake API (a proxy for response size and decode work) and time per tick,
+and checks both produce the same payloads. The fake builds its arrays at the
+same cost whatever the window, so tick times show the store's overhead but
+not the smaller download and decode. Run from apps/producer:
+
+    python -m benchmarks.bench_history --locations 200 --ticks 5
+"""
+import argparse
+import logging
+import tempfile
+import time
+
+from benchmarks.fakes import FakeWeatherAPIClient, make_locations
+from config.settings import DAILY_HISTORY, PAST_DAYS
+from src.services.history_store import DailyHistoryStore
+from src.services.weather_service import WeatherService
+
+class LegacyWindowService(WeatherService):
+    """Previous request shape: full hourly series, no history store"""
+
+    def _build_api_params(self, locations=None, past_days=PAST_DAYS):
+        params = super()._build_api_params(locations, PAST_DAYS)
+        params.pop("past_hours")
+        params.pop("forecast_hours")
+        return params
+
+def run(service, client, locations, ticks):
+    timings, values, payloads = [], [], None
+    for _ in range(ticks):
+        before = client.values_returned
+        started = time.perf_counter()
+        payloads = service.get_weather_data_batch(locations)
+        timings.append(time.perf_counter() - started)
+        values.append(client.values_returned - before)
+    return timings, values, payloads
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--locations", type=int, default=200)
+    parser.add_argument("--ticks", type=int, default=5)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    locations = make_locations(args.locations)
+
+    legacy_client = FakeWeatherAPIClient()
+    legacy = LegacyWindowService(api_client=legacy_client)
+    legacy.history = None
+    legacy_timings, legacy_values, legacy_payloads = run(legacy, legacy_client, locations, args.ticks)
+
+    with tempfile.TemporaryDirectory() as root:
+        client = FakeWeatherAPIClient()
+        service = WeatherService(api_client=client)
+        service.history = DailyHistoryStore(root, PAST_DAYS, DAILY_HISTORY["refresh_days"])
+        timings, values, payloads = run(service, client, locations, args.ticks)
+
+    same = [{**p.to_wire(), "current": None} for p in payloads] == \
+        [{**p.to_wire(), "current": None} for p in legacy_payloads]
+    print(f"{args.locations} locations, {args.ticks} ticks, past_days={PAST_DAYS}")
+    print(f"  {'legacy':<16} values/tick {legacy_values[-1]:>10,}  steady tick {legacy_timings[-1] * 1e3:8.1f} ms")
+    print(f"  {'history (cold)':<16} values/tick {values[0]:>10,}  first tick  {timings[0] * 1e3:8.1f} ms")
+    print(f"  {'history (warm)':<16} values/tick {values[-1]:>10,}  steady tick {timings[-1] * 1e3:8.1f} ms")
+    print(f"  values reduction {legacy_values[-1] / values[-1]:.1f}x, identical daily output: {same}")
+
+if __name__ == "__main__":
+    main()
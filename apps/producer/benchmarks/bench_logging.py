@@ -0,0 +1,87 @@
+"""Logging cost on the calling thread: synchronous handlers vs the queue listener
+
+Logs the records of a multi-city tick (a few per location, plus disabled
+DEBUG lines with a large params dict) and times how long the calling thread
+spends in logging calls. The previous setup formatted and wrote every record
+inline to a FileHandler and a StreamHandler; setup_logging only enqueues
+them. Console output goes to /dev/null and files to a temporary directory.
+Run from apps/producer:
+
+    python -m benchmarks.bench_logging --locations 1000 --ticks 5 --format json
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.fakes import make_locations
+from config import logging_config
+from config.settings import LOGGING
+
+def tick(logger, locations, params):
+    # Per-location lines as logged by the weather, AI and export services
+    started = time.perf_counter()
+    logger.debug("Fetching weather data with params: %s", params)
+    for location in locations:
+        fields = {"location": location["city"]}
+        logger.info("AI insight added: %s", "Leve guarda-chuva", extra=fields)
+        logger.info("Generating CSV export")
+        logger.info("CSV exported: %s", f"exports/csv/{location['city']}.csv", extra=fields)
+        logger.info("Generating Excel export")
+        logger.info("Excel exported: %s", f"exports/excel/{location['city']}.xlsx", extra=fields)
+        logger.debug("AI insight cache hit: %s", location)
+    return time.perf_counter() - started
+
+def run(name, logger, locations, params, ticks):
+    timings = [tick(logger, locations, params) for _ in range(ticks)]
+    per_tick = sum(timings) / ticks
+    records = len(locations) * 5
+    print(f"  {name:<22} {per_tick * 1e3:9.1f} ms per tick  {per_tick / records * 1e6:6.2f} µs per record")
+    return per_tick
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--locations", type=int, default=1000)
+    parser.add_argument("--ticks", type=int, default=5)
+    parser.add_argument("--format", choices=["text", "json"], default="text")
+    args = parser.parse_args()
+
+    locations = make_locations(args.locations)
+    params = {key: ",".join(str(loc[key]) for loc in locations) for key in ("latitude", "longitude", "timezone")}
+    logger = logging.getLogger("bench")
+    root = logging.getLogger()
+    devnull = open(os.devnull, "w")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        LOGGING["path"] = tmp
+        LOGGING["format"] = args.format
+        print(f"{args.locations} locations, {args.format} format, {args.ticks} ticks")
+
+        # Previous setup: format and write on the calling thread
+        root.setLevel(logging.INFO)
+        handlers = [logging.FileHandler(os.path.join(tmp, "sync.log")), logging.StreamHandler(devnull)]
+        for handler in handlers:
+            handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+            root.addHandler(handler)
+        sync = run("synchronous handlers", logger, locations, params, args.ticks)
+        for handler in handlers:
+            root.removeHandler(handler)
+            handler.close()
+
+        # Queue listener; the console handler writes to /dev/null
+        stderr, sys.stderr = sys.stderr, devnull
+        try:
+            logging_config.setup_logging()
+            queued = run("queue listener", logger, locations, params, args.ticks)
+            started = time.perf_counter()
+            logging_config.stop_logging()
+            drain = time.perf_counter() - started
+        finally:
+            sys.stderr = stderr
+        print(f"  listener drained the rest in {drain * 1e3:.1f} ms, calling thread {sync / queued:.1f}x faster")
+    devnull.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Instrumentation overhead on a full tick, and /metrics render time
+
+Runs fetch -> transform -> serialize -> publish ticks against the fakes,
+counts the metric updates made per tick and times one update, which gives
+the instrumentation cost per tick without the run-to-run noise of an A/B
+comparison. Also prints the size and render time of the /metrics page and a
+tick summary line. Run from apps/producer:
+
+    python -m benchmarks.bench_metrics --locations 200 --ticks 10
+"""
+import argparse
+import logging
+import statistics
+import time
+
+from benchmarks.fakes import FakeBroker, FakeWeatherAPIClient, make_locations
+from src.messaging.publisher import RabbitMQPublisher
+from src.services.weather_service import WeatherService
+from src.utils import metrics
+
+def run_ticks(service, publisher, locations, ticks):
+    timings = []
+    for _ in range(ticks):
+        started = time.perf_counter()
+        with metrics.tick("data"):
+            publisher.publish_many(service.get_weather_data_batch(locations))
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--locations", type=int, default=200)
+    parser.add_argument("--ticks", type=int, default=10)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    locations = make_locations(args.locations)
+    service = WeatherService(api_client=FakeWeatherAPIClient())
+    service.history = None
+    publisher = RabbitMQPublisher(connection_factory=FakeBroker())
+    run_ticks(service, publisher, locations, 2)
+    tick_seconds = run_ticks(service, publisher, locations, args.ticks)
+
+    # Count the updates made during one tick
+    calls = [0]
+    observe, inc = metrics.Histogram.observe, metrics.Counter.inc
+
+    def counting_observe(self, value, *labels):
+        calls[0] += 1
+        observe(self, value, *labels)
+
+    def counting_inc(self, *labels, amount=1):
+        calls[0] += 1
+        inc(self, *labels, amount=amount)
+
+    metrics.Histogram.observe, metrics.Counter.inc = counting_observe, counting_inc
+    run_ticks(service, publisher, locations, 1)
+    metrics.Histogram.observe, metrics.Counter.inc = observe, inc
+
+    # Cost of one timed update (two perf_counter calls + observe)
+    histogram = metrics.Summary("bench_seconds", "bench", ("stage", "location"))
+    rounds = 100000
+    started = time.perf_counter()
+    for _ in range(rounds):
+        begin = time.perf_counter()
+        histogram.observe(time.perf_counter() - begin, "transform", "Itaguai")
+    per_call = (time.perf_counter() - started) / rounds
+    overhead = calls[0] * per_call
+
+    started = time.perf_counter()
+    page = metrics.registry.render()
+    render = time.perf_counter() - started
+
+    print(f"{args.locations} locations, median tick {tick_seconds * 1e3:.1f} ms")
+    print(f"  metric updates per tick {calls[0]:>8,}")
+    print(f"  cost per timed update   {per_call * 1e6:8.2f} us")
+    print(f"  overhead per tick       {overhead * 1e3:8.2f} ms ({overhead / tick_seconds:.2%} of the tick)")
+    print(f"  /metrics page           {len(page.splitlines()):>8,} lines, {len(page) / 1024:.0f} KiB, "
+          f"rendered in {render * 1e3:.1f} ms")
+    logging.disable(logging.NOTSET)
+    logging.basicConfig(level=logging.INFO, format="  %(message)s")
+    with metrics.tick("data", summary=True):
+        publisher.publish_many(service.get_weather_data_batch(locations))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""Per-city loop vs batched multi-location fetch
+
+Run from apps/producer:
+
+    python -m benchmarks.bench_multi_location --locations 200 --latency 0.15
+"""
+import argparse
+import logging
+import time
+
+from benchmarks.fakes import FakeWeatherAPIClient, make_locations
+from src.services.weather_service import WeatherService
+
+def run_per_city(service, locations):
+    return [service.get_weather_data(location=location) for location in locations]
+
+def run_batched(service, locations):
+    return service.get_weather_data_batch(locations)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--locations", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.15, help="simulated seconds per HTTP call")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    locations = make_locations(args.locations)
+
+    for name, runner in (("per-city loop", run_per_city), ("batched", run_batched)):
+        client = FakeWeatherAPIClient(latency=args.latency)
+        service = WeatherService(api_client=client)
+        started = time.perf_counter()
+        payloads = runner(service, locations)
+        elapsed = time.perf_counter() - started
+        print(f"{name:>14}: {len(payloads)} payloads, {client.calls} HTTP calls, {elapsed:.2f}s")
+
+if __name__ == "__main__":
+    main()
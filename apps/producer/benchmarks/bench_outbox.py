@@ -0,0 +1,78 @@
+"""Tick publish latency and data loss during a broker outage: direct vs outbox
+
+Publishes one batch per tick against FakeBroker, which refuses connections
+for ``--down-ticks`` ticks in the middle of the run and otherwise fails
+``--failure-rate`` of connection attempts and publishes. The direct
+publisher blocks the tick through its reconnect backoff and loses the batch;
+the outbox appends and returns, and its drainer delivers the backlog in order
+once the broker is back. Run from apps/producer:
+
+    python -m benchmarks.bench_outbox --ticks 10 --down-ticks 2 --messages 50
+"""
+import argparse
+import json
+import logging
+import tempfile
+import time
+
+from benchmarks.fakes import FakeBroker
+from src.messaging.outbox import Outbox, OutboxPublisher
+from src.messaging.publisher import RabbitMQPublisher
+
+def run(publisher, broker, args):
+    latencies = []
+    down_from = (args.ticks - args.down_ticks) // 2
+    for tick in range(args.ticks):
+        broker.down = down_from <= tick < down_from + args.down_ticks
+        messages = [{"tick": tick, "i": i} for i in range(args.messages)]
+        started = time.perf_counter()
+        publisher.publish_many(messages)
+        latencies.append(time.perf_counter() - started)
+    broker.down = False
+    return latencies
+
+def delivered(broker):
+    # Distinct messages received, and whether their first deliveries are in order
+    seen = {}
+    for body in broker.queues.get("weather", []):
+        message = json.loads(body)
+        seen.setdefault((message["tick"], message["i"]), None)
+    keys = list(seen)
+    return len(keys), keys == sorted(keys)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ticks", type=int, default=10)
+    parser.add_argument("--down-ticks", type=int, default=2)
+    parser.add_argument("--messages", type=int, default=50)
+    parser.add_argument("--failure-rate", type=float, default=0.02)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    total = args.ticks * args.messages
+    print(f"{args.ticks} ticks x {args.messages} messages, broker down for {args.down_ticks} tick(s), "
+          f"{args.failure_rate:.0%} random failures")
+
+    broker = FakeBroker(failure_rate=args.failure_rate, seed=1)
+    direct = RabbitMQPublisher(connection_factory=broker)
+    latencies = run(direct, broker, args)
+    count, _ = delivered(broker)
+    print(f"  {'direct':<8} max tick {max(latencies) * 1e3:9.1f} ms  delivered {count}/{total}")
+    direct.close()
+
+    with tempfile.TemporaryDirectory() as root:
+        broker = FakeBroker(failure_rate=args.failure_rate, seed=1)
+        outbox = OutboxPublisher(RabbitMQPublisher(connection_factory=broker), Outbox(root),
+                                 retry_initial_seconds=0.05, retry_max_seconds=0.5)
+        latencies = run(outbox, broker, args)
+        started = time.perf_counter()
+        while outbox.outbox.pending() and time.perf_counter() - started < 30:
+            time.sleep(0.01)
+        catch_up = time.perf_counter() - started
+        count, in_order = delivered(broker)
+        print(f"  {'outbox':<8} max tick {max(latencies) * 1e3:9.1f} ms  delivered {count}/{total}"
+              f" (in order: {in_order}, backlog drained {catch_up:.2f}s after the last tick)")
+        outbox.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Memory per location and transform time: payload dicts vs WeatherPayload
+
+Builds payloads for N locations with WeatherService from fake Open-Meteo
+responses and measures, with tracemalloc, the memory they keep alive. The
+nested dicts are the wire form (``to_wire``), i.e. what the pipeline held
+before; the location dicts are shared by both and not counted. Also times
+the transform, the wire conversion and the export columns. Run from
+apps/producer:
+
+    python -m benchmarks.bench_payload_model --locations 1000
+"""
+import argparse
+import gc
+import logging
+import time
+import tracemalloc
+
+from benchmarks.fakes import FakeWeatherAPIClient, make_locations
+from src.services.export_service import ExportService
+from src.services.weather_service import WeatherService
+
+def retained(build):
+    # Bytes still allocated after ``build`` returns, while its result is alive
+    gc.collect()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    return result, tracemalloc.get_traced_memory()[0] - before
+
+def timed(func):
+    started = time.perf_counter()
+    func()
+    return time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--locations", type=int, default=1000)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    locations = make_locations(args.locations)
+    service = WeatherService(api_client=FakeWeatherAPIClient())
+    exporter = ExportService(mode="rolling")
+    service.get_weather_data_batch(locations)  # warm up caches and imports
+
+    tracemalloc.start()
+    payloads, model_bytes = retained(lambda: service.get_weather_data_batch(locations))
+    wire, dict_bytes = retained(lambda: [payload.to_wire() for payload in payloads])
+    tracemalloc.stop()
+
+    count = len(payloads)
+    print(f"{count} locations, {len(payloads[0]['daily'])} days each")
+    print(f"  {'nested dicts':<16} {dict_bytes / count / 1024:8.1f} KiB per location")
+    print(f"  {'WeatherPayload':<16} {model_bytes / count / 1024:8.1f} KiB per location"
+          f"  ({dict_bytes / max(model_bytes, 1):.1f}x less)")
+
+    del wire
+    transform = timed(lambda: service.get_weather_data_batch(locations))
+    to_wire = timed(lambda: [payload.to_wire() for payload in payloads])
+    columns = timed(lambda: [exporter._prepare_columns(payload) for payload in payloads])
+    print(f"  batch fetch + transform  {transform / count * 1e6:8.1f} µs per location")
+    print(f"  to_wire                  {to_wire / count * 1e6:8.1f} µs per location")
+    print(f"  export columns           {columns / count * 1e6:8.1f} µs per location")
+
+if __name__ == "__main__":
+    main()
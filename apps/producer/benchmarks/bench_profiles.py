@@ -0,0 +1,73 @@
+"""Upstream response size, message size and tick CPU per output profile
+
+For each profile in OUTPUT_PROFILES the payload, export and insight profiles
+are all set to it, so the Open-Meteo query covers only that profile. The
+real WeatherAPIClient fetches from FakeOpenMeteoAdapter (FlatBuffers bodies,
+API caches cleared per round), then every payload is serialized for
+publishing. The daily history store is disabled so each query covers the
+profile's whole window. Run from apps/producer:
+
+    python -m benchmarks.bench_profiles --locations 200 --rounds 3
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+from benchmarks.fakes import FakeOpenMeteoAdapter, make_locations
+from config.settings import API_CACHE, DAILY_HISTORY, OPEN_METEO_URL, OUTPUT_PROFILES, PROFILES
+from src.api.response_cache import ResponseCache
+from src.api.weather_client import WeatherAPIClient
+from src.messaging.serializers import JSON
+from src.services.weather_service import WeatherService
+
+class CountingAdapter(FakeOpenMeteoAdapter):
+    """FakeOpenMeteoAdapter counting the response bytes it sends back"""
+
+    def __init__(self):
+        super().__init__()
+        self.bytes = 0
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        self.bytes += int(response.headers["Content-Length"])
+        return response
+
+def run(name, locations, rounds, root):
+    for use in PROFILES:
+        PROFILES[use] = name
+    client = WeatherAPIClient(cache_path=os.path.join(root, name))
+    adapter = CountingAdapter()
+    client.cache_session.mount(OPEN_METEO_URL, adapter)
+    service = WeatherService(api_client=client)
+
+    timings = []
+    for _ in range(rounds):
+        client.cache_session.cache.clear()
+        client.memory_cache = ResponseCache(API_CACHE["memory_max_bytes"])
+        started = time.process_time()
+        bodies = [JSON.dumps(payload) for payload in service.get_weather_data_batch(locations)]
+        timings.append(time.process_time() - started)
+    variables = sum(map(len, service.variables.values()))
+    return variables, adapter.bytes / rounds, sum(map(len, bodies)) / len(bodies), min(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--locations", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    DAILY_HISTORY["enabled"] = False
+    locations = make_locations(args.locations)
+
+    print(f"{args.locations} locations, best of {args.rounds} rounds")
+    print(f"  {'profile':<10} {'variables':>9} {'response KiB':>13} {'bytes/msg':>10} {'CPU per tick':>13}")
+    with tempfile.TemporaryDirectory() as root:
+        for name in OUTPUT_PROFILES:
+            variables, response, message, cpu = run(name, locations, args.rounds, root)
+            print(f"  {name:<10} {variables:>9} {response / 1024:>13,.1f} {message:>10,.0f} {cpu * 1e3:>10.1f} ms")
+
+if __name__ == "__main__":
+    main()
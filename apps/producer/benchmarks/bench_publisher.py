@@ -0,0 +1,64 @@
+"""RabbitMQ publish throughput: connect-per-message vs persistent connection
+
+Runs against FakeBroker, a local pika stand-in with simulated handshake and
+round-trip latency. Run from apps/producer:
+
+    python -m benchmarks.bench_publisher --messages 500 --handshake 0.01 --rtt 0.001
+"""
+import argparse
+import logging
+import time
+
+from benchmarks.fakes import FakeBroker
+from src.messaging.publisher import RabbitMQPublisher
+
+def legacy_publish(broker, messages, queue="weather"):
+    # Previous behaviour: new connection, queue declare and close per message
+    for message in messages:
+        connection = broker(None)
+        channel = connection.channel()
+        channel.queue_declare(queue=queue, durable=True, exclusive=False, auto_delete=False)
+        channel.basic_publish(exchange="", routing_key=queue, body=message.encode("utf-8"))
+        connection.close()
+    return len(messages)
+
+def persistent_publish(broker, messages):
+    publisher = RabbitMQPublisher(connection_factory=broker)
+    confirmed = sum(publisher.publish(message) for message in messages)
+    publisher.close()
+    return confirmed
+
+def batch_publish(broker, messages, batch_size=100):
+    publisher = RabbitMQPublisher(connection_factory=broker)
+    confirmed = 0
+    for start in range(0, len(messages), batch_size):
+        confirmed += publisher.publish_many(messages[start:start + batch_size])
+    publisher.close()
+    return confirmed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--handshake", type=float, default=0.01, help="simulated seconds per new connection")
+    parser.add_argument("--rtt", type=float, default=0.001, help="simulated seconds per round trip")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    messages = ['{"location": {"city": "City-%04d"}}' % i for i in range(args.messages)]
+
+    for name, runner in (
+        ("connect per message", legacy_publish),
+        ("persistent + confirm", persistent_publish),
+        ("publish_many", batch_publish),
+    ):
+        broker = FakeBroker(handshake_latency=args.handshake, rtt=args.rtt)
+        started = time.perf_counter()
+        confirmed = runner(broker, messages)
+        elapsed = time.perf_counter() - started
+        print(
+            f"{name:>20}: {confirmed} msgs, {broker.connections_opened} connections, "
+            f"{elapsed:.3f}s, {args.messages / elapsed:,.0f} msg/s"
+        )
+
+if __name__ == "__main__":
+    main()
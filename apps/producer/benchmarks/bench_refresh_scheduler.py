@@ -0,0 +1,79 @@
+"""Refreshes over a simulated day: fixed ticks vs the adaptive scheduler
+
+Steps a simulated clock through ``--hours`` hours. The fixed schedule
+refreshes every location every SCHEDULE data interval; the adaptive one
+refreshes each location after each model update, or sooner while it has an
+alert. Both run the real WeatherService against FakeWeatherAPIClient, and
+the report shows location refreshes, API calls and CPU time. Run from
+apps/producer:
+
+    python -m benchmarks.bench_refresh_scheduler --locations 200 --hours 24
+"""
+import argparse
+import logging
+import time
+
+from benchmarks.fakes import FakeWeatherAPIClient, make_locations
+from config.settings import SCHEDULE
+from src.pipeline.refresh_scheduler import RefreshScheduler
+from src.services.weather_service import WeatherService
+
+class SimulatedClock:
+    def __init__(self, start):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+def run_fixed(locations, seconds):
+    client = FakeWeatherAPIClient()
+    service = WeatherService(api_client=client)
+    interval = SCHEDULE["data_interval_minutes"] * 60
+    refreshes = 0
+    started = time.process_time()
+    for _ in range(0, seconds, interval):
+        refreshes += len(service.get_weather_data_batch(locations))
+    return refreshes, client.calls, time.process_time() - started
+
+def run_adaptive(locations, seconds, alert_share):
+    client = FakeWeatherAPIClient()
+    service = WeatherService(api_client=client)
+    clock = SimulatedClock(time.time())
+    end = clock.now + seconds
+    scheduler = RefreshScheduler(locations, service.location_index, clock=clock)
+    # The first ``alert_share`` of the cities report a storm on every refresh,
+    # the others steady conditions (the fake's values are random per city)
+    stormy = {location["city"] for location in locations[:int(len(locations) * alert_share)]}
+    started = time.process_time()
+    while clock.now < end:
+        due = scheduler.pop_due()
+        payloads = service.get_weather_data_batch(due) if due else []
+        for payload in payloads:
+            storm = payload["location"]["city"] in stormy
+            payload.current.weather_code = "Tempestade" if storm else "Nublado"
+            payload.current.precipitation_probability = 10
+        scheduler.complete(due, payloads)
+        clock.now += max(scheduler.seconds_until_due(), 1)
+    return scheduler.stats(), client.calls, time.process_time() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--locations", type=int, default=200)
+    parser.add_argument("--hours", type=int, default=24)
+    parser.add_argument("--alert-share", type=float, default=0.05, help="share of cities with an active alert")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    locations = make_locations(args.locations)
+    seconds = args.hours * 3600
+
+    refreshes, calls, cpu = run_fixed(locations, seconds)
+    print(f"{args.locations} locations over {args.hours} h, {args.alert_share:.0%} with alerts")
+    print(f"  {'fixed schedule':<16} {refreshes:>8,} refreshes {calls:>6,} API calls {cpu:>8.2f} s CPU")
+    stats, calls, cpu = run_adaptive(locations, seconds, args.alert_share)
+    attempted = stats["refreshes"] + stats["failed"]
+    print(f"  {'adaptive':<16} {attempted:>8,} refreshes {calls:>6,} API calls {cpu:>8.2f} s CPU"
+          f"  ({stats['fast']:,} fast, {stats['saved']:,} saved)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Payload size and serialize/parse time per wire format
+
+Compares the legacy indented JSON string (serialized by WeatherService and
+parsed again by both exports) with the serializers in
+src/messaging/serializers.py, on payloads built by WeatherService from fake
+Open-Meteo responses. Run from apps/producer:
+
+    python -m benchmarks.bench_serialization --locations 100
+"""
+import argparse
+import json
+import logging
+import timeit
+
+from benchmarks.fakes import FakeWeatherAPIClient, make_locations
+from src.messaging.serializers import get_serializer
+from src.models.weather_data import to_wire
+from src.services.weather_service import WeatherService
+
+def legacy_dumps(payload):
+    return json.dumps(payload, ensure_ascii=False, indent=2, default=to_wire).encode("utf-8")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--locations", type=int, default=100)
+    parser.add_argument("--number", type=int, default=5)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    service = WeatherService(api_client=FakeWeatherAPIClient())
+    payloads = service.get_weather_data_batch(make_locations(args.locations))
+
+    formats = [("json (indent=2, legacy)", legacy_dumps, json.loads)]
+    for name in ("json", "msgpack", "cbor"):
+        serializer = get_serializer(name)
+        if serializer.name == name:
+            formats.append((serializer.name, serializer.dumps, serializer.loads))
+        else:
+            print(f"{name}: not installed, skipped")
+
+    baseline = None
+    print(f"{len(payloads)} payloads")
+    print(f"{'format':<24} {'bytes/msg':>10} {'ratio':>6} {'dumps us':>9} {'loads us':>9}")
+    for name, dumps, loads in formats:
+        bodies = [dumps(payload) for payload in payloads]
+        size = sum(len(body) for body in bodies) / len(bodies)
+        baseline = baseline or size
+        dump_time = min(timeit.repeat(lambda: [dumps(p) for p in payloads], number=args.number, repeat=3))
+        load_time = min(timeit.repeat(lambda: [loads(b) for b in bodies], number=args.number, repeat=3))
+        per_msg = args.number * len(payloads)
+        print(
+            f"{name:<24} {size:>10,.0f} {size / baseline:>6.2f} "
+            f"{dump_time / per_msg * 1e6:>9.1f} {load_time / per_msg * 1e6:>9.1f}"
+        )
+
+    # Legacy tick: serialize once, then each export parsed the string again
+    legacy = min(timeit.repeat(
+        lambda: [json.loads(s) and json.loads(s) for s in [legacy_dumps(p) for p in payloads]],
+        number=args.number, repeat=3,
+    ))
+    current = min(timeit.repeat(
+        lambda: [get_serializer("json").dumps(p) for p in payloads],
+        number=args.number, repeat=3,
+    ))
+    print(f"per-tick pipeline CPU: legacy {legacy / args.number * 1e3:.1f} ms -> in-memory pipeline {current / args.number * 1e3:.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Tick throughput with 1..N shards, plus partition balance and movement
+
+Each shard process builds its ShardAssignment from the same location list
+and runs fetch, transform and serialization for its share against
+FakeWeatherAPIClient (with a simulated latency per request). The report
+shows wall time for one tick of every shard in parallel, the largest
+share, and how many locations change shard when one more shard is added.
+Run from apps/producer:
+
+    python -m benchmarks.bench_sharding --locations 2000 --shards 1 2 4 --latency 0.1
+"""
+import argparse
+import logging
+import multiprocessing
+import time
+
+from benchmarks.fakes import FakeWeatherAPIClient, make_locations
+from src.messaging.publisher import RabbitMQPublisher
+from src.pipeline.sharding import ShardAssignment
+from src.services.location_index import LocationIndex
+from src.services.weather_service import WeatherService
+
+def shard_tick(locations, index, count, latency, start):
+    # One shard's tick: its share of the locations, fetched, transformed and serialized
+    logging.disable(logging.WARNING)
+    service = WeatherService(api_client=FakeWeatherAPIClient(latency=latency))
+    share = ShardAssignment(locations, service.location_index, index, count).locations
+    publisher = RabbitMQPublisher(connection_factory=lambda parameters: None)
+    start.wait()
+    if share:
+        for payload in service.get_weather_data_batch(share):
+            publisher.encode(payload)
+
+def run(locations, count, latency):
+    context = multiprocessing.get_context("fork")
+    start = context.Event()
+    processes = [
+        context.Process(target=shard_tick, args=(locations, index, count, latency, start))
+        for index in range(count)
+    ]
+    for process in processes:
+        process.start()
+    time.sleep(1)  # let every shard finish its setup
+    started = time.perf_counter()
+    start.set()
+    for process in processes:
+        process.join()
+    return time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--locations", type=int, default=2000)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--latency", type=float, default=0.1, help="simulated seconds per API request")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    locations = make_locations(args.locations, spacing=0.15)
+    index = LocationIndex(0.1)
+
+    print(f"{args.locations} locations, {args.latency * 1e3:.0f} ms per API request")
+    print(f"  {'shards':>6} {'tick':>9} {'loc/s':>8} {'largest share':>14} {'moved to +1 shard':>18}")
+    for count in args.shards:
+        elapsed = run(locations, count, args.latency)
+        shares = [ShardAssignment(locations, index, i, count).locations for i in range(count)]
+        before = {id(loc): i for i, share in enumerate(shares) for loc in share}
+        after = {
+            id(loc): i
+            for i in range(count + 1)
+            for loc in ShardAssignment(locations, index, i, count + 1).locations
+        }
+        moved = sum(before[key] != after[key] for key in before)
+        print(f"  {count:>6} {elapsed:>7.2f} s {args.locations / elapsed:>8,.0f} "
+              f"{max(len(s) for s in shares):>14,} {moved / len(locations):>17.0%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Cold-start import cost of main.py, checked against a budget
+
+Runs ``python -X importtime -c "import main"`` in fresh interpreters, reports
+the median cumulative import time and the slowest modules, and fails (exit
+status 1) when the median exceeds the budget or when a dependency that only
+some code paths need is imported at startup. tests/test_startup.py enforces
+the same checks. Run from apps/producer:
+
+    python -m benchmarks.bench_startup --runs 5 --budget-ms 400
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+# Import time budget for `import main`, in milliseconds
+STARTUP_BUDGET_MS = 400
+
+# Dependencies that must load on first use, not when main.py is imported
+LAZY_MODULES = (
+    "pandas", "openpyxl", "xlsxwriter", "openmeteo_requests", "requests_cache",
+    "retry_requests", "openai", "flask", "werkzeug",
+)
+
+def import_profile(module, cwd=None):
+    # Parse -X importtime output into {module: cumulative microseconds}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=cwd or os.getcwd(), check=True,
+    )
+    profile = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        profile[name.strip()] = int(cumulative)
+    return profile
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    # The first run also compiles .pyc files; it is not counted
+    import_profile(args.module)
+    profiles = [import_profile(args.module) for _ in range(args.runs)]
+    totals = [profile[args.module] / 1000 for profile in profiles]
+    median = statistics.median(totals)
+
+    print(f"import {args.module}: median {median:.1f} ms over {args.runs} runs "
+          f"(min {min(totals):.1f}, max {max(totals):.1f}), budget {args.budget_ms:.0f} ms")
+    top_level = sorted(
+        ((name, us) for name, us in profiles[-1].items() if "." not in name and name != args.module),
+        key=lambda item: item[1], reverse=True,
+    )
+    for name, us in top_level[:args.top]:
+        print(f"  {name:<28} {us / 1000:8.1f} ms")
+
+    eager = sorted(name for name in LAZY_MODULES if name in profiles[-1])
+    failures = []
+    if median > args.budget_ms:
+        failures.append(f"median {median:.1f} ms exceeds the {args.budget_ms:.0f} ms budget")
+    if eager:
+        failures.append(f"imported at startup: {', '.join(eager)}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if not failures:
+        print("OK")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,243 @@
+"""Offline end-to-end benchmark suite, written as JSON for regression checks
+
+Runs the real WeatherAPIClient (openmeteo_requests + requests_cache) against
+ReplayOpenMeteoAdapter, which replays FlatBuffers bodies recorded under
+``--fixtures``. Missing fixtures are recorded on first use from the
+synthetic FakeOpenMeteoAdapter, or from the live API with ``--record-live``.
+The publisher talks to FakeBroker and insights come from FakeOpenAI.
+
+For each location count it times:
+
+- ``get_weather_data``: single-location fetch and transform (1 location only)
+- ``get_weather_data_batch``: batched fetch and transform
+- ``export_snapshot`` / ``export_rolling``: both ExportService paths, inline
+- ``tick`` / ``tick_insight``: fetch, publish and export, as main.py does
+
+Both API cache tiers are cleared before every round, so each round decodes
+the bodies again. The first round of each case is a warm-up and is not
+timed. Results go to ``--output``; with ``--compare`` the run is checked
+against an earlier result file and exits with status 1 when a case is
+slower than ``--tolerance`` allows. Run from apps/producer:
+
+    python -m benchmarks.bench_suite --locations 1 100 1000 --rounds 5
+    python -m benchmarks.bench_suite --compare benchmarks/results/<baseline>.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from requests.adapters import HTTPAdapter
+
+from benchmarks.fakes import FakeBroker, FakeOpenAI, FakeOpenMeteoAdapter, ReplayOpenMeteoAdapter, make_locations
+from config.settings import (
+    API_CACHE, DAILY_HISTORY, EXCEL_WRITER, EXPORT_PATHS, LOCATIONS_BATCH_SIZE, OPEN_METEO_URL, PAYLOAD_FORMAT
+)
+from src.api.response_cache import ResponseCache
+from src.api.weather_client import WeatherAPIClient
+from src.messaging.change_detector import ChangeDetector
+from src.messaging.publisher import RabbitMQPublisher
+from src.services.ai_service import AIService
+from src.services.export_service import ExportService
+from src.services.weather_service import WeatherService
+from src.utils.metrics import STAGE_SECONDS
+
+DEFAULT_FIXTURES = os.path.join("benchmarks", "fixtures", "open_meteo")
+DEFAULT_RESULTS = os.path.join("benchmarks", "results")
+
+def git_revision():
+    # (short commit, dirty) of the tree being measured, or (None, None) outside git
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+        status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                                capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit.stdout.strip(), bool(status.stdout.strip())
+
+class Suite:
+    """Services wired to the offline fakes, with every store in ``root``"""
+
+    def __init__(self, root, fixtures, record_live, latency, ai_latency):
+        for name in EXPORT_PATHS:
+            EXPORT_PATHS[name] = os.path.join(root, "exports", name)
+        DAILY_HISTORY["path"] = os.path.join(root, "history")
+
+        self.client = WeatherAPIClient(cache_path=os.path.join(root, "api_cache"))
+        source = HTTPAdapter() if record_live else FakeOpenMeteoAdapter()
+        self.adapter = ReplayOpenMeteoAdapter(fixtures, source=source, latency=latency)
+        self.client.cache_session.mount(OPEN_METEO_URL, self.adapter)
+        self.service = WeatherService(api_client=self.client)
+        self.service.ai_service = AIService(client=FakeOpenAI(latency=ai_latency))
+        self.publisher = RabbitMQPublisher(connection_factory=FakeBroker())
+        self.change_detector = ChangeDetector()
+        self.snapshot_export = ExportService("snapshot")
+        self.rolling_export = ExportService("rolling")
+
+    def clear_api_cache(self):
+        self.client.cache_session.cache.clear()
+        self.client.memory_cache = ResponseCache(API_CACHE["memory_max_bytes"])
+
+    def tick(self, locations, include_ai_insight=False):
+        # send_weather_data / send_weather_data_with_insight with inline exports
+        payloads = self.service.get_weather_data_batch(locations, include_ai_insight=include_ai_insight)
+        self.change_detector.publish(self.publisher, payloads)
+        for payload in payloads:
+            self.snapshot_export.export(payload)
+        if include_ai_insight:
+            followups = self.service.collect_late_insights()
+            if followups:
+                self.change_detector.publish(self.publisher, followups)
+
+    def cases(self, locations):
+        # (name, setup, run) for one location count; setup runs untimed before each round
+        payloads = []
+
+        def fetch_payloads():
+            self.clear_api_cache()
+            payloads[:] = self.service.get_weather_data_batch(locations)
+
+        cases = []
+        if len(locations) == 1:
+            cases.append(("get_weather_data", self.clear_api_cache,
+                          lambda: self.service.get_weather_data(location=locations[0])))
+        cases += [
+            ("get_weather_data_batch", self.clear_api_cache, lambda: self.service.get_weather_data_batch(locations)),
+            ("export_snapshot", fetch_payloads, lambda: [self.snapshot_export.export(p) for p in payloads]),
+            ("export_rolling", fetch_payloads, lambda: [self.rolling_export.export(p) for p in payloads]),
+            ("tick", self.clear_api_cache, lambda: self.tick(locations)),
+            ("tick_insight", self.clear_api_cache, lambda: self.tick(locations, include_ai_insight=True)),
+        ]
+        return cases
+
+    def close(self):
+        self.publisher.close()
+        self.service.ai_service.executor.shutdown(wait=False)
+
+def measure(name, setup, run, count, rounds):
+    """Time ``rounds`` calls of ``run`` after one warm-up call
+
+    Returns:
+        dict: Result entry with timing statistics and the mean seconds per
+        round spent in each instrumented pipeline stage
+    """
+    setup()
+    run()
+    timings = []
+    before = STAGE_SECONDS.totals()
+    for _ in range(rounds):
+        setup()
+        started = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started)
+    stages = {}
+    for labels, (total, _) in STAGE_SECONDS.totals().items():
+        spent = total - before.get(labels, (0.0, 0))[0]
+        if spent > 0 and labels[0] != "tick":
+            stages[labels[0]] = round(spent / rounds, 6)
+    timings.sort()
+    median = statistics.median(timings)
+    return {
+        "case": name,
+        "locations": count,
+        "rounds": rounds,
+        "median_seconds": round(median, 6),
+        "p95_seconds": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 6),
+        "min_seconds": round(timings[0], 6),
+        "per_location_ms": round(median / count * 1e3, 4),
+        "stages": stages,
+    }
+
+def compare(results, baseline_path, tolerance):
+    """Print the change of every case against a baseline result file
+
+    Returns:
+        list: (case, locations, ratio) for cases slower than the tolerance
+    """
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    previous = {(r["case"], r["locations"]): r["median_seconds"] for r in baseline["results"]}
+    print(f"\nAgainst {baseline_path} ({baseline.get('commit') or 'unknown commit'}), "
+          f"tolerance {tolerance:.0%}")
+    regressions = []
+    for result in results:
+        key = (result["case"], result["locations"])
+        if key not in previous:
+            print(f"  {key[0]:<24} {key[1]:>6}  (new case)")
+            continue
+        ratio = result["median_seconds"] / previous[key] if previous[key] else float("inf")
+        slower = ratio > 1 + tolerance
+        if slower:
+            regressions.append((*key, ratio))
+        print(f"  {key[0]:<24} {key[1]:>6}  {ratio:6.2f}x{'  REGRESSION' if slower else ''}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--locations", type=int, nargs="+", default=[1, 100, 1000])
+    parser.add_argument("--rounds", type=int, default=5, help="timed rounds per case")
+    parser.add_argument("--cases", nargs="+", help="only run these cases")
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES, help="recorded Open-Meteo bodies")
+    parser.add_argument("--record-live", action="store_true", help="record missing fixtures from the live API")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated seconds per replayed request")
+    parser.add_argument("--ai-latency", type=float, default=0.0, help="seconds per fake completion")
+    parser.add_argument("--output", help=f"result file (default: {DEFAULT_RESULTS}/<timestamp>_<commit>.json)")
+    parser.add_argument("--compare", help="earlier result file to check against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before failing")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    commit, dirty = git_revision()
+    started = datetime.now(timezone.utc)
+    results = []
+
+    with tempfile.TemporaryDirectory() as root:
+        suite = Suite(root, args.fixtures, args.record_live, args.latency, args.ai_latency)
+        print(f"{'case':<24} {'locs':>6} {'median':>11} {'p95':>11} {'per loc':>11}")
+        for count in args.locations:
+            locations = make_locations(count)
+            for name, setup, run in suite.cases(locations):
+                if args.cases and name not in args.cases:
+                    continue
+                result = measure(name, setup, run, count, args.rounds)
+                results.append(result)
+                print(f"{name:<24} {count:>6} {result['median_seconds'] * 1e3:>8.1f} ms "
+                      f"{result['p95_seconds'] * 1e3:>8.1f} ms {result['per_location_ms']:>8.3f} ms")
+        suite.close()
+        print(f"fixtures: {suite.adapter.replayed} replayed, {suite.adapter.recorded} recorded in {args.fixtures}")
+
+    report = {
+        "commit": commit,
+        "dirty": dirty,
+        "created": started.isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {
+            "payload_format": PAYLOAD_FORMAT,
+            "excel_engine": EXCEL_WRITER["engine"],
+            "locations_batch_size": LOCATIONS_BATCH_SIZE,
+            "rounds": args.rounds,
+            "latency": args.latency,
+            "ai_latency": args.ai_latency,
+        },
+        "results": results,
+    }
+    output = args.output or os.path.join(
+        DEFAULT_RESULTS, f"{started:%Y%m%dT%H%M%S}_{commit or 'nogit'}{'-dirty' if dirty else ''}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"results written to {output}")
+
+    if args.compare and compare(results, args.compare, args.tolerance):
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Legacy per-element loops vs vectorized daily/hourly transforms
+
+Run from apps/producer:
+
+    python -m benchmarks.bench_transform --locations 100
+"""
+import argparse
+import logging
+import timeit
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.fakes import FakeWeatherApiResponse, make_locations
+from src.services.weather_service import WeatherService
+from src.utils.parsers import parse_weather_code
+
+def legacy_current_precipitation(hourly, now, timezone):
+    # Previous implementation: Python list of timestamps + linear scan
+    hourly_length = hourly.Variables(0).ValuesLength()
+    hourly_start = pd.to_datetime(hourly.Time(), unit="s", utc=True).tz_convert(timezone)
+    hourly_times = [hourly_start + pd.Timedelta(hours=i) for i in range(hourly_length)]
+    hourly_precip_probs = hourly.Variables(0).ValuesAsNumpy()
+    current_hour = now.replace(minute=0, second=0, microsecond=0)
+    for i, hour_time in enumerate(hourly_times):
+        if hour_time.replace(tzinfo=None) == current_hour.replace(tzinfo=None):
+            return int(hourly_precip_probs[i]) if not np.isnan(hourly_precip_probs[i]) else 0
+    return 0
+
+def legacy_daily(daily):
+    # Previous implementation: per-element float()/np.isnan/parse_weather_code
+    length = daily.Variables(0).ValuesLength()
+    start = pd.to_datetime(daily.Time(), unit="s")
+    dates = [start + pd.Timedelta(days=i) for i in range(length)]
+    columns = [daily.Variables(i).ValuesAsNumpy() for i in range(7)]
+    temp_max, temp_min, apparent_max, apparent_min, uv_index, rain_probability, codes = columns
+    rows = []
+    for i in range(length):
+        rain_prob = 0 if np.isnan(rain_probability[i]) else int(rain_probability[i])
+        rows.append({
+            "date": dates[i].strftime("%d/%m/%Y"),
+            "temperatureMax": float(temp_max[i]),
+            "temperatureMin": float(temp_min[i]),
+            "apparentTemperatureMax": float(apparent_max[i]),
+            "apparentTemperatureMin": float(apparent_min[i]),
+            "uvIndexMax": float(uv_index[i]),
+            "precipitationProbability": rain_prob,
+            "weatherCode": parse_weather_code(int(codes[i])),
+        })
+    return rows
+
+def bench(label, func, number):
+    seconds = min(timeit.repeat(func, number=number, repeat=3)) / number
+    print(f"  {label:<32} {seconds * 1e3:8.3f} ms")
+    return seconds
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--locations", type=int, default=100, help="locations in the 2-D block run")
+    parser.add_argument("--number", type=int, default=20)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    service = WeatherService(api_client=object())
+    timezone = "America/Sao_Paulo"
+    now = datetime.now(ZoneInfo(timezone))
+
+    for past_days in (30, 92):
+        locations = make_locations(args.locations, timezone)
+        responses = [FakeWeatherApiResponse(loc, past_days, seed=i) for i, loc in enumerate(locations)]
+        hourly, daily = responses[0].Hourly(), responses[0].Daily()
+        dailies = [response.Daily() for response in responses]
+
+        # The vectorized path must produce exactly the legacy output
+        assert service._process_daily_data(daily).to_wire() == legacy_daily(daily)
+        assert service._get_current_precipitation(hourly, now, timezone) == legacy_current_precipitation(hourly, now, timezone)
+        assert [block.to_wire() for block in service._process_daily_block(dailies)] == [legacy_daily(d) for d in dailies]
+
+        print(f"past_days={past_days}")
+        old = bench("legacy current precipitation", lambda: legacy_current_precipitation(hourly, now, timezone), args.number)
+        new = bench("indexed current precipitation", lambda: service._get_current_precipitation(hourly, now, timezone), args.number)
+        print(f"  -> {old / new:.0f}x")
+        old = bench("legacy daily (1 location)", lambda: legacy_daily(daily), args.number)
+        new = bench("vectorized daily (1 location)", lambda: service._process_daily_data(daily), args.number)
+        print(f"  -> {old / new:.1f}x")
+        old = bench(f"legacy daily ({args.locations} loc)", lambda: [legacy_daily(d) for d in dailies], max(args.number // 10, 1))
+        new = bench(f"2-D block daily ({args.locations} loc)", lambda: service._process_daily_block(dailies), max(args.number // 10, 1))
+        print(f"  -> {old / new:.1f}x")
+
+if __name__ == "__main__":
+    main()
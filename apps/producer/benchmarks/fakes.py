@@ -0,0 +1,487 @@
+"""In-memory stand-ins for the external services used by the producer
+
+They mimic just enough of the Open-Meteo SDK objects and of the API client
+to run the producer code paths offline, with an optional simulated network
+latency per HTTP call. FakeOpenMeteoAdapter goes one level lower and serves
+real FlatBuffers bodies, so the actual client and its caches can run too,
+and ReplayOpenMeteoAdapter replays bodies recorded to disk.
+"""
+import hashlib
+import io
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from urllib.parse import parse_qsl, urlparse
+from zoneinfo import ZoneInfo
+
+import numpy as np
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPResponse
+
+FORECAST_DAYS = 7
+MAX_PAST_DAYS = 92
+
+class FakeVariable:
+    """Mimics openmeteo_sdk VariableWithValues"""
+
+    def __init__(self, value=None, values=None):
+        self._value = value
+        self._values = values
+
+    def Value(self):
+        return self._value
+
+    def ValuesAsNumpy(self):
+        return self._values
+
+    def ValuesLength(self):
+        return 0 if self._values is None else len(self._values)
+
+class FakeVariablesWithTime:
+    """Mimics openmeteo_sdk VariablesWithTime"""
+
+    def __init__(self, start, interval, variables):
+        self._start = start
+        self._interval = interval
+        self._variables = variables
+
+    def Time(self):
+        return self._start
+
+    def TimeEnd(self):
+        length = self._variables[0].ValuesLength() if self._variables else 0
+        return self._start + self._interval * length
+
+    def Interval(self):
+        return self._interval
+
+    def Variables(self, index):
+        return self._variables[index]
+
+    def VariablesLength(self):
+        return len(self._variables)
+
+class FakeWeatherApiResponse:
+    """Mimics openmeteo_sdk WeatherApiResponse for one location
+
+    Values are drawn once per location over the longest supported window and
+    sliced, so a given day or hour has the same values whatever window was
+    requested (like the real API for finalized past days). ``past_hours`` /
+    ``forecast_hours`` limit the hourly series around the current hour.
+    The ``*_variables`` lists select and order the variables of each block,
+    like the query does (default: all of them); an empty list leaves the
+    block out.
+    """
+
+    def __init__(self, location, past_days, seed=0, past_hours=None, forecast_hours=None,
+                 forecast_days=FORECAST_DAYS, daily_variables=None, current_variables=None, hourly_variables=None):
+        self.location = location
+        rng = np.random.default_rng(seed)
+        tz = ZoneInfo(location["timezone"])
+        now = datetime.now(tz)
+        today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        all_days = MAX_PAST_DAYS + FORECAST_DAYS
+        all_hours = all_days * 24
+
+        precip = rng.uniform(0, 100, all_hours).astype(np.float32)
+        precip[rng.integers(0, all_hours, all_hours // 50)] = np.nan
+        if past_hours is None and forecast_hours is None:
+            hourly_start = today - timedelta(days=past_days)
+            first, count = (MAX_PAST_DAYS - past_days) * 24, (past_days + FORECAST_DAYS) * 24
+        else:
+            current_hour = now.replace(minute=0, second=0, microsecond=0)
+            hourly_start = current_hour - timedelta(hours=past_hours or 0)
+            first = MAX_PAST_DAYS * 24 + (current_hour - today).seconds // 3600 - (past_hours or 0)
+            count = (past_hours or 0) + (forecast_hours or FORECAST_DAYS * 24)
+        self._hourly = _select(FakeVariablesWithTime, int(hourly_start.timestamp()), 3600, {
+            "precipitation_probability": FakeVariable(values=precip[first:first + count]),
+        }, hourly_variables)
+
+        temp_max = rng.uniform(25, 35, all_days).astype(np.float32)
+        temp_min = temp_max - rng.uniform(5, 10, all_days).astype(np.float32)
+        rain = rng.uniform(0, 100, all_days).astype(np.float32)
+        rain[rng.integers(0, all_days, max(all_days // 10, 1))] = np.nan
+        codes = rng.choice([0, 1, 2, 3, 45, 61, 63, 80, 95], all_days).astype(np.float32)
+        uv = rng.uniform(0, 12, all_days).astype(np.float32)
+        window = slice(MAX_PAST_DAYS - past_days, MAX_PAST_DAYS + min(forecast_days, FORECAST_DAYS))
+        start = int((today - timedelta(days=past_days)).timestamp())
+        self._daily = _select(FakeVariablesWithTime, start, 86400, {
+            "temperature_2m_max": FakeVariable(values=temp_max[window]),
+            "temperature_2m_min": FakeVariable(values=temp_min[window]),
+            "apparent_temperature_max": FakeVariable(values=(temp_max + 2)[window]),
+            "apparent_temperature_min": FakeVariable(values=(temp_min + 1)[window]),
+            "uv_index_max": FakeVariable(values=uv[window]),
+            "precipitation_probability_mean": FakeVariable(values=rain[window]),
+            "weather_code": FakeVariable(values=codes[window]),
+        }, daily_variables)
+
+        self._current = _select(FakeVariablesWithTime, int(now.timestamp()), 900, {
+            "temperature_2m": FakeVariable(value=float(rng.uniform(20, 35))),
+            "relative_humidity_2m": FakeVariable(value=float(rng.uniform(40, 95))),
+            "apparent_temperature": FakeVariable(value=float(rng.uniform(20, 38))),
+            "is_day": FakeVariable(value=1.0),
+            "uv_index": FakeVariable(value=float(rng.uniform(0, 11))),
+            "weather_code": FakeVariable(value=float(rng.choice([0, 2, 3, 61, 95]))),
+        }, current_variables)
+
+    def Latitude(self):
+        return self.location["latitude"]
+
+    def Longitude(self):
+        return self.location["longitude"]
+
+    def Hourly(self):
+        return self._hourly
+
+    def Daily(self):
+        return self._daily
+
+    def Current(self):
+        return self._current
+
+def _select(block, start, interval, variables, names):
+    # Block with the requested variables in request order, or None when none were
+    if names is None:
+        return block(start, interval, list(variables.values()))
+    if not names:
+        return None
+    return block(start, interval, [variables[name] for name in names])
+
+def _variables(params, name):
+    # Variable names of a block in query params: a list, a comma-separated string or absent
+    value = params.get(name)
+    if value is None:
+        return []
+    return value.split(",") if isinstance(value, str) else list(value)
+
+class FakeWeatherAPIClient:
+    """Drop-in replacement for WeatherAPIClient
+
+    Every call sleeps ``latency`` seconds to emulate one HTTP round trip and
+    returns one fake response per comma-separated location in ``params``.
+    ``past_days``, ``forecast_days`` and the variables are taken from the
+    params. ``values_returned`` counts the hourly and daily values sent
+    back, as a proxy for response size and decode work.
+    """
+
+    def __init__(self, latency=0.0, past_days=30):
+        self.latency = latency
+        self.past_days = past_days
+        self.calls = 0
+        self.values_returned = 0
+
+    def fetch_weather_data(self, params):
+        return self.fetch_weather_batch(params)[0]
+
+    def fetch_weather_batch(self, params, refresh=False):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        latitudes = str(params["latitude"]).split(",")
+        longitudes = str(params["longitude"]).split(",")
+        timezones = str(params["timezone"]).split(",")
+        responses = [
+            FakeWeatherApiResponse(
+                {"latitude": float(lat), "longitude": float(lon), "timezone": tz},
+                params.get("past_days", self.past_days),
+                seed=_seed(lat, lon),
+                past_hours=params.get("past_hours"),
+                forecast_hours=params.get("forecast_hours"),
+                forecast_days=params.get("forecast_days", FORECAST_DAYS),
+                daily_variables=_variables(params, "daily"),
+                current_variables=_variables(params, "current"),
+                hourly_variables=_variables(params, "hourly"),
+            )
+            for lat, lon, tz in zip(latitudes, longitudes, timezones)
+        ]
+        for response in responses:
+            for block in (response.Hourly(), response.Daily()):
+                if block is not None:
+                    self.values_returned += block.VariablesLength() * block.Variables(0).ValuesLength()
+        return responses
+
+def _seed(latitude, longitude):
+    # Same coordinates, same data, whatever the batch composition
+    return abs(hash((round(float(latitude), 4), round(float(longitude), 4)))) % (2 ** 32)
+
+def encode_weather_response(response):
+    """Serialize a fake response the way Open-Meteo does with format=flatbuffers
+
+    Returns one size-prefixed WeatherApiResponse message; the API body for a
+    multi-location request is these messages concatenated.
+    """
+    import flatbuffers
+
+    builder = flatbuffers.Builder(4096)
+
+    def variable(var):
+        values = var.ValuesAsNumpy()
+        vector = None if values is None else builder.CreateNumpyVector(np.asarray(values, dtype=np.float32))
+        builder.StartObject(13)
+        if vector is not None:
+            builder.PrependUOffsetTRelativeSlot(3, vector, 0)
+        if var.Value() is not None:
+            builder.PrependFloat32Slot(2, float(var.Value()), 0.0)
+        return builder.EndObject()
+
+    def block(variables_with_time):
+        offsets = [variable(variables_with_time.Variables(i)) for i in range(variables_with_time.VariablesLength())]
+        builder.StartVector(4, len(offsets), 4)
+        for offset in reversed(offsets):
+            builder.PrependUOffsetTRelative(offset)
+        vector = builder.EndVector()
+        builder.StartObject(4)
+        builder.PrependInt64Slot(0, variables_with_time.Time(), 0)
+        builder.PrependInt64Slot(1, variables_with_time.TimeEnd(), 0)
+        builder.PrependInt32Slot(2, variables_with_time.Interval(), 0)
+        builder.PrependUOffsetTRelativeSlot(3, vector, 0)
+        return builder.EndObject()
+
+    blocks = {
+        slot: block(variables)
+        for slot, variables in ((9, response.Current()), (10, response.Daily()), (11, response.Hourly()))
+        if variables is not None
+    }
+    timezone = builder.CreateString(response.location["timezone"])
+    builder.StartObject(15)
+    builder.PrependFloat32Slot(0, response.Latitude(), 0.0)
+    builder.PrependFloat32Slot(1, response.Longitude(), 0.0)
+    builder.PrependUOffsetTRelativeSlot(7, timezone, 0)
+    for slot, offset in blocks.items():
+        builder.PrependUOffsetTRelativeSlot(slot, offset, 0)
+    builder.Finish(builder.EndObject())
+    message = bytes(builder.Output())
+    return len(message).to_bytes(4, "little") + message
+
+def encode_weather_body(params):
+    """Build the FlatBuffers body Open-Meteo would return for ``params``"""
+    latitudes = str(params["latitude"]).split(",")
+    longitudes = str(params["longitude"]).split(",")
+    timezones = str(params["timezone"]).split(",")
+
+    def number(name):
+        return int(params[name]) if params.get(name) is not None else None
+
+    return b"".join(
+        encode_weather_response(FakeWeatherApiResponse(
+            {"latitude": float(lat), "longitude": float(lon), "timezone": tz},
+            number("past_days") or 0,
+            seed=_seed(lat, lon),
+            past_hours=number("past_hours"),
+            forecast_hours=number("forecast_hours"),
+            forecast_days=number("forecast_days") or FORECAST_DAYS,
+            daily_variables=_variables(params, "daily"),
+            current_variables=_variables(params, "current"),
+            hourly_variables=_variables(params, "hourly"),
+        ))
+        for lat, lon, tz in zip(latitudes, longitudes, timezones)
+    )
+
+class FakeOpenMeteoAdapter(HTTPAdapter):
+    """requests transport adapter answering Open-Meteo calls offline
+
+    Mount it on a session (``session.mount(OPEN_METEO_URL, adapter)``) to run
+    the real WeatherAPIClient, openmeteo_requests and requests_cache against
+    FlatBuffers bodies built from FakeWeatherApiResponse. Each request sleeps
+    ``latency`` seconds.
+    """
+
+    def __init__(self, latency=0.0):
+        super().__init__()
+        self.latency = latency
+        self.calls = 0
+
+    def send(self, request, **kwargs):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        params = {}
+        for key, value in parse_qsl(urlparse(request.url).query):
+            # Repeated keys (list params) are joined like comma-separated ones
+            params[key] = f"{params[key]},{value}" if key in params else value
+        body = encode_weather_body(params)
+        return _body_response(self, request, body)
+
+class ReplayOpenMeteoAdapter(HTTPAdapter):
+    """requests transport adapter replaying recorded Open-Meteo bodies
+
+    Bodies are stored in ``fixture_dir``, one file per distinct query. A
+    query without a fixture is answered by ``source`` (by default a
+    FakeOpenMeteoAdapter; a plain HTTPAdapter records the live API) and
+    recorded, so later runs replay identical bytes whatever the time of day.
+    ``recorded`` and ``replayed`` count both cases.
+    """
+
+    def __init__(self, fixture_dir, source=None, latency=0.0):
+        super().__init__()
+        self.fixture_dir = fixture_dir
+        self.source = source or FakeOpenMeteoAdapter()
+        self.latency = latency
+        self.recorded = 0
+        self.replayed = 0
+        os.makedirs(fixture_dir, exist_ok=True)
+
+    def fixture_path(self, url):
+        query = sorted(parse_qsl(urlparse(url).query))
+        digest = hashlib.sha1(repr(query).encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.fixture_dir, f"{digest}.fb")
+
+    def send(self, request, **kwargs):
+        path = self.fixture_path(request.url)
+        if os.path.exists(path):
+            self.replayed += 1
+            if self.latency:
+                time.sleep(self.latency)
+            with open(path, "rb") as f:
+                return _body_response(self, request, f.read())
+
+        response = self.source.send(request, **kwargs)
+        response.raise_for_status()
+        body = response.content
+        with open(path + ".tmp", "wb") as f:
+            f.write(body)
+        os.replace(path + ".tmp", path)
+        self.recorded += 1
+        return _body_response(self, request, body)
+
+def _body_response(adapter, request, body):
+    raw = HTTPResponse(
+        body=io.BytesIO(body),
+        headers={"Content-Type": "application/octet-stream", "Content-Length": str(len(body))},
+        status=200,
+        preload_content=False,
+        decode_content=False,
+    )
+    return adapter.build_response(request, raw)
+
+def make_locations(count, timezone="America/Sao_Paulo", spacing=0.25):
+    """Build ``count`` synthetic locations spread over south-east Brazil,
+    ``spacing`` degrees apart on a 40-row grid"""
+    return [
+        {
+            "city": f"City-{i:04d}",
+            "latitude": round(-23.5 + (i % 40) * spacing, 4),
+            "longitude": round(-47.0 + (i // 40) * spacing, 4),
+            "timezone": timezone,
+        }
+        for i in range(count)
+    ]
+
+class FakeBroker:
+    """Local RabbitMQ stand-in exposing a pika.BlockingConnection-like factory
+
+    ``handshake_latency`` is paid once per new connection (TCP + AMQP
+    handshake) and ``rtt`` once per synchronous round trip (channel open,
+    queue declare, each confirmed publish). Set ``down`` to refuse
+    connections, and ``failure_rate`` to make that share of connection
+    attempts and confirms fail (a lost confirm drops the connection after
+    the message reached the queue).
+    """
+
+    def __init__(self, handshake_latency=0.0, rtt=0.0, failure_rate=0.0, seed=0):
+        self.handshake_latency = handshake_latency
+        self.rtt = rtt
+        self.failure_rate = failure_rate
+        self.down = False
+        self.queues = {}
+        self.connections_opened = 0
+        self.failures = 0
+        self._random = random.Random(seed)
+
+    def __call__(self, parameters):
+        if self.down or self.should_fail():
+            self.failures += 1
+            raise ConnectionError("connection refused")
+        return FakeBlockingConnection(self)
+
+    def should_fail(self):
+        return bool(self.failure_rate) and self._random.random() < self.failure_rate
+
+    def round_trip(self):
+        if self.rtt:
+            time.sleep(self.rtt)
+
+class FakeBlockingConnection:
+    """Mimics pika.BlockingConnection for FakeBroker"""
+
+    def __init__(self, broker):
+        broker.connections_opened += 1
+        if broker.handshake_latency:
+            time.sleep(broker.handshake_latency)
+        self.broker = broker
+        self.is_open = True
+        self._channels = []
+
+    def channel(self):
+        self.broker.round_trip()
+        channel = FakeBlockingChannel(self)
+        self._channels.append(channel)
+        return channel
+
+    def close(self):
+        self.is_open = False
+        for channel in self._channels:
+            channel.is_open = False
+
+class FakeBlockingChannel:
+    """Mimics pika BlockingChannel for FakeBroker"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.is_open = True
+        self._confirming = False
+
+    def confirm_delivery(self):
+        self.connection.broker.round_trip()
+        self._confirming = True
+
+    def queue_declare(self, queue, **kwargs):
+        self.connection.broker.round_trip()
+        self.connection.broker.queues.setdefault(queue, [])
+
+    def basic_publish(self, exchange, routing_key, body, properties=None, mandatory=False):
+        if not self.is_open:
+            raise ConnectionError("channel is closed")
+        broker = self.connection.broker
+        broker.queues.setdefault(routing_key, []).append(body)
+        if self._confirming:
+            if broker.down or broker.should_fail():
+                broker.failures += 1
+                self.connection.close()
+                raise ConnectionError("connection reset")
+            broker.round_trip()
+
+class FakeOpenAI:
+    """Stand-in for openai.OpenAI exposing chat.completions.create
+
+    Each call sleeps ``latency`` seconds; one call in ``slow_every`` takes
+    ``slow_latency`` instead, emulating the slow tail of a real API. Calls
+    whose latency exceeds the request ``timeout`` raise TimeoutError after
+    ``timeout`` seconds, like the SDK's APITimeoutError.
+    """
+
+    def __init__(self, latency=0.2, slow_latency=2.0, slow_every=0):
+        import threading
+        from types import SimpleNamespace
+
+        self.latency = latency
+        self.slow_latency = slow_latency
+        self.slow_every = slow_every
+        self.calls = 0
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model, messages, timeout=None, **kwargs):
+        from types import SimpleNamespace
+
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+        latency = self.slow_latency if self.slow_every and call % self.slow_every == 0 else self.latency
+        if timeout is not None and latency > timeout:
+            time.sleep(timeout)
+            raise TimeoutError("Request timed out.")
+        time.sleep(latency)
+        content = f"Insight {call} - leve guarda-chuva"
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
@@ -0,0 +1,88 @@
+"""Load test for the read API (src/api/flask_server.py)
+
+Starts a local instance on a snapshot filled from fake responses (or targets
+--url) and hammers it from several keep-alive clients, once with plain GETs
+and once with conditional GETs (If-None-Match). Run from apps/producer:
+
+    python -m benchmarks.load_test_api --clients 8 --requests 2000
+"""
+import argparse
+import http.client
+import logging
+import statistics
+import threading
+import time
+from urllib.parse import urlparse
+
+from benchmarks.fakes import FakeWeatherAPIClient, make_locations
+from src.api.flask_server import start_api_server
+from src.api.snapshot import PayloadSnapshot
+from src.services.weather_service import WeatherService
+
+def client_worker(url, path, count, conditional, latencies, statuses):
+    parsed = urlparse(url)
+    conn = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=10)
+    headers = {"Accept-Encoding": "gzip"}
+    for _ in range(count):
+        started = time.perf_counter()
+        conn.request("GET", path, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - started)
+        statuses.append(response.status)
+        if conditional and response.getheader("ETag"):
+            headers["If-None-Match"] = response.getheader("ETag")
+    conn.close()
+
+def run(url, path, clients, requests, conditional):
+    latencies, statuses = [], []
+    per_client = requests // clients
+    threads = [
+        threading.Thread(target=client_worker, args=(url, path, per_client, conditional, latencies, statuses))
+        for _ in range(clients)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    not_modified = statuses.count(304)
+    print(
+        f"  {'conditional' if conditional else 'plain':<12} {len(latencies) / elapsed:8,.0f} req/s  "
+        f"p50 {statistics.median(latencies) * 1e3:6.2f} ms  p99 {p99 * 1e3:6.2f} ms  "
+        f"304s {not_modified}/{len(statuses)}"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="existing instance, e.g. http://localhost:5000")
+    parser.add_argument("--locations", type=int, default=100)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--port", type=int, default=5055)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    server = None
+    url = args.url
+    if not url:
+        snapshot = PayloadSnapshot()
+        snapshot.update(WeatherService(api_client=FakeWeatherAPIClient()).get_weather_data_batch(make_locations(args.locations)))
+        server = start_api_server(snapshot, host="127.0.0.1", port=args.port)
+        url = f"http://127.0.0.1:{args.port}"
+
+    try:
+        for path in ("/weather/City-0001", "/weather"):
+            print(path)
+            run(url, path, args.clients, args.requests, conditional=False)
+            run(url, path, args.clients, args.requests, conditional=True)
+    finally:
+        if server:
+            server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -1,37 +1,195 @@
-"""Logging configuration"""
+"""Logging configuration
+
+Records are put on an in-memory queue by the calling thread and written by a
+background QueueListener thread, so formatting and disk I/O stay off the
+scheduler thread. The file rolls over on a schedule and old files are
+deleted after ``LOGGING["retention"]`` rollovers. Set ``LOG_FORMAT=json`` for
+one JSON object per line, with the fields of the enclosing ``log_context``
+(tick, location) and any ``extra`` passed at the call site.
+"""
+import atexit
+import contextvars
+import copy
+import json
 import logging
+import logging.handlers
 import os
+import queue
+from contextlib import contextmanager
 from datetime import datetime
 
-def setup_logging(log_level=logging.INFO):
+from config.settings import LOGGING
+
+# Fields set by log_context, added to every record logged inside it
+_context = contextvars.ContextVar("log_context", default={})
+
+# Attributes every LogRecord has; anything else came from ``extra`` or the context
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+_listener = None
+_queue_handler = None
+
+@contextmanager
+def log_context(**fields):
+    """Add ``fields`` to every record logged by this thread or task inside the block"""
+    token = _context.set({**_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+class ContextFilter(logging.Filter):
+    """Copy the current log_context onto the record, in the calling thread"""
+
+    def filter(self, record):
+        for key, value in _context.get().items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        return True
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message and extra fields"""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created).astimezone().isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full
+
+    The message is merged with its arguments here, since they may be mutated
+    before the listener thread formats the record; exc_info is kept for the
+    formatter.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class _QueueListener(logging.handlers.QueueListener):
+    """QueueListener whose stop waits for room in a full bounded queue"""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+def _build_handlers(file_handler_class, **file_kwargs):
+    # Console and file handlers sharing one formatter
+    if LOGGING["format"] == "json":
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(
+            "%(asctime)s - %(name)s - %(levelname)s - %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
+        )
+    os.makedirs(LOGGING["path"], exist_ok=True)
+    log_filename = os.path.join(LOGGING["path"], LOGGING["file"])
+    handlers = [logging.StreamHandler(), file_handler_class(log_filename, encoding="utf-8", **file_kwargs)]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+def _log_directly_after_fork():
+    # Forked children have no listener thread: write straight to the console
+    # and to the file, reopened when the parent rotates it
+    global _listener, _queue_handler
+    if _queue_handler is None:
+        return
+    root = logging.getLogger()
+    root.removeHandler(_queue_handler)
+    for handler in _build_handlers(logging.handlers.WatchedFileHandler):
+        root.addHandler(handler)
+    _listener = _queue_handler = None
+
+def setup_worker_logging(log_level=None):
+    """Configure logging in a worker process started by the main one
+
+    Workers log straight to the console and to the main process's file,
+    reopened when that process rotates it; only the main process rotates.
+
+    Args:
+        log_level: Logging level (default: LOGGING["level"])
+    """
+    root = logging.getLogger()
+    root.setLevel(log_level or LOGGING["level"])
+    if not root.handlers:
+        for handler in _build_handlers(logging.handlers.WatchedFileHandler):
+            root.addHandler(handler)
+    logging.logMultiprocessing = False
+
+def setup_logging(log_level=None):
     """Configure application logging
-    
+
     Args:
-        log_level: Logging level (default: INFO)
+        log_level: Logging level (default: LOGGING["level"])
     """
-    # Create logs directory if it doesn't exist
-    os.makedirs("logs", exist_ok=True)
-    
-    # Create log filename with date
-    log_filename = f"logs/weather_producer_{datetime.now().strftime('%Y%m%d')}.log"
-    
-    # Configure logging format
-    log_format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-    date_format = "%Y-%m-%d %H:%M:%S"
-    
-    # Configure root logger
-    logging.basicConfig(
-        level=log_level,
-        format=log_format,
-        datefmt=date_format,
-        handlers=[
-            logging.FileHandler(log_filename),
-            logging.StreamHandler()
-        ]
-    )
-    
+    global _listener, _queue_handler
+    root = logging.getLogger()
+    root.setLevel(log_level or LOGGING["level"])
+
+    if _listener is None:
+        handlers = _build_handlers(
+            logging.handlers.TimedRotatingFileHandler,
+            when=LOGGING["rotate_when"],
+            backupCount=LOGGING["retention"]
+        )
+        # Unbounded unless LOG_QUEUE_SIZE is set; SimpleQueue is the cheaper put
+        log_queue = queue.Queue(LOGGING["queue_size"]) if LOGGING["queue_size"] > 0 else queue.SimpleQueue()
+        _queue_handler = DroppingQueueHandler(log_queue)
+        _queue_handler.addFilter(ContextFilter())
+        root.addHandler(_queue_handler)
+        _listener = _QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        # Flush what is still queued on exit
+        atexit.register(stop_logging)
+        os.register_at_fork(after_in_child=_log_directly_after_fork)
+
+    # Neither format uses process names, skip looking them up per record
+    logging.logMultiprocessing = False
+
     # Set specific loggers
     logging.getLogger("pika").setLevel(logging.WARNING)
     logging.getLogger("urllib3").setLevel(logging.WARNING)
-    
+
     return logging.getLogger(__name__)
+
+def stop_logging():
+    """Write out queued records and stop the listener thread
+
+    Records logged afterwards go to the handlers directly.
+    """
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    _listener.stop()
+    root = logging.getLogger()
+    root.removeHandler(_queue_handler)
+    for handler in _listener.handlers:
+        root.addHandler(handler)
+    _listener = _queue_handler = None
+
+def log_stats():
+    """Return the logging queue depth and the number of dropped records"""
+    if _queue_handler is None:
+        return {}
+    return {"queued": _queue_handler.queue.qsize(), "dropped": _queue_handler.dropped}
@@ -1,62 +1,142 @@
 # Weather Producer - Main Entry Point
+import argparse
 import schedule
+import sys
 import time
 import logging
 
-from config.logging_config import setup_logging
-from config.settings import SCHEDULE
+from config.logging_config import setup_logging, log_stats
+from config.settings import (
+    SCHEDULE, LOCATIONS, RUNNER, API_SERVER, EXPORT_EXECUTOR, OUTBOX, METRICS, ADAPTIVE_SCHEDULE, SHARDING, SHARD_SUFFIX
+)
 from src.services.weather_service import WeatherService
 from src.services.export_service import ExportService
+from src.services.export_executor import ExportExecutor
 from src.messaging.publisher import RabbitMQPublisher
+from src.messaging.outbox import OutboxPublisher
+from src.messaging.change_detector import ChangeDetector
+from src.pipeline.sharding import ShardAssignment, run_shards
+from src.api.snapshot import snapshot
+from src.utils.parsers import slugify
+from src.utils import metrics
 
-# Setup logging
-logger = setup_logging()
+# Logging is set up by main(): export worker processes import this module too
+logger = logging.getLogger(__name__)
 
-# Initialize services
-weather_service = WeatherService()
-export_service = ExportService()
-publisher = RabbitMQPublisher()
+# Services are built by init_services() once the run mode is known. The
+# modules above import their heavy dependencies (pandas, openpyxl, the
+# Open-Meteo HTTP stack, OpenAI, Flask) only on the code paths that use them
+weather_service = None
+export_service = None
+export_executor = None
+exporter = None
+publisher = None
+change_detector = None
+shard = None
+
+def init_services(once=False):
+    # Initialize services; a one-shot run exports inline as it exits right after
+    global weather_service, export_service, export_executor, exporter, publisher, change_detector, shard
+    weather_service = WeatherService()
+    # A process started with SHARD_INDEX owns part of LOCATIONS
+    if SHARD_SUFFIX:
+        shard = ShardAssignment(LOCATIONS, weather_service.location_index)
+    elif SHARDING["count"] > 1:
+        logger.warning("SHARD_COUNT is set without SHARD_INDEX, monitoring every location")
+    export_service = ExportService()
+    # Exports run in worker processes unless EXPORT_EXECUTOR_ENABLED=false
+    if EXPORT_EXECUTOR["enabled"] and not once:
+        export_executor = ExportExecutor(export_service.mode)
+    exporter = export_executor or export_service
+    # Publishes go through the durable outbox unless OUTBOX_ENABLED=false
+    publisher = OutboxPublisher(RabbitMQPublisher()) if OUTBOX["enabled"] else RabbitMQPublisher()
+    change_detector = ChangeDetector()
+
+def monitored_locations():
+    # Locations this process refreshes: its shard's share, repartitioned when
+    # the shard count changes, or every location
+    if shard is None:
+        return LOCATIONS
+    shard.refresh()
+    return shard.locations
+
+def publish_and_export(payloads, export=True):
+    # Publish all location payloads in one confirmed batch, then queue exports.
+    # Payloads stay WeatherPayloads here and are only serialized by the publisher;
+    # unchanged payloads are suppressed or sent as deltas per PUBLISH_MODE.
+    # Returns whether every message was confirmed (or queued in the outbox)
+    unconfirmed = change_detector.unconfirmed
+    change_detector.publish(publisher, payloads)
+    snapshot.update(payloads)
+    if export:
+        for payload in payloads:
+            exporter.export(payload)
+    return change_detector.unconfirmed == unconfirmed
 
 def send_weather_data():
-    # Send weather data without AI insight
+    # Send weather data without AI insight; returns whether every location was
+    # fetched and published
     try:
         logger.info("Sending weather data")
         
-        # Get weather data
-        weather_json = weather_service.get_weather_data(include_ai_insight=False)
-        
-        # Publish to RabbitMQ
-        publisher.publish(weather_json)
+        locations = monitored_locations()
+        if not locations:
+            logger.info("No locations in this shard")
+            return True
         
-        # Generate exports
-        export_service.export_csv(weather_json)
-        export_service.export_excel(weather_json)
+        with metrics.tick("data", METRICS["tick_summary"]):
+            # Get weather data for every monitored location (batched API calls)
+            payloads = weather_service.get_weather_data_batch(locations, include_ai_insight=False)
+            published = publish_and_export(payloads)
+        return published and len(payloads) == len(locations)
         
     except Exception as e:
         logger.error(f"Error sending weather data: {e}")
+        return False
 
 def send_weather_data_with_insight():
-    # Send weather data with AI insight
+    # Send weather data with AI insight; returns whether every location was
+    # fetched and published
     try:
         logger.info("Sending weather data with AI insight")
         
-        # Get weather data with AI insight
-        weather_json = weather_service.get_weather_data(include_ai_insight=True)
+        locations = monitored_locations()
+        if not locations:
+            logger.info("No locations in this shard")
+            return True
         
-        # Publish to RabbitMQ
-        publisher.publish(weather_json)
-        
-        # Generate exports
-        export_service.export_csv(weather_json)
-        export_service.export_excel(weather_json)
+        with metrics.tick("insight", METRICS["tick_summary"]):
+            # Get weather data with AI insight for every monitored location
+            payloads = weather_service.get_weather_data_batch(locations, include_ai_insight=True)
+            published = publish_and_export(payloads)
+            
+            # Insights that were too slow for the base payloads follow separately
+            followups = weather_service.collect_late_insights()
+            if followups and not publish_and_export(followups, export=False):
+                published = False
+        return published and len(payloads) == len(locations)
         
     except Exception as e:
         logger.error(f"Error sending weather data with insight: {e}")
+        return False
 
-def main():
-    # Main application loop
-    logger.info("=== Weather Producer Started ===")
-    logger.info(f"Schedule: Data every {SCHEDULE['data_interval_minutes']} min, Insights every {SCHEDULE['insight_interval_hours']} hour")
+def run_once(include_ai_insight=False):
+    # One-shot run: fetch, publish and export once; returns whether it all
+    # succeeded, including delivery of what went through the outbox
+    if include_ai_insight:
+        succeeded = send_weather_data_with_insight()
+    else:
+        succeeded = send_weather_data()
+    if isinstance(publisher, OutboxPublisher) and not publisher.flush():
+        logger.error(f"{publisher.outbox.pending()} message(s) still undelivered")
+        succeeded = False
+    return succeeded
+
+def run_sync():
+    # Synchronous schedule loop: one tick at a time on this thread
+    # Shards start (and so keep ticking) at staggered offsets
+    if shard:
+        time.sleep(shard.stagger_offset(SCHEDULE["data_interval_minutes"] * 60))
     
     # Initial run with insight
     send_weather_data_with_insight()
@@ -70,6 +150,131 @@ def main():
         schedule.run_pending()
         time.sleep(1)
 
+def refresh_due_locations(scheduler):
+    # Adaptive tick: refresh the locations that are due, then reschedule them
+    due = scheduler.pop_due()
+    if not due:
+        return
+    payloads = []
+    try:
+        with metrics.tick("adaptive", METRICS["tick_summary"]):
+            plain, with_insight = scheduler.split_insight(due)
+            logger.info(f"Refreshing {len(due)} due location(s), {len(with_insight)} with AI insight")
+            for group, include_ai_insight in ((plain, False), (with_insight, True)):
+                # Fast refreshes bypass the API cache, which holds the
+                # response until the next model update
+                for locations, refresh in zip(scheduler.split_refresh(group), (False, True)):
+                    if locations:
+                        batch = weather_service.get_weather_data_batch(
+                            locations, include_ai_insight=include_ai_insight, refresh=refresh
+                        )
+                        # Locations left without a payload are retried soon
+                        if publish_and_export(batch):
+                            payloads += batch
+                        else:
+                            logger.warning(f"{len(batch)} payload(s) not confirmed, retrying them soon")
+            
+            # Insights that were too slow for the base payloads follow separately
+            if with_insight:
+                followups = weather_service.collect_late_insights()
+                if followups and not publish_and_export(followups, export=False):
+                    logger.warning(f"{len(followups)} insight follow-up(s) not confirmed, retrying them soon")
+                    failed = {slugify(followup["location"].get("city", "")) for followup in followups}
+                    payloads = [p for p in payloads if slugify(p["location"].get("city", "")) not in failed]
+    
+    except Exception as e:
+        logger.error(f"Error refreshing due locations: {e}")
+    finally:
+        scheduler.complete(due, payloads)
+
+def run_adaptive(scheduler):
+    # Adaptive loop: per-location refreshes aligned to model updates
+    while True:
+        if shard and shard.refresh():
+            scheduler.set_locations(shard.locations)
+        refresh_due_locations(scheduler)
+        logger.info(f"Refresh scheduler: {scheduler.stats()}")
+        # Wake up at least once per interval to notice shard rebalances
+        time.sleep(scheduler.next_wakeup())
+
+def run_async():
+    # Asyncio pipeline: overlapping fetches, bounded publish/export stages
+    import asyncio
+    from src.pipeline.async_runner import AsyncProducer
+    producer = AsyncProducer(
+        weather_service, publisher, exporter, locations=monitored_locations, snapshot=snapshot,
+        change_detector=change_detector,
+        start_delay_seconds=shard.stagger_offset(SCHEDULE["data_interval_minutes"] * 60) if shard else 0.0
+    )
+    asyncio.run(producer.run())
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Weather producer")
+    parser.add_argument("--mode", choices=["sync", "async", "adaptive"], default=RUNNER["mode"], help="runner mode (default: RUN_MODE or sync)")
+    parser.add_argument("--once", action="store_true", help="fetch, publish and export once, then exit")
+    parser.add_argument("--insight", action="store_true", help="with --once, include AI insights")
+    parser.add_argument("--shards", type=int, help="run this many shard processes, each owning part of the locations")
+    args = parser.parse_args()
+    if args.shards and args.once:
+        parser.error("--shards cannot be combined with --once")
+    return args
+
+def main():
+    # Main application loop
+    setup_logging()
+    args = parse_args()
+    if args.shards:
+        logger.info(f"=== Weather Producer Started: {args.shards} shard process(es) ===")
+        run_shards(args.shards, ["--mode", args.mode])
+        return
+    
+    logger.info("=== Weather Producer Started ===")
+    init_services(once=args.once)
+    
+    if args.once:
+        logger.info(f"Monitoring {len(monitored_locations())} location(s), single run")
+        # A non-zero exit status tells cron or a healthcheck that the run failed
+        if not run_once(args.insight):
+            sys.exit(1)
+        return
+    
+    logger.info(f"Monitoring {len(monitored_locations())} location(s), {args.mode} runner")
+    logger.info(f"Schedule: Data every {SCHEDULE['data_interval_minutes']} min, Insights every {SCHEDULE['insight_interval_hours']} hour")
+    # The first tick includes insights: load the OpenAI SDK while it fetches
+    weather_service.preload_ai_service()
+    
+    scheduler = None
+    if args.mode == "adaptive":
+        from src.pipeline.refresh_scheduler import RefreshScheduler
+        scheduler = RefreshScheduler(
+            monitored_locations(), weather_service.location_index,
+            offset_seconds=shard.stagger_offset(ADAPTIVE_SCHEDULE["jitter_seconds"]) if shard else 0.0
+        )
+    
+    if API_SERVER["enabled"]:
+        from src.api.flask_server import start_api_server
+        stats = {
+            "publish": change_detector.stats,
+            "api_cache": weather_service.api_client.cache_stats,
+            "logging": log_stats
+        }
+        if export_executor:
+            stats["exports"] = export_executor.stats
+        if isinstance(publisher, OutboxPublisher):
+            stats["outbox"] = publisher.stats
+        if scheduler:
+            stats["scheduler"] = scheduler.stats
+        if shard:
+            stats["shard"] = shard.stats
+        start_api_server(stats=stats)
+    
+    if args.mode == "async":
+        run_async()
+    elif args.mode == "adaptive":
+        run_adaptive(scheduler)
+    else:
+        run_sync()
+
 if __name__ == "__main__":
     try:
         main()
@@ -77,3 +282,8 @@ if __name__ == "__main__":
         logger.info("=== Weather Producer Stopped ===")
     except Exception as e:
         logger.critical(f"Critical error: {e}", exc_info=True)
+    finally:
+        if export_executor:
+            export_executor.shutdown(EXPORT_EXECUTOR["shutdown_timeout_seconds"])
+        if publisher:
+            publisher.close()
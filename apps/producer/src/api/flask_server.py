@@ -0,0 +1,84 @@
+"""Read API serving the latest processed payload per location
+
+Responses come straight from the in-process PayloadSnapshot: bodies are
+pre-serialized and pre-gzipped, ETags are precomputed, and a request never
+triggers an upstream fetch.
+"""
+import logging
+import threading
+
+from flask import Flask, Response, jsonify, request
+from werkzeug.serving import make_server
+
+from config.settings import API_SERVER, METRICS
+from src.api.snapshot import snapshot as default_snapshot
+from src.utils.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+def create_app(snapshot=None, stats=None):
+    """Create the Flask app serving ``snapshot`` (default: the shared one)
+
+    ``stats`` optionally maps names to callables returning counter dicts,
+    reported by /health (e.g. the change-detection counters) and, as gauges,
+    by /metrics.
+    """
+    snapshot = snapshot or default_snapshot
+    app = Flask(__name__)
+
+    def serve(entry):
+        if entry is None:
+            return jsonify({"error": "No data available for this location yet"}), 404
+
+        # The gzip and identity bodies are different representations, so
+        # each gets its own strong ETag
+        gzipped = "gzip" in request.accept_encodings
+        etag = f"{entry.etag}-gz" if gzipped else entry.etag
+        headers = {
+            "ETag": f'"{etag}"',
+            "Cache-Control": "no-cache",
+            "Vary": "Accept-Encoding",
+        }
+        if request.if_none_match.contains(etag):
+            return Response(status=304, headers=headers)
+
+        body = entry.body
+        if gzipped:
+            body = entry.gzip_body
+            headers["Content-Encoding"] = "gzip"
+        return Response(body, status=200, headers=headers, content_type="application/json; charset=utf-8")
+
+    @app.get("/health")
+    def health():
+        body = {"status": "ok", "locations": len(snapshot.locations())}
+        for name, provider in (stats or {}).items():
+            body[name] = provider()
+        return jsonify(body)
+
+    if METRICS["enabled"]:
+        for name, provider in (stats or {}).items():
+            registry.add_stats_provider(name, provider)
+
+        @app.get("/metrics")
+        def metrics():
+            return Response(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+    @app.get("/weather")
+    def all_locations():
+        return serve(snapshot.get())
+
+    @app.get("/weather/<city>")
+    def location(city):
+        return serve(snapshot.get(city))
+
+    return app
+
+def start_api_server(snapshot=None, host=None, port=None, stats=None):
+    """Serve the read API from a daemon thread; returns the server"""
+    host = host or API_SERVER["host"]
+    port = port or API_SERVER["port"]
+    server = make_server(host, port, create_app(snapshot, stats), threaded=True)
+    thread = threading.Thread(target=server.serve_forever, name="api-server", daemon=True)
+    thread.start()
+    logger.info(f"Read API listening on http://{host}:{port}")
+    return server
@@ -0,0 +1,93 @@
+"""In-memory tier of the Open-Meteo response cache
+
+Holds the decoded responses of recent requests so a warm hit skips the
+SQLite read and the FlatBuffers parse of the disk tier (requests_cache).
+Entries are bounded by the size of their response buffers and expire at
+the next upstream model update.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+# Size assumed for responses that do not expose their buffer
+DEFAULT_ENTRY_BYTES = 16 * 1024
+
+def next_model_update(now, interval_seconds, offset_seconds=0):
+    """Return the timestamp of the first model update after ``now``"""
+    return ((now - offset_seconds) // interval_seconds + 1) * interval_seconds + offset_seconds
+
+def cache_key(params):
+    """Build a hashable key from request params (lists joined, keys sorted)"""
+    return tuple(sorted(
+        (name, ",".join(map(str, value)) if isinstance(value, (list, tuple)) else str(value))
+        for name, value in params.items()
+    ))
+
+def _response_bytes(responses):
+    # Responses of one request share the FlatBuffers buffer of the HTTP body
+    buffer = getattr(getattr(responses[0], "_tab", None), "Bytes", None) if responses else None
+    return len(buffer) if buffer is not None else DEFAULT_ENTRY_BYTES * max(len(responses), 1)
+
+class ResponseCache:
+    """Thread-safe LRU of decoded responses, bounded by bytes, with expiry"""
+
+    def __init__(self, max_bytes, clock=time.time):
+        """Initialize the cache
+
+        Args:
+            max_bytes (int): Total response bytes kept before the least
+                recently used entries are evicted
+            clock: Function returning the current timestamp
+        """
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.size_bytes = 0
+        # key -> (responses, size in bytes, expiry timestamp)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached responses for ``key``, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[2] <= self.clock():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, responses, expires_at):
+        """Store responses until ``expires_at``, evicting LRU entries over the bound"""
+        size = _response_bytes(responses)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (responses, size, expires_at)
+            self.size_bytes += size
+            while self.size_bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def stats(self):
+        """Return hit/miss/eviction counters and the current size"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self.size_bytes,
+            }
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self.size_bytes -= size
@@ -0,0 +1,84 @@
+"""In-process snapshot of the latest payload per location
+
+The scheduler calls ``update`` after each run; the read API only ever looks
+at the current snapshot, so requests never trigger an upstream fetch. Each
+location's entry is serialized, gzipped and hashed once at update time, and
+the whole mapping is swapped in with a single assignment so readers always
+see a consistent snapshot without taking a lock. The all-locations document
+is built on the first read after an update, so batches that nobody reads in
+between cost nothing.
+"""
+import gzip
+import hashlib
+import threading
+import time
+from collections import namedtuple
+
+from src.messaging.serializers import JSON
+from src.utils.parsers import slugify
+
+SnapshotEntry = namedtuple("SnapshotEntry", ["body", "gzip_body", "etag", "updated_at"])
+
+def _make_entry(body, updated_at):
+    etag = hashlib.blake2b(body, digest_size=12).hexdigest()
+    return SnapshotEntry(body, gzip.compress(body, compresslevel=6), etag, updated_at)
+
+class PayloadSnapshot:
+    """Latest serialized payload per location, updated atomically"""
+
+    def __init__(self):
+        self._entries = {}
+        self._payloads = {}
+        self._write_lock = threading.Lock()
+        # (entries it was built from, entry) of the all-locations document
+        self._all = None
+        self._all_lock = threading.Lock()
+
+    def update(self, payloads):
+        """Replace the entries of the given payloads' locations
+
+        Args:
+            payloads (list): Payloads from the latest run
+        """
+        if not payloads:
+            return
+        now = time.time()
+        with self._write_lock:
+            new_payloads = dict(self._payloads)
+            new_entries = dict(self._entries)
+            for payload in payloads:
+                key = slugify(payload.get("location", {}).get("city", ""))
+                new_payloads[key] = payload
+                new_entries[key] = _make_entry(JSON.dumps(payload), now)
+            self._payloads = new_payloads
+            self._entries = new_entries
+
+    def get(self, city=None):
+        """Return the SnapshotEntry for a city (or all locations), or None"""
+        if city is None:
+            return self._all_locations()
+        return self._entries.get(slugify(city))
+
+    def _all_locations(self):
+        # JSON array of the location bodies, rebuilt once per update
+        entries = self._entries
+        cached = self._all
+        if cached is not None and cached[0] is entries:
+            return cached[1]
+        if not entries:
+            return None
+        with self._all_lock:
+            cached = self._all
+            if cached is None or cached[0] is not entries:
+                body = b"[" + b",".join(entry.body for entry in entries.values()) + b"]"
+                updated_at = max(entry.updated_at for entry in entries.values())
+                cached = (entries, _make_entry(body, updated_at))
+                self._all = cached
+            return cached[1]
+
+    def locations(self):
+        """Return the cities currently in the snapshot"""
+        return [payload.get("location", {}).get("city") for payload in self._payloads.values()]
+
+# Shared snapshot updated by the scheduler and served by the Flask API
+snapshot = PayloadSnapshot()
@@ -1,28 +1,107 @@
 # Weather API Client Module
-import openmeteo_requests
-import requests_cache
-from retry_requests import retry
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
 import logging
-from config.settings import OPEN_METEO_URL, CACHE_EXPIRE_SECONDS
+from config.settings import OPEN_METEO_URL, API_CACHE
+from src.api.response_cache import ResponseCache, cache_key, next_model_update
+from src.utils.metrics import API_CACHE_REQUESTS
 
 logger = logging.getLogger(__name__)
 
 class WeatherAPIClient:
-    # Client for OpenMeteo weather API    
-    def __init__(self):
-        # Initialize API client with caching and retry mechanism
-        cache_session = requests_cache.CachedSession('.cache', expire_after=CACHE_EXPIRE_SECONDS)
-        retry_session = retry(cache_session, retries=5, backoff_factor=0.2)
+    # Client for OpenMeteo weather API
+    def __init__(self, cache_path=None):
+        # Initialize API client with a two-tier cache (decoded responses in
+        # memory, raw responses in SQLite) and retry mechanism. The HTTP stack
+        # is imported here, not at module level, to keep startup light
+        import openmeteo_requests
+        import requests_cache
+        from retry_requests import retry
+        
+        self.cache_session = requests_cache.CachedSession(
+            cache_path or API_CACHE["path"], expire_after=API_CACHE["model_update_seconds"]
+        )
+        # Disk tier hit/miss, read from every response (cached ones included)
+        self.cache_session.hooks["response"].append(self._count_disk_lookup)
+        retry_session = retry(self.cache_session, retries=5, backoff_factor=0.2)
         self.client = openmeteo_requests.Client(session=retry_session)
+        self.memory_cache = ResponseCache(API_CACHE["memory_max_bytes"])
+        self._next_maintenance = time.monotonic() + API_CACHE["maintenance_interval_seconds"]
+        self._maintenance_lock = threading.Lock()
         logger.info("Weather API client initialized")
-    
+
     def fetch_weather_data(self, params):
-        # Fetch weather data from API
+        # Fetch weather data from API for a single location
+        return self.fetch_weather_batch(params)[0]
+
+    def fetch_weather_batch(self, params, refresh=False):
+        # Fetch weather data from API, one response per comma-separated location.
+        # Decoded responses are served from memory until the next model update;
+        # refresh=True skips both cache tiers and stores the new response
+        key = cache_key(params)
+        if refresh:
+            API_CACHE_REQUESTS.inc("memory", "bypass")
+        else:
+            responses = self.memory_cache.get(key)
+            if responses is not None:
+                API_CACHE_REQUESTS.inc("memory", "hit")
+                logger.debug("Weather data served from memory (%d locations)", len(responses))
+                return responses
+            API_CACHE_REQUESTS.inc("memory", "miss")
+
+        expires_at = next_model_update(
+            time.time(), API_CACHE["model_update_seconds"], API_CACHE["model_update_offset_seconds"]
+        )
         try:
-            logger.debug(f"Fetching weather data with params: {params}")
-            response = self.client.weather_api(OPEN_METEO_URL, params=params)
-            logger.info("Weather data fetched successfully")
-            return response[0]
+            logger.debug("Fetching weather data with params: %s", params)
+            # The disk tier expires at the same model update as the memory tier.
+            # The expiry goes with the request: fetch threads share the session
+            responses = self.client.weather_api(
+                OPEN_METEO_URL, params=params, force_refresh=refresh,
+                expire_after=datetime.fromtimestamp(expires_at, timezone.utc)
+            )
+            logger.info(f"Weather data fetched successfully ({len(responses)} locations)")
         except Exception as e:
             logger.error(f"Error fetching weather data: {e}")
             raise
+
+        self.memory_cache.put(key, responses, expires_at)
+        self._maybe_run_maintenance()
+        return responses
+
+    def cache_stats(self):
+        # Hit/miss/eviction counters of the memory tier plus the disk tier size
+        stats = self.memory_cache.stats()
+        try:
+            stats["disk_responses"] = len(self.cache_session.cache.responses)
+            stats["disk_bytes"] = os.path.getsize(self.cache_session.cache.db_path)
+        except (OSError, sqlite3.Error, AttributeError) as e:
+            # Called by /health and /metrics; the memory tier stats still go out
+            logger.debug(f"API cache disk stats unavailable: {e}")
+        return stats
+
+    def _count_disk_lookup(self, response, *args, **kwargs):
+        # requests hook: record whether requests_cache served the response. The
+        # hook also runs on the raw response of a miss, before requests_cache
+        # tags it with from_cache; only the tagged call is counted
+        from_cache = getattr(response, "from_cache", None)
+        if from_cache is not None:
+            API_CACHE_REQUESTS.inc("disk", "hit" if from_cache else "miss")
+        return response
+
+    def _maybe_run_maintenance(self):
+        # Periodically delete expired SQLite rows and vacuum the file; only one
+        # worker thread runs it, the others skip
+        if time.monotonic() < self._next_maintenance or not self._maintenance_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_maintenance = time.monotonic() + API_CACHE["maintenance_interval_seconds"]
+            self.cache_session.cache.delete(expired=True, vacuum=True)
+            logger.info(f"API cache maintenance done: {self.cache_stats()}")
+        except Exception as e:
+            logger.warning(f"API cache maintenance failed: {e}")
+        finally:
+            self._maintenance_lock.release()
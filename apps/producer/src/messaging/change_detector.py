@@ -0,0 +1,190 @@
+"""Change detection for outgoing payloads
+
+Payload sections are fingerprinted without their volatile fields. Depending
+on the mode, an unchanged payload is published, suppressed, or replaced by a
+delta against the last confirmed message (``seq``/``baseSeq``, the changed
+sections, ``dailyChanges``/``dailyRemoved``). A keyframe still goes out every
+``keyframe_interval_seconds``.
+"""
+import hashlib
+import json
+import logging
+import time
+
+from config.settings import CHANGE_DETECTION
+from src.utils.parsers import slugify
+
+logger = logging.getLogger(__name__)
+
+MODES = ("full", "suppress", "delta")
+
+# Fields left out of the fingerprints: they change on every run without the
+# weather changing
+VOLATILE_FIELDS = {"current": ("time",)}
+# Only present on insight runs (and follow-ups): a payload carrying them is
+# always published, and deltas copy them as they are
+CARRIED_FIELDS = ("aiInsight", "insightFollowUp")
+
+def _digest(value):
+    data = json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.blake2b(data.encode("utf-8"), digest_size=8).hexdigest()
+
+def section_fingerprints(payload):
+    """Fingerprint each section of a payload
+
+    Args:
+        payload (dict): Weather payload
+
+    Returns:
+        tuple: (sections, daily) where ``sections`` maps each top-level key
+            except location, daily and the carried fields to a digest and ``daily`` maps each daily
+            date to a digest, both with volatile fields excluded
+    """
+    sections = {}
+    for key, value in payload.items():
+        if key in ("location", "daily") or key in CARRIED_FIELDS:
+            continue
+        volatile = VOLATILE_FIELDS.get(key)
+        if volatile and isinstance(value, dict):
+            value = {k: v for k, v in value.items() if k not in volatile}
+        sections[key] = _digest(value)
+    daily = {day.get("date"): _digest(day) for day in payload.get("daily", [])}
+    return sections, daily
+
+def payload_fingerprint(payload):
+    """Return a single digest of a payload with volatile fields excluded"""
+    sections, daily = section_fingerprints(payload)
+    return _digest([sorted(sections.items()), list(daily.items())])
+
+class ChangeDetector:
+    """Filters payloads before publishing according to the change-detection mode
+
+    Used from the publish stage only (one batch at a time). State for a
+    location is only advanced once its message is confirmed by the broker;
+    a location whose message was not confirmed gets a keyframe next time.
+    """
+
+    def __init__(self, mode=None, keyframe_interval_seconds=None):
+        """Initialize the detector
+
+        Args:
+            mode (str): "full" (publish everything), "suppress" (skip
+                unchanged payloads) or "delta" (send changed sections only)
+            keyframe_interval_seconds (int): Maximum time between full
+                messages for a location in the suppress and delta modes
+        """
+        mode = mode or CHANGE_DETECTION["mode"]
+        if mode not in MODES:
+            logger.warning(f"Unknown change-detection mode '{mode}', publishing full payloads")
+            mode = "full"
+        self.mode = mode
+        self.keyframe_interval_seconds = (
+            CHANGE_DETECTION["keyframe_interval_seconds"]
+            if keyframe_interval_seconds is None else keyframe_interval_seconds
+        )
+        self.full = 0
+        self.deltas = 0
+        self.suppressed = 0
+        self.unconfirmed = 0
+        self._states = {}
+        self._pending = []
+
+    def prepare(self, payloads):
+        """Return the messages to publish for a batch of payloads
+
+        Must be followed by ``commit`` with the number of confirmed messages.
+        """
+        now = time.time()
+        messages = []
+        self._pending = []
+        for payload in payloads:
+            key = slugify(payload.get("location", {}).get("city", ""))
+            if self.mode == "full":
+                messages.append(payload)
+                self._pending.append((key, None, "full"))
+                continue
+
+            sections, daily = section_fingerprints(payload)
+            state = self._states.get(key)
+            keyframe_due = state is None or now - state["keyframe_at"] >= self.keyframe_interval_seconds
+
+            changed = [] if state is None else [k for k, v in sections.items() if state["sections"].get(k) != v]
+            changed_days = [] if state is None else [d for d, v in daily.items() if state["daily"].get(d) != v]
+            removed_days = [] if state is None else [d for d in state["daily"] if d not in daily]
+            carried = [field for field in CARRIED_FIELDS if field in payload]
+
+            if not keyframe_due and not (changed or changed_days or removed_days or carried):
+                self.suppressed += 1
+                continue
+
+            seq = 1 if state is None else state["seq"] + 1
+            new_state = {
+                "seq": seq,
+                "sections": sections,
+                "daily": daily,
+                "keyframe_at": now if keyframe_due or self.mode == "suppress" else state["keyframe_at"],
+            }
+
+            if self.mode == "suppress":
+                messages.append(payload)
+                self._pending.append((key, new_state, "full"))
+            elif keyframe_due:
+                messages.append({**payload, "seq": seq, "keyframe": True})
+                self._pending.append((key, new_state, "full"))
+            else:
+                delta = {
+                    "location": payload["location"],
+                    "delta": True,
+                    "seq": seq,
+                    "baseSeq": state["seq"],
+                    "current": payload.get("current"),
+                }
+                for k in changed:
+                    delta[k] = payload[k]
+                if changed_days:
+                    wanted = set(changed_days)
+                    delta["dailyChanges"] = [day for day in payload.get("daily", []) if day.get("date") in wanted]
+                if removed_days:
+                    delta["dailyRemoved"] = removed_days
+                for field in carried:
+                    delta[field] = payload[field]
+                messages.append(delta)
+                self._pending.append((key, new_state, "delta"))
+        return messages
+
+    def commit(self, confirmed):
+        """Advance the state of the first ``confirmed`` prepared messages"""
+        for index, (key, new_state, kind) in enumerate(self._pending):
+            if index < confirmed:
+                if new_state is not None:
+                    self._states[key] = new_state
+                if kind == "delta":
+                    self.deltas += 1
+                else:
+                    self.full += 1
+            else:
+                # Unknown delivery state: resync with a keyframe next time
+                self._states.pop(key, None)
+                self.unconfirmed += 1
+        self._pending = []
+
+    def publish(self, publisher, payloads):
+        """Prepare, publish and commit one batch; returns the confirmed count"""
+        messages = self.prepare(payloads)
+        confirmed = publisher.publish_many(messages) if messages else 0
+        self.commit(confirmed)
+        if self.mode != "full":
+            logger.info(
+                f"Change detection ({self.mode}): {len(messages)}/{len(payloads)} published, "
+                f"totals {self.stats()}"
+            )
+        return confirmed
+
+    def stats(self):
+        """Return full/delta/suppressed/unconfirmed message counters"""
+        return {
+            "full": self.full,
+            "delta": self.deltas,
+            "suppressed": self.suppressed,
+            "unconfirmed": self.unconfirmed,
+        }
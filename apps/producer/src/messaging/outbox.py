@@ -0,0 +1,378 @@
+"""Durable on-disk outbox in front of the RabbitMQ publisher
+
+Messages are appended to a segmented log and replayed in order by a
+background drainer. A record is a (seq, length, CRC32) header followed by
+``queue\\0content-type\\0body``; the last confirmed seq is kept in ``ack``.
+"""
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+
+from config.settings import OUTBOX
+from src.messaging.publisher import EncodedMessage
+from src.utils.metrics import STAGE_SECONDS, PUBLISH_RETRIES
+
+logger = logging.getLogger(__name__)
+
+# seq, payload length, CRC32 of the payload
+RECORD_HEADER = struct.Struct(">QII")
+SEGMENT_SUFFIX = ".log"
+ACK_FILE = "ack"
+
+class OutboxRecord:
+    """One undelivered message read back from the log"""
+
+    __slots__ = ("seq", "queue", "message", "segment", "end")
+
+    def __init__(self, seq, queue, message, segment, end):
+        self.seq = seq
+        self.queue = queue
+        self.message = message
+        self.segment = segment
+        self.end = end
+
+class Outbox:
+    """Append-only segmented log of encoded messages with an ack cursor"""
+
+    def __init__(self, path=None, segment_max_bytes=None, fsync=None):
+        """Open (or create) the outbox and recover its state
+
+        Args:
+            path (str): Directory holding the segments (default: OUTBOX["path"])
+            segment_max_bytes (int): Size after which a new segment is started
+            fsync (bool): fsync every append instead of only flushing it
+        """
+        self.path = path or OUTBOX["path"]
+        self.segment_max_bytes = segment_max_bytes or OUTBOX["segment_max_bytes"]
+        self.fsync = OUTBOX["fsync"] if fsync is None else fsync
+        self.appended = 0
+        self.delivered = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.path, exist_ok=True)
+
+        self._acked_seq = self._load_ack()
+        self._segments = self._list_segments()
+        self._last_seq = self._recover_tail()
+        # Read cursor: (segment first seq, offset) of the first unacked record
+        self._cursor = self._find_cursor()
+        self._writer = None
+        if not self._segments:
+            self._segments.append(self._last_seq + 1)
+        pending = self._last_seq - self._acked_seq
+        if pending:
+            logger.info(f"Outbox recovered {pending} undelivered message(s) from {self.path}")
+
+    def append(self, queue, messages):
+        """Append encoded messages for ``queue``
+
+        Args:
+            queue (str): Destination queue
+            messages (list): EncodedMessage items
+
+        Returns:
+            int: Sequence number of the last appended message
+        """
+        prefix = f"{queue}\0".encode("utf-8")
+        with self._lock:
+            writer = self._active_writer()
+            for message in messages:
+                self._last_seq += 1
+                payload = prefix + f"{message.content_type}\0".encode("utf-8") + message.body
+                writer.write(RECORD_HEADER.pack(self._last_seq, len(payload), zlib.crc32(payload)))
+                writer.write(payload)
+            writer.flush()
+            if self.fsync:
+                os.fsync(writer.fileno())
+            self.appended += len(messages)
+            if writer.tell() >= self.segment_max_bytes:
+                self._roll_segment()
+            return self._last_seq
+
+    def read_batch(self, max_messages):
+        """Return up to ``max_messages`` undelivered records, oldest first,
+        without moving the ack cursor"""
+        with self._lock:
+            if self._writer is not None:
+                self._writer.flush()
+            records = []
+            segment, offset = self._cursor
+            for first in self._segments:
+                if first < segment:
+                    continue
+                start = offset if first == segment else 0
+                for record in self._read_segment(first, start):
+                    if record.seq > self._acked_seq:
+                        records.append(record)
+                        if len(records) >= max_messages:
+                            return records
+            return records
+
+    def ack(self, record):
+        """Mark every message up to ``record`` (returned by read_batch) as delivered"""
+        with self._lock:
+            if record.seq <= self._acked_seq:
+                return
+            self.delivered += record.seq - self._acked_seq
+            self._acked_seq = record.seq
+            self._cursor = (record.segment, record.end)
+            self._save_ack()
+            # Delete segments whose messages were all delivered
+            while len(self._segments) > 1 and self._segments[1] <= self._acked_seq + 1:
+                self._remove_segment(self._segments.pop(0))
+            if self._acked_seq == self._last_seq and self._cursor[1] > 0:
+                # Everything delivered: start a fresh segment so the file does not grow
+                self._roll_segment()
+
+    def pending(self):
+        """Number of appended messages not yet delivered"""
+        with self._lock:
+            return self._last_seq - self._acked_seq
+
+    def stats(self):
+        """Return append/delivery counters and the on-disk backlog"""
+        with self._lock:
+            size = 0
+            for first in self._segments:
+                try:
+                    size += os.path.getsize(self._segment_path(first))
+                except OSError:
+                    pass
+            return {
+                "appended": self.appended,
+                "delivered": self.delivered,
+                "pending": self._last_seq - self._acked_seq,
+                "segments": len(self._segments),
+                "bytes": size,
+            }
+
+    def close(self):
+        """Flush and close the active segment"""
+        with self._lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+    def _active_writer(self):
+        if self._writer is None:
+            self._writer = open(self._segment_path(self._segments[-1]), "ab")
+        return self._writer
+
+    def _roll_segment(self):
+        # Close the active segment and start a new one at the next seq
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        first = self._last_seq + 1
+        if self._acked_seq == self._last_seq:
+            for old in self._segments:
+                self._remove_segment(old)
+            self._segments = []
+        self._segments.append(first)
+        if self._cursor[0] < self._segments[0]:
+            self._cursor = (self._segments[0], 0)
+
+    def _segment_path(self, first):
+        return os.path.join(self.path, f"{first:020d}{SEGMENT_SUFFIX}")
+
+    def _remove_segment(self, first):
+        try:
+            os.remove(self._segment_path(first))
+        except FileNotFoundError:
+            pass
+
+    def _list_segments(self):
+        return sorted(
+            int(name[:-len(SEGMENT_SUFFIX)]) for name in os.listdir(self.path)
+            if name.endswith(SEGMENT_SUFFIX) and name[:-len(SEGMENT_SUFFIX)].isdigit()
+        )
+
+    def _read_segment(self, first, offset=0, stop_on_error=False):
+        # Yield the records of one segment from ``offset``; stops at a torn record
+        try:
+            with open(self._segment_path(first), "rb") as f:
+                f.seek(offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        position = 0
+        while position + RECORD_HEADER.size <= len(data):
+            seq, length, crc = RECORD_HEADER.unpack_from(data, position)
+            start = position + RECORD_HEADER.size
+            payload = data[start:start + length]
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                return
+            queue, content_type, body = payload.split(b"\0", 2)
+            position = start + length
+            yield OutboxRecord(
+                seq, queue.decode("utf-8"), EncodedMessage(body, content_type.decode("utf-8")),
+                first, offset + position
+            )
+
+    def _recover_tail(self):
+        # Last seq on disk; cut a torn record off the end of the last segment
+        last_seq = self._acked_seq
+        if not self._segments:
+            return last_seq
+        first = self._segments[-1]
+        end = 0
+        for record in self._read_segment(first):
+            last_seq, end = record.seq, record.end
+        path = self._segment_path(first)
+        if os.path.getsize(path) > end:
+            logger.warning(f"Outbox: truncating torn record at the end of {path}")
+            with open(path, "r+b") as f:
+                f.truncate(end)
+        return max(last_seq, first - 1, self._acked_seq)
+
+    def _find_cursor(self):
+        # Position of the first record after the ack cursor
+        for first in self._segments:
+            end = 0
+            for record in self._read_segment(first):
+                if record.seq > self._acked_seq:
+                    return first, end
+                end = record.end
+        return (self._segments[-1], 0) if self._segments else (self._acked_seq + 1, 0)
+
+    def _load_ack(self):
+        try:
+            with open(os.path.join(self.path, ACK_FILE), encoding="utf-8") as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+        except ValueError as e:
+            logger.warning(f"Outbox: unreadable ack file, replaying from the start: {e}")
+            return 0
+
+    def _save_ack(self):
+        path = os.path.join(self.path, ACK_FILE)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(str(self._acked_seq))
+        os.replace(tmp_path, path)
+
+class OutboxPublisher:
+    """Publisher stand-in that writes to the outbox and drains it in the background
+
+    Exposes ``publish``/``publish_many``/``close`` like RabbitMQPublisher, so
+    the change detector and the runners use it unchanged. ``publish_many``
+    returns the number of messages durably queued.
+    """
+
+    def __init__(self, publisher, outbox=None, batch_size=None, retry_initial_seconds=None,
+                 retry_max_seconds=None):
+        """Initialize the outbox publisher and start the drainer thread
+
+        Args:
+            publisher: RabbitMQPublisher used by the drainer (and to serialize)
+            outbox (Outbox): Log to write to (default: Outbox())
+            batch_size (int): Messages replayed per publish_many call
+            retry_initial_seconds (float): Wait after a failed delivery,
+                doubled up to ``retry_max_seconds``
+            retry_max_seconds (float): Longest wait between delivery attempts
+        """
+        self.publisher = publisher
+        self.outbox = outbox or Outbox()
+        self.batch_size = batch_size or OUTBOX["batch_size"]
+        self.retry_initial_seconds = retry_initial_seconds or OUTBOX["retry_initial_seconds"]
+        self.retry_max_seconds = retry_max_seconds or OUTBOX["retry_max_seconds"]
+        self.queue = publisher.config["queue"]
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._drainer = threading.Thread(target=self._drain, name="outbox-drainer", daemon=True)
+        self._drainer.start()
+        logger.info(f"Outbox publisher started ({self.outbox.path}, {self.outbox.pending()} pending)")
+
+    def publish(self, message, queue=None):
+        # Queue a single message (payload dict or JSON text)
+        return self.publish_many([message], queue) == 1
+
+    def publish_many(self, messages, queue=None):
+        # Serialize and append to the outbox; delivery happens on the drainer thread
+        if not messages:
+            return 0
+        encoded = [self.publisher.encode(m) for m in messages]
+        try:
+            with STAGE_SECONDS.time("outbox_append"):
+                self.outbox.append(queue or self.queue, encoded)
+        except OSError as e:
+            logger.error(f"Error writing to outbox: {e}")
+            return 0
+        self._wakeup.set()
+        return len(messages)
+
+    def stats(self):
+        """Return the outbox counters"""
+        return self.outbox.stats()
+
+    def flush(self, timeout=None):
+        """Wait for the drainer to deliver the backlog
+
+        Args:
+            timeout (float): Maximum seconds to wait (default: OUTBOX drain timeout)
+
+        Returns:
+            bool: True if nothing is left undelivered
+        """
+        deadline = time.monotonic() + (OUTBOX["drain_timeout_seconds"] if timeout is None else timeout)
+        self._wakeup.set()
+        while self.outbox.pending():
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def close(self, timeout=None):
+        # Give the drainer a chance to deliver the backlog, then stop it
+        self._stopping.set()
+        self._wakeup.set()
+        self._drainer.join(OUTBOX["drain_timeout_seconds"] if timeout is None else timeout)
+        pending = self.outbox.pending()
+        if pending:
+            logger.warning(f"Outbox closed with {pending} undelivered message(s); they are replayed on restart")
+        self.outbox.close()
+        self.publisher.close()
+
+    def _drain(self):
+        # Replay the outbox in order; back off while the broker is unreachable
+        delay = self.retry_initial_seconds
+        while True:
+            records = self.outbox.read_batch(self.batch_size)
+            if not records:
+                if self._stopping.is_set():
+                    return
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+
+            # Consecutive records for the same queue go out as one confirmed batch
+            queue = records[0].queue
+            batch = []
+            for record in records:
+                if record.queue != queue:
+                    break
+                batch.append(record)
+
+            confirmed = 0
+            try:
+                connection, _ = self.publisher.connect(max_retries=1)
+                if connection is not None:
+                    confirmed = self.publisher.publish_many([r.message for r in batch], queue)
+            except Exception as e:
+                logger.error(f"Outbox drainer error: {e}")
+            if confirmed:
+                self.outbox.ack(batch[confirmed - 1])
+            if confirmed == len(batch):
+                delay = self.retry_initial_seconds
+                continue
+
+            PUBLISH_RETRIES.inc("outbox_redelivery")
+            logger.warning(
+                f"Outbox: delivered {confirmed}/{len(batch)}, {self.outbox.pending()} pending; retrying in {delay:.1f}s"
+            )
+            if self._stopping.wait(delay):
+                return
+            delay = min(delay * 2, self.retry_max_seconds)
@@ -2,74 +2,182 @@
 import pika
 import time
 import logging
-from config.settings import RABBITMQ
+from collections import namedtuple
+from collections.abc import Mapping
+from config.settings import RABBITMQ, PUBLISHER, PAYLOAD_FORMAT
+from src.messaging.serializers import JSON, get_serializer
+from src.utils.metrics import (
+    STAGE_SECONDS, LOCATION_STAGE_SECONDS, PAYLOAD_BYTES, LOCATION_PAYLOAD_BYTES, PUBLISH_RETRIES, MESSAGES_PUBLISHED
+)
 
 logger = logging.getLogger(__name__)
 
+# A message already serialized, e.g. replayed from the outbox
+EncodedMessage = namedtuple("EncodedMessage", ["body", "content_type"])
+
 class RabbitMQPublisher:
-    def __init__(self):
-        # Initialize RabbitMQ publisher
+    def __init__(self, connection_factory=None, serializer=None):
+        # Initialize RabbitMQ publisher; the connection is opened lazily and reused
         self.config = RABBITMQ
+        self.serializer = serializer or get_serializer(PAYLOAD_FORMAT)
+        self.properties = pika.BasicProperties(content_type=self.serializer.content_type)
+        self.text_properties = pika.BasicProperties(content_type=JSON.content_type)
         self.credentials = pika.PlainCredentials(
             self.config["user"],
             self.config["password"]
         )
-        logger.info("RabbitMQ publisher initialized")
+        self.connection_factory = connection_factory or pika.BlockingConnection
+        self.connection = None
+        self.channel = None
+        self._declared_queues = set()
+        self._properties = {
+            self.serializer.content_type: self.properties,
+            JSON.content_type: self.text_properties
+        }
+        logger.info(f"RabbitMQ publisher initialized ({self.serializer.name} payloads)")
+    
+    def is_connected(self):
+        # Check whether the long-lived connection and channel are still usable
+        return bool(
+            self.connection and self.connection.is_open
+            and self.channel and self.channel.is_open
+        )
     
-    def connect(self, max_retries=10):
-        # Connect to RabbitMQ with retries
+    def connect(self, max_retries=None):
+        # Return the persistent connection, reconnecting with exponential backoff if it dropped
+        if self.is_connected():
+            return self.connection, self.channel
+        
+        self._reset()
+        max_retries = max_retries or PUBLISHER["max_retries"]
+        delay = PUBLISHER["backoff_initial_seconds"]
+        
         for attempt in range(1, max_retries + 1):
             try:
-                connection = pika.BlockingConnection(
+                connection = self.connection_factory(
                     pika.ConnectionParameters(
                         host=self.config["host"],
                         port=self.config["port"],
-                        credentials=self.credentials
+                        credentials=self.credentials,
+                        heartbeat=PUBLISHER["heartbeat_seconds"],
+                        blocked_connection_timeout=PUBLISHER["blocked_timeout_seconds"]
                     )
                 )
                 channel = connection.channel()
+                # basic_publish then returns once the broker acked the message
+                channel.confirm_delivery()
+                self.connection, self.channel = connection, channel
                 logger.info(f"Connected to RabbitMQ on attempt {attempt}")
                 return connection, channel
                 
             except Exception as e:
                 logger.warning(f"Connection attempt {attempt}/{max_retries} failed: {e}")
+                PUBLISH_RETRIES.inc("connect")
                 if attempt < max_retries:
-                    time.sleep(2)
+                    time.sleep(delay)
+                    delay = min(delay * 2, PUBLISHER["backoff_max_seconds"])
                     
         logger.error("Failed to connect to RabbitMQ after all retries")
         return None, None
     
+    def close(self):
+        # Close the persistent connection (used on shutdown)
+        try:
+            if self.connection and self.connection.is_open:
+                self.connection.close()
+        except Exception as e:
+            logger.warning(f"Error closing RabbitMQ connection: {e}")
+        finally:
+            self._reset()
+    
     def publish(self, message, queue=None):
-        # Publish message to RabbitMQ
+        # Publish a single message (payload or JSON text) and wait for the broker confirm
+        return self.publish_many([message], queue) == 1
+    
+    def publish_many(self, messages, queue=None):
+        # Publish a batch over the persistent channel, each message confirmed by the broker.
+        # Returns how many messages were confirmed, counted from the start of the batch.
         queue_name = queue or self.config["queue"]
+        if not messages:
+            return 0
         
         connection, channel = self.connect()
         if not connection or not channel:
-            return False
+            return 0
         
+        started = time.perf_counter()
+        confirmed = 0
         try:
-            # Declare queue
-            channel.queue_declare(
-                queue=queue_name,
-                durable=True,
-                exclusive=False,
-                auto_delete=False
-            )
-            
-            # Publish message
-            channel.basic_publish(
-                exchange='',
-                routing_key=queue_name,
-                body=message.encode("utf-8")
-            )
-            
-            logger.info(f"Message published to queue '{queue_name}'")
-            return True
+            self._declare_queue(channel, queue_name)
+            for message in messages:
+                body, properties = self._encode(message)
+                channel.basic_publish(
+                    exchange='',
+                    routing_key=queue_name,
+                    body=body,
+                    properties=properties
+                )
+                confirmed += 1
+                
+        except pika.exceptions.NackError:
+            # The broker refused the message; the channel is still usable
+            logger.error(f"Message {confirmed + 1} of the batch was rejected by the broker")
             
         except Exception as e:
+            PUBLISH_RETRIES.inc("publish_error")
             logger.error(f"Error publishing message: {e}")
-            return False
-            
-        finally:
-            if connection:
-                connection.close()
+            # Drop the broken connection; the next publish reconnects lazily
+            self.close()
+        
+        STAGE_SECONDS.observe(time.perf_counter() - started, "publish")
+        MESSAGES_PUBLISHED.inc(amount=confirmed)
+        if confirmed < len(messages):
+            PUBLISH_RETRIES.inc("unconfirmed", amount=len(messages) - confirmed)
+            logger.error(f"Only {confirmed}/{len(messages)} messages confirmed on queue '{queue_name}'")
+        else:
+            logger.info(f"{confirmed} message(s) published to queue '{queue_name}'")
+        return confirmed
+    
+    def encode(self, message):
+        # Serialize a message once, keeping its content type (for the outbox)
+        body, properties = self._encode(message)
+        return EncodedMessage(body, properties.content_type)
+    
+    def _encode(self, message):
+        # Payloads (WeatherPayload or dict) are serialized once, here; str/bytes
+        # are already JSON text
+        if isinstance(message, EncodedMessage):
+            properties = self._properties.get(message.content_type)
+            if properties is None:
+                properties = self._properties[message.content_type] = pika.BasicProperties(
+                    content_type=message.content_type
+                )
+            return message.body, properties
+        if isinstance(message, Mapping):
+            started = time.perf_counter()
+            body = self.serializer.dumps(message)
+            city = message.get("location", {}).get("city", "")
+            LOCATION_STAGE_SECONDS.observe(time.perf_counter() - started, "serialize", city)
+            PAYLOAD_BYTES.observe(len(body))
+            LOCATION_PAYLOAD_BYTES.observe(len(body), city)
+            return body, self.properties
+        body = message if isinstance(message, bytes) else message.encode("utf-8")
+        return body, self.text_properties
+    
+    def _declare_queue(self, channel, queue_name):
+        # Declare each queue only once per connection
+        if queue_name in self._declared_queues:
+            return
+        channel.queue_declare(
+            queue=queue_name,
+            durable=True,
+            exclusive=False,
+            auto_delete=False
+        )
+        self._declared_queues.add(queue_name)
+    
+    def _reset(self):
+        # Forget connection-scoped state
+        self.connection = None
+        self.channel = None
+        self._declared_queues = set()
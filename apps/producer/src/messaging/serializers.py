@@ -0,0 +1,72 @@
+"""Wire formats for payloads published to RabbitMQ
+
+The format is advertised in the AMQP content_type header.
+"""
+import json
+import logging
+from collections import namedtuple
+
+from src.models.weather_data import to_wire
+
+logger = logging.getLogger(__name__)
+
+Serializer = namedtuple("Serializer", ["name", "content_type", "dumps", "loads"])
+
+def _json_dumps(payload):
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=to_wire).encode("utf-8")
+
+def _json_loads(body):
+    return json.loads(body)
+
+def _msgpack_serializer():
+    import msgpack
+
+    return Serializer(
+        "msgpack",
+        "application/msgpack",
+        lambda payload: msgpack.packb(payload, use_bin_type=True, default=to_wire),
+        lambda body: msgpack.unpackb(body, raw=False),
+    )
+
+def _cbor_serializer():
+    import cbor2
+
+    def dumps(payload):
+        return cbor2.dumps(payload, default=lambda encoder, value: encoder.encode(to_wire(value)))
+
+    return Serializer("cbor", "application/cbor", dumps, cbor2.loads)
+
+JSON = Serializer("json", "application/json", _json_dumps, _json_loads)
+
+_BINARY_SERIALIZERS = {
+    "msgpack": _msgpack_serializer,
+    "cbor": _cbor_serializer,
+}
+
+def get_serializer(name):
+    """Return the serializer for ``name``, falling back to minified JSON
+
+    Binary formats rely on optional packages; when one is not installed the
+    JSON serializer is returned instead.
+    """
+    if not name or name == "json":
+        return JSON
+
+    factory = _BINARY_SERIALIZERS.get(name)
+    if factory is None:
+        logger.warning(f"Unknown payload format '{name}', using JSON")
+        return JSON
+
+    try:
+        return factory()
+    except ImportError:
+        logger.warning(f"Payload format '{name}' is not installed, using JSON")
+        return JSON
+
+def get_serializer_for_content_type(content_type):
+    """Return the serializer matching an AMQP content_type header"""
+    for name in _BINARY_SERIALIZERS:
+        serializer = get_serializer(name)
+        if serializer.content_type == content_type:
+            return serializer
+    return JSON
@@ -0,0 +1,15 @@
+"""Data models"""
+from src.models.profiles import Profile, api_variables, get_profile, merge_profiles
+from src.models.weather_data import CurrentConditions, DailyForecast, WeatherPayload, daily_columns, to_wire
+
+__all__ = [
+    "CurrentConditions",
+    "DailyForecast",
+    "Profile",
+    "WeatherPayload",
+    "api_variables",
+    "daily_columns",
+    "get_profile",
+    "merge_profiles",
+    "to_wire",
+]
@@ -0,0 +1,82 @@
+"""Output profiles: the payload fields and days each consumer reads"""
+import logging
+from collections import namedtuple
+
+from config.settings import OUTPUT_PROFILES
+from src.models.weather_data import CURRENT_FIELDS, DAILY_FIELDS
+
+logger = logging.getLogger(__name__)
+
+Profile = namedtuple("Profile", ["name", "current", "daily", "past_days", "forecast_days"])
+
+# Open-Meteo variable behind each payload field. ``time`` and ``date`` are
+# derived locally; the current precipitation probability is read from the
+# hourly series
+CURRENT_VARIABLES = {
+    "temperature": "temperature_2m",
+    "relativeHumidity": "relative_humidity_2m",
+    "apparentTemperature": "apparent_temperature",
+    "isDay": "is_day",
+    "uv": "uv_index",
+    "weatherCode": "weather_code",
+}
+DAILY_VARIABLES = {
+    "temperatureMax": "temperature_2m_max",
+    "temperatureMin": "temperature_2m_min",
+    "apparentTemperatureMax": "apparent_temperature_max",
+    "apparentTemperatureMin": "apparent_temperature_min",
+    "uvIndexMax": "uv_index_max",
+    "precipitationProbability": "precipitation_probability_mean",
+    "weatherCode": "weather_code",
+}
+HOURLY_VARIABLES = {
+    "precipitationProbability": "precipitation_probability",
+}
+
+def _ordered(keys, fields):
+    # Keys in wire order, unknown ones dropped with a warning
+    known = [key for key, _ in fields]
+    for key in set(keys) - set(known):
+        logger.warning(f"Unknown payload field '{key}' in output profile, ignored")
+    return tuple(key for key in known if key in keys)
+
+def get_profile(name):
+    """Return the Profile configured as ``name`` in OUTPUT_PROFILES
+
+    Unknown names fall back to the full profile.
+    """
+    config = OUTPUT_PROFILES.get(name)
+    if config is None:
+        logger.warning(f"Unknown output profile '{name}', using 'full'")
+        name, config = "full", OUTPUT_PROFILES["full"]
+    return Profile(
+        name,
+        _ordered(config.get("current", ()), CURRENT_FIELDS),
+        _ordered(config.get("daily", ()), DAILY_FIELDS),
+        int(config.get("past_days", 0)),
+        int(config.get("forecast_days", 7)),
+    )
+
+def merge_profiles(profiles):
+    """Return the profile covering the fields and days of all ``profiles``"""
+    profiles = list(profiles)
+    return Profile(
+        "+".join(dict.fromkeys(profile.name for profile in profiles)),
+        _ordered({key for profile in profiles for key in profile.current}, CURRENT_FIELDS),
+        _ordered({key for profile in profiles for key in profile.daily}, DAILY_FIELDS),
+        max(profile.past_days for profile in profiles),
+        max(profile.forecast_days for profile in profiles),
+    )
+
+def api_variables(profile):
+    """Return the Open-Meteo variables a profile needs
+
+    Returns:
+        dict: ``current``, ``daily`` and ``hourly`` lists of variable names,
+            in payload order (the order of the response's Variables)
+    """
+    return {
+        "current": [CURRENT_VARIABLES[key] for key in profile.current if key in CURRENT_VARIABLES],
+        "daily": [DAILY_VARIABLES[key] for key in profile.daily if key in DAILY_VARIABLES],
+        "hourly": [HOURLY_VARIABLES[key] for key in profile.current if key in HOURLY_VARIABLES],
+    }
@@ -0,0 +1,298 @@
+"""Slotted payload model with a columnar daily block
+
+The classes read like the old payload dicts; ``to_wire`` builds the wire
+dict only at serialization time.
+"""
+from collections.abc import Mapping, Sequence
+
+import numpy as np
+
+# (wire key, attribute) of each current-conditions field, in wire order
+CURRENT_FIELDS = (
+    ("time", "time"),
+    ("temperature", "temperature"),
+    ("relativeHumidity", "relative_humidity"),
+    ("apparentTemperature", "apparent_temperature"),
+    ("isDay", "is_day"),
+    ("uv", "uv"),
+    ("weatherCode", "weather_code"),
+    ("precipitationProbability", "precipitation_probability"),
+)
+
+# (wire key, attribute) of each daily field, in wire order
+DAILY_FIELDS = (
+    ("date", "date"),
+    ("temperatureMax", "temperature_max"),
+    ("temperatureMin", "temperature_min"),
+    ("apparentTemperatureMax", "apparent_temperature_max"),
+    ("apparentTemperatureMin", "apparent_temperature_min"),
+    ("uvIndexMax", "uv_index_max"),
+    ("precipitationProbability", "precipitation_probability"),
+    ("weatherCode", "weather_code"),
+)
+
+# Daily columns kept as float32 (as Open-Meteo sends them) and widened on output
+_FLOAT_COLUMNS = frozenset((
+    "temperature_max",
+    "temperature_min",
+    "apparent_temperature_max",
+    "apparent_temperature_min",
+    "uv_index_max",
+))
+
+# Payload keys that are always present, in wire order
+_BASE_KEYS = ("location", "current", "daily", "pastDays")
+
+class CurrentConditions:
+    """Current conditions of one location"""
+
+    __slots__ = tuple(attribute for _, attribute in CURRENT_FIELDS)
+
+    def __init__(self, time, temperature, relative_humidity, apparent_temperature, is_day, uv,
+                 weather_code, precipitation_probability):
+        self.time = time
+        self.temperature = temperature
+        self.relative_humidity = relative_humidity
+        self.apparent_temperature = apparent_temperature
+        self.is_day = is_day
+        self.uv = uv
+        self.weather_code = weather_code
+        self.precipitation_probability = precipitation_probability
+
+    def to_wire(self, keys=None):
+        """Return the ``current`` dict of the wire format
+
+        Args:
+            keys (tuple): Wire keys to include (default: all); fields that
+                were not fetched (None) are always left out
+        """
+        return {
+            key: value
+            for key, attribute in CURRENT_FIELDS
+            if (keys is None or key in keys) and (value := getattr(self, attribute)) is not None
+        }
+
+    def __repr__(self):
+        return f"CurrentConditions({self.to_wire()!r})"
+
+class DailyForecast(Sequence):
+    """Daily block of one location, one array per field
+
+    Indexing returns a day dict in the wire format; slicing returns a
+    DailyForecast over the same arrays. Columns that were not fetched (or
+    were projected out) are None and left out of the day dicts.
+    """
+
+    __slots__ = tuple(attribute for _, attribute in DAILY_FIELDS)
+
+    def __init__(self, date, temperature_max, temperature_min, apparent_temperature_max,
+                 apparent_temperature_min, uv_index_max, precipitation_probability, weather_code):
+        """Wrap the columns of one location
+
+        Args:
+            date (np.ndarray): Formatted dates (object array, dd/mm/yyyy)
+            temperature_max, temperature_min, apparent_temperature_max,
+                apparent_temperature_min, uv_index_max (np.ndarray): Float columns
+            precipitation_probability (np.ndarray): Integer column
+            weather_code (np.ndarray): Encoded weather codes (descriptions or
+                WMO integers, see WEATHER_CODE_FORMAT)
+
+        Any column but ``date`` may be None.
+        """
+        self.date = date
+        self.temperature_max = temperature_max
+        self.temperature_min = temperature_min
+        self.apparent_temperature_max = apparent_temperature_max
+        self.apparent_temperature_min = apparent_temperature_min
+        self.uv_index_max = uv_index_max
+        self.precipitation_probability = precipitation_probability
+        self.weather_code = weather_code
+
+    def __len__(self):
+        return len(self.date)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return DailyForecast(*(
+                None if column is None else column[index]
+                for column in (getattr(self, attribute) for attribute in self.__slots__)
+            ))
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("daily index out of range")
+        return self[index:index + 1].to_wire()[0]
+
+    def __iter__(self):
+        return iter(self.to_wire())
+
+    def project(self, keys):
+        """Return a DailyForecast over the same arrays with only ``keys``"""
+        return DailyForecast(*(
+            getattr(self, attribute) if key in keys or key == "date" else None
+            for key, attribute in DAILY_FIELDS
+        ))
+
+    def columns(self):
+        """Return the block as wire key -> list of Python values"""
+        columns = {}
+        for key, attribute in DAILY_FIELDS:
+            values = getattr(self, attribute)
+            if values is None:
+                continue
+            if attribute in _FLOAT_COLUMNS:
+                values = np.asarray(values, dtype=np.float64)
+            columns[key] = values.tolist()
+        return columns
+
+    def to_wire(self):
+        """Return the ``daily`` list of day dicts of the wire format"""
+        columns = self.columns()
+        keys = tuple(columns)
+        return [dict(zip(keys, day)) for day in zip(*columns.values())]
+
+    def __repr__(self):
+        return f"DailyForecast({len(self)} days)"
+
+class WeatherPayload(Mapping):
+    """Payload of one location, read like the wire dict
+
+    The payload holds every fetched field and day; ``profile`` (see
+    src/models/profiles.py) selects the fields and days its mapping view and
+    ``to_wire`` expose. ``aiInsight`` and ``insightFollowUp`` are the only
+    keys that can be set; they are present only once set, as in the wire
+    format.
+    """
+
+    __slots__ = ("location", "current", "daily", "past_days", "ai_insight", "insight_follow_up", "profile")
+
+    def __init__(self, location, current, daily, past_days, ai_insight=None, insight_follow_up=False,
+                 profile=None):
+        """Build a payload
+
+        Args:
+            location (dict): Location metadata, shared with the configuration
+            current (CurrentConditions): Current conditions
+            daily (DailyForecast): Daily block
+            past_days (int): Past days included in the daily block
+            ai_insight (str): AI insight, if any
+            insight_follow_up (bool): Whether this payload only delivers a
+                late insight
+            profile (Profile): Output profile the payload is read through
+                (default: every field and day)
+        """
+        self.location = location
+        self.current = current
+        self.daily = daily
+        self.past_days = past_days
+        self.ai_insight = ai_insight
+        self.insight_follow_up = insight_follow_up
+        self.profile = profile
+
+    def __getitem__(self, key):
+        if key == "location":
+            return self.location
+        if key == "current":
+            return self._current()
+        if key == "daily":
+            return self._daily()
+        if key == "pastDays":
+            return self._past_days()
+        if key == "aiInsight" and self.ai_insight is not None:
+            return self.ai_insight
+        if key == "insightFollowUp" and self.insight_follow_up:
+            return True
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key == "aiInsight":
+            self.ai_insight = value
+        elif key == "insightFollowUp":
+            self.insight_follow_up = bool(value)
+        else:
+            raise TypeError(f"Payload field '{key}' cannot be set")
+
+    def __contains__(self, key):
+        if key == "aiInsight":
+            return self.ai_insight is not None
+        if key == "insightFollowUp":
+            return self.insight_follow_up
+        return key in _BASE_KEYS
+
+    def __iter__(self):
+        yield from _BASE_KEYS
+        if self.ai_insight is not None:
+            yield "aiInsight"
+        if self.insight_follow_up:
+            yield "insightFollowUp"
+
+    def __len__(self):
+        return len(_BASE_KEYS) + (self.ai_insight is not None) + bool(self.insight_follow_up)
+
+    def with_insight(self, insight, follow_up=True):
+        """Return a payload sharing this one's data, carrying ``insight``"""
+        return WeatherPayload(
+            self.location, self.current, self.daily, self.past_days, insight, follow_up, self.profile
+        )
+
+    def project(self, profile):
+        """Return a payload sharing this one's data, read through ``profile``"""
+        return WeatherPayload(
+            self.location, self.current, self.daily, self.past_days, self.ai_insight, self.insight_follow_up,
+            profile
+        )
+
+    def to_wire(self):
+        """Return the payload as the dict published on the queue"""
+        wire = {
+            "location": self.location,
+            "current": self._current(),
+            "daily": self._daily().to_wire(),
+            "pastDays": self._past_days(),
+        }
+        if self.ai_insight is not None:
+            wire["aiInsight"] = self.ai_insight
+        if self.insight_follow_up:
+            wire["insightFollowUp"] = True
+        return wire
+
+    def _current(self):
+        return self.current.to_wire(None if self.profile is None else self.profile.current)
+
+    def _daily(self):
+        # The profile's window (views of the same arrays) and fields
+        if self.profile is None:
+            return self.daily
+        start = max(self.past_days - self.profile.past_days, 0)
+        return self.daily[start:self.past_days + self.profile.forecast_days].project(self.profile.daily)
+
+    def _past_days(self):
+        return self.past_days if self.profile is None else min(self.past_days, self.profile.past_days)
+
+    def __repr__(self):
+        return f"WeatherPayload({self.location.get('city', '')!r}, {len(self.daily)} days)"
+
+def to_wire(value, default=None):
+    """Wire form of a model object, for the ``default`` hook of encoders
+
+    Args:
+        value: Object the encoder could not serialize
+        default: Fallback for other objects (TypeError when None)
+    """
+    if isinstance(value, (WeatherPayload, DailyForecast, CurrentConditions)):
+        return value.to_wire()
+    if default is not None:
+        return default(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+def daily_columns(daily):
+    """Return a daily block as wire key -> list of values
+
+    Args:
+        daily (DailyForecast | list): Daily block, or day dicts (payloads
+            parsed back from JSON)
+    """
+    if isinstance(daily, DailyForecast):
+        return daily.columns()
+    return {key: [day.get(key, "") for day in daily] for key, _ in DAILY_FIELDS}
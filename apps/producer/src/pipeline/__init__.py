@@ -0,0 +1 @@
+"""Producer run modes"""
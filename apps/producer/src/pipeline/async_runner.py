@@ -0,0 +1,141 @@
+"""Asyncio-based producer runner
+
+Fetches for different location batches overlap (bounded by a semaphore),
+while publishing and exporting run as independent stages fed by bounded
+queues, so a slow stage applies backpressure instead of piling up memory.
+Ticks that come due while the previous run is still going are skipped; an
+insight tick that gets skipped is carried over to the next run.
+"""
+import asyncio
+import logging
+import time
+
+from config.settings import LOCATIONS, LOCATIONS_BATCH_SIZE, METRICS, RUNNER, SCHEDULE
+from src.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+class AsyncProducer:
+    """Runs the fetch -> publish / export pipeline on asyncio"""
+
+    def __init__(self, weather_service, publisher, export_service, locations=None, snapshot=None,
+                 change_detector=None, start_delay_seconds=0.0):
+        """Initialize the runner
+
+        Args:
+            weather_service: WeatherService used to fetch location batches
+            publisher: RabbitMQPublisher; only the publish stage touches it
+            export_service: ExportService or ExportExecutor; only the export stage touches it
+            locations (list | callable): Locations to monitor, or a function
+                returning them on every tick (default: LOCATIONS)
+            snapshot: Optional PayloadSnapshot refreshed with every published batch
+            change_detector: Optional ChangeDetector filtering each batch before publishing
+            start_delay_seconds (float): Delay of the first tick (shard stagger)
+        """
+        self.weather_service = weather_service
+        self.publisher = publisher
+        self.export_service = export_service
+        self.locations = locations or LOCATIONS
+        self.snapshot = snapshot
+        self.change_detector = change_detector
+        self.start_delay_seconds = start_delay_seconds
+        self.fetch_slots = asyncio.Semaphore(RUNNER["fetch_concurrency"])
+        self.publish_queue = asyncio.Queue(maxsize=RUNNER["queue_size"])
+        self.export_queue = asyncio.Queue(maxsize=RUNNER["queue_size"])
+        self.skipped_ticks = 0
+        self._pending_insight = False
+
+    async def run(self):
+        """Run ticks forever: data every interval, insight when it is due"""
+        data_interval = SCHEDULE["data_interval_minutes"] * 60
+        insight_interval = SCHEDULE["insight_interval_hours"] * 3600
+
+        workers = [
+            asyncio.create_task(self._stage_worker(self.publish_queue, self._publish, "publish")),
+            asyncio.create_task(self._stage_worker(self.export_queue, self._export, "export")),
+        ]
+
+        loop = asyncio.get_running_loop()
+        next_tick = next_insight = loop.time() + self.start_delay_seconds
+        await asyncio.sleep(self.start_delay_seconds)
+        current = None
+        try:
+            while True:
+                insight_due = loop.time() >= next_insight
+                if current and not current.done():
+                    # Overrun: skip this tick instead of queueing another run
+                    self.skipped_ticks += 1
+                    self._pending_insight = self._pending_insight or insight_due
+                    logger.warning(f"Previous run still in progress, skipping tick ({self.skipped_ticks} skipped)")
+                else:
+                    include_insight = insight_due or self._pending_insight
+                    self._pending_insight = False
+                    current = asyncio.create_task(self.run_tick(include_insight))
+
+                now = loop.time()
+                while next_tick <= now:
+                    next_tick += data_interval
+                while insight_due and next_insight <= now:
+                    next_insight += insight_interval
+                await asyncio.sleep(max(0.0, next_tick - loop.time()))
+        finally:
+            for task in workers + ([current] if current else []):
+                task.cancel()
+
+    async def run_tick(self, include_ai_insight=False):
+        """Run one tick and wait until every payload is published and exported"""
+        started = time.monotonic()
+        locations = self.locations() if callable(self.locations) else self.locations
+        logger.info(f"Tick started for {len(locations)} locations (AI insight: {include_ai_insight})")
+
+        with metrics.tick("insight" if include_ai_insight else "data", METRICS["tick_summary"]):
+            # Batches of grid cells, so cities sharing a cell are fetched together
+            batches = self.weather_service.location_index.plan_batches(locations, LOCATIONS_BATCH_SIZE)
+            await asyncio.gather(*(self._fetch(batch, include_ai_insight) for batch in batches))
+            if include_ai_insight:
+                # Insights that were too slow for the base payloads follow separately
+                followups = await asyncio.to_thread(self.weather_service.collect_late_insights)
+                if followups:
+                    await self.publish_queue.put(followups)
+            await self.publish_queue.join()
+            await self.export_queue.join()
+
+        logger.info(f"Tick finished in {time.monotonic() - started:.2f}s")
+
+    async def _fetch(self, batch, include_ai_insight):
+        # Fetch one batch in a worker thread and hand it to both stages
+        async with self.fetch_slots:
+            try:
+                payloads = await asyncio.to_thread(
+                    self.weather_service.get_weather_data_batch, batch, include_ai_insight
+                )
+            except Exception as e:
+                logger.error(f"Error fetching batch of {len(batch)} locations: {e}")
+                return
+        if payloads:
+            # Blocks while a stage is behind (backpressure)
+            await self.publish_queue.put(payloads)
+            await self.export_queue.put(payloads)
+
+    async def _stage_worker(self, queue, handler, name):
+        # Drain one stage queue, running the blocking handler in a thread
+        while True:
+            payloads = await queue.get()
+            try:
+                await asyncio.to_thread(handler, payloads)
+            except Exception as e:
+                logger.error(f"Error in {name} stage: {e}")
+            finally:
+                queue.task_done()
+
+    def _publish(self, payloads):
+        if self.change_detector is not None:
+            self.change_detector.publish(self.publisher, payloads)
+        else:
+            self.publisher.publish_many(payloads)
+        if self.snapshot is not None:
+            self.snapshot.update(payloads)
+
+    def _export(self, payloads):
+        for payload in payloads:
+            self.export_service.export(payload)
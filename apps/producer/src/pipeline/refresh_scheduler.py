@@ -0,0 +1,218 @@
+"""Per-location refresh scheduling aligned to upstream model updates
+
+A location is refreshed just after the next model update, plus a jitter per
+batch, or after ``fast_interval_seconds`` when it has an alert, changed
+quickly or failed. Fast refreshes bypass the API cache (``split_refresh``).
+"""
+import heapq
+import logging
+import time
+
+from config.settings import ADAPTIVE_SCHEDULE, API_CACHE, LOCATIONS_BATCH_SIZE, SCHEDULE
+from src.api.response_cache import next_model_update
+from src.utils.parsers import describe_weather, slugify
+
+logger = logging.getLogger(__name__)
+
+class RefreshScheduler:
+    """Priority queue of per-location refresh times"""
+
+    def __init__(self, locations, location_index, fast_interval_seconds=None, jitter_seconds=None,
+                 offset_seconds=0.0, clock=time.time):
+        """Initialize the scheduler; every location is due immediately
+
+        Args:
+            locations (list): Location dicts to refresh
+            location_index (LocationIndex): Grid cells, for the jitter slots
+            fast_interval_seconds (int): Refresh interval for locations with
+                alerts or fast-changing conditions (default: ADAPTIVE_SCHEDULE)
+            jitter_seconds (int): Spread of refreshes after a model update
+            offset_seconds (float): Delay added to every refresh (shard stagger)
+            clock: Function returning the current timestamp
+        """
+        self.fast_interval_seconds = fast_interval_seconds or ADAPTIVE_SCHEDULE["fast_interval_seconds"]
+        self.jitter_seconds = ADAPTIVE_SCHEDULE["jitter_seconds"] if jitter_seconds is None else jitter_seconds
+        self.model_update_seconds = API_CACHE["model_update_seconds"]
+        self.model_update_offset_seconds = API_CACHE["model_update_offset_seconds"]
+        self.insight_interval_seconds = SCHEDULE["insight_interval_hours"] * 3600
+        self.fixed_interval_seconds = SCHEDULE["data_interval_minutes"] * 60
+        self.offset_seconds = offset_seconds
+        self.location_index = location_index
+        self.clock = clock
+
+        self.started_at = clock()
+        self.counters = {"refreshes": 0, "fast": 0, "failed": 0}
+        # key -> location, last payload's current block, last insight time, jitter
+        self._locations = {}
+        self._current = {}
+        self._insight_at = {}
+        self._jitter = {}
+        # Keys whose next refresh comes before the next model update
+        self._refresh = set()
+        # (due timestamp, sequence, key); _due holds the live entry of each key
+        self._heap = []
+        self._due = {}
+        self._sequence = 0
+        self.set_locations(locations)
+
+    def set_locations(self, locations):
+        """Replace the scheduled locations, e.g. after a shard rebalance
+
+        New locations are due immediately; kept ones keep their next refresh.
+        """
+        now = self.clock()
+        batches = self.location_index.plan_batches(locations, LOCATIONS_BATCH_SIZE)
+        previous = self._locations
+        self._locations = {}
+        for slot, batch in enumerate(batches):
+            for location in batch:
+                key = slugify(location.get("city", ""))
+                self._locations[key] = location
+                self._jitter[key] = slot * self.jitter_seconds / len(batches) + self.offset_seconds
+                if key not in previous:
+                    self._push(now + self.offset_seconds, key)
+        for key in previous.keys() - self._locations.keys():
+            self._due.pop(key, None)
+            self._current.pop(key, None)
+            self._jitter.pop(key, None)
+            self._refresh.discard(key)
+
+    def pop_due(self, now=None):
+        """Remove and return the locations due now or within the batch window"""
+        now = self.clock() if now is None else now
+        horizon = now + ADAPTIVE_SCHEDULE["batch_window_seconds"]
+        due = []
+        while self._heap and self._heap[0][0] <= horizon:
+            _, sequence, key = heapq.heappop(self._heap)
+            if self._due.get(key) != sequence:
+                continue  # dropped by set_locations
+            del self._due[key]
+            due.append(self._locations[key])
+        return due
+
+    def seconds_until_due(self, now=None):
+        """Return the seconds until the next refresh is due (0 if one is overdue)"""
+        while self._heap and self._due.get(self._heap[0][2]) != self._heap[0][1]:
+            heapq.heappop(self._heap)
+        if not self._heap:
+            return None
+        now = self.clock() if now is None else now
+        return max(0.0, self._heap[0][0] - now)
+
+    def next_wakeup(self, now=None):
+        """Return the seconds to sleep before the next pass of the adaptive loop
+
+        Capped at the fixed data interval so shard rebalances are noticed; a
+        scheduler without locations (a shard owning no cells) waits the full
+        interval instead of spinning.
+        """
+        until_due = self.seconds_until_due(now)
+        if until_due is None:
+            return self.fixed_interval_seconds
+        return min(until_due, self.fixed_interval_seconds)
+
+    def split_insight(self, locations, now=None):
+        """Split due locations into (without AI insight, with AI insight)
+
+        A location gets an insight once every SCHEDULE insight interval,
+        counted from this call (insights that arrive late as follow-ups count
+        too). A failed refresh makes the insight due again.
+        """
+        now = self.clock() if now is None else now
+        plain, with_insight = [], []
+        for location in locations:
+            last = self._insight_at.get(slugify(location.get("city", "")))
+            if last is None or now - last >= self.insight_interval_seconds:
+                self._insight_at[slugify(location.get("city", ""))] = now
+                with_insight.append(location)
+            else:
+                plain.append(location)
+        return plain, with_insight
+
+    def split_refresh(self, locations):
+        """Split due locations into (cache allowed, cache bypassed)
+
+        Fast refreshes come before the next model update, when the API cache
+        still holds the previous response, so they must skip it.
+        """
+        cached, bypass = [], []
+        for location in locations:
+            (bypass if slugify(location.get("city", "")) in self._refresh else cached).append(location)
+        return cached, bypass
+
+    def complete(self, locations, payloads, now=None):
+        """Schedule the next refresh of locations popped by pop_due
+
+        Args:
+            locations (list): Locations that were refreshed
+            payloads (list): Payloads produced for them; a location without
+                a payload failed and is retried soon
+        """
+        now = self.clock() if now is None else now
+        by_key = {slugify(p.get("location", {}).get("city", "")): p for p in payloads}
+        for location in locations:
+            key = slugify(location.get("city", ""))
+            if key not in self._locations:
+                continue  # moved to another shard meanwhile
+            payload = by_key.get(key)
+            if payload is None:
+                self.counters["failed"] += 1
+                self._insight_at.pop(key, None)
+                self._push(now + self.fast_interval_seconds, key)
+                continue
+
+            self.counters["refreshes"] += 1
+            current = payload.get("current", {})
+            previous, self._current[key] = self._current.get(key), current
+
+            update = next_model_update(now, self.model_update_seconds, self.model_update_offset_seconds)
+            due = update + self._jitter[key]
+            self._refresh.discard(key)
+            reason = self._fast_reason(current, previous)
+            if reason:
+                self.counters["fast"] += 1
+                logger.debug("Fast refresh for %s: %s", key, reason)
+                due = min(due, now + self.fast_interval_seconds)
+                # Before the model update the cached response is still live
+                if due < update:
+                    self._refresh.add(key)
+            self._push(due, key)
+
+    def stats(self):
+        """Return refresh counters and the fetches saved against the fixed schedule
+
+        The fixed schedule refreshes every location on every data tick.
+        """
+        elapsed = self.clock() - self.started_at
+        fixed = len(self._locations) * (int(elapsed // self.fixed_interval_seconds) + 1)
+        attempted = self.counters["refreshes"] + self.counters["failed"]
+        return {
+            **self.counters,
+            "locations": len(self._locations),
+            "fixed_schedule_refreshes": fixed,
+            "saved": max(fixed - attempted, 0),
+        }
+
+    def _fast_reason(self, current, previous):
+        # Why a location needs the fast interval, or None
+        if describe_weather(current.get("weatherCode")) in ADAPTIVE_SCHEDULE["alert_weather"]:
+            return "weather alert"
+        precipitation = current.get("precipitationProbability") or 0
+        if precipitation >= ADAPTIVE_SCHEDULE["alert_precipitation_probability"]:
+            return "precipitation alert"
+        if previous is None:
+            return None
+        if describe_weather(current.get("weatherCode")) != describe_weather(previous.get("weatherCode")):
+            return "weather changed"
+        if abs((current.get("temperature") or 0) - (previous.get("temperature") or 0)) \
+                >= ADAPTIVE_SCHEDULE["temperature_change"]:
+            return "temperature changed"
+        if abs(precipitation - (previous.get("precipitationProbability") or 0)) \
+                >= ADAPTIVE_SCHEDULE["precipitation_change"]:
+            return "precipitation changed"
+        return None
+
+    def _push(self, due, key):
+        self._sequence += 1
+        self._due[key] = self._sequence
+        heapq.heappush(self._heap, (due, self._sequence, key))
@@ -0,0 +1,188 @@
+"""Consistent-hash partitioning of locations across producer shards
+
+Locations are hashed by grid cell onto a ring with ``virtual_nodes`` points
+per shard, so a change in the shard count moves only about 1/N of them.
+``run_shards`` is the local supervisor behind ``main.py --shards N``.
+"""
+import bisect
+import hashlib
+import json
+import logging
+import os
+import signal
+import subprocess
+import sys
+import time
+
+from config.settings import SHARDING
+
+logger = logging.getLogger(__name__)
+
+def _hash(value):
+    # Stable across processes and hosts (unlike hash())
+    return int.from_bytes(hashlib.sha1(value.encode("utf-8")).digest()[:8], "big")
+
+def read_shard_count(config_path=None, default=None):
+    """Return the shard count from the shared config file, or ``default``"""
+    config_path = config_path or SHARDING["config_path"]
+    default = SHARDING["count"] if default is None else default
+    if not config_path:
+        return default
+    try:
+        with open(config_path, encoding="utf-8") as f:
+            return max(int(json.load(f)["shard_count"]), 1)
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        logger.warning(f"Could not read shard count from {config_path}: {e}")
+        return default
+
+class HashRing:
+    """Consistent-hash ring mapping keys to shard indexes"""
+
+    def __init__(self, shard_count, virtual_nodes=None):
+        """Build the ring
+
+        Args:
+            shard_count (int): Number of shards
+            virtual_nodes (int): Points per shard on the ring (default:
+                SHARDING["virtual_nodes"]); more points even out the shares
+        """
+        self.shard_count = shard_count
+        virtual_nodes = virtual_nodes or SHARDING["virtual_nodes"]
+        points = sorted(
+            (_hash(f"shard-{shard}-{node}"), shard)
+            for shard in range(shard_count)
+            for node in range(virtual_nodes)
+        )
+        self._hashes = [point for point, _ in points]
+        self._shards = [shard for _, shard in points]
+
+    def owner(self, key):
+        """Return the shard index owning ``key``"""
+        index = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._shards[index]
+
+class ShardAssignment:
+    """The locations owned by one shard, rebalanced when the shard count changes"""
+
+    def __init__(self, locations, location_index, index=None, count=None, config_path=None):
+        """Compute the initial partition
+
+        Args:
+            locations (list): Every monitored location
+            location_index (LocationIndex): Grid cells used as hash keys
+            index (int): This shard (default: SHARDING["index"])
+            count (int): Shard count when there is no config file
+                (default: SHARDING["count"])
+            config_path (str): Shared JSON file with the current shard count
+                (default: SHARDING["config_path"])
+        """
+        self.all_locations = locations
+        self.location_index = location_index
+        self.index = (SHARDING["index"] or 0) if index is None else index
+        self.default_count = SHARDING["count"] if count is None else count
+        self.config_path = config_path or SHARDING["config_path"]
+        self.count = None
+        self.locations = []
+        self.rebalances = 0
+        self._config_mtime = None
+        self.refresh(force=True)
+
+    def refresh(self, force=False):
+        """Re-read the shard count and repartition if it changed
+
+        Returns:
+            bool: True if this shard's locations changed
+        """
+        if self.config_path and not force:
+            try:
+                mtime = os.stat(self.config_path).st_mtime
+            except OSError:
+                mtime = None
+            if mtime == self._config_mtime:
+                return False
+            self._config_mtime = mtime
+        count = read_shard_count(self.config_path, self.default_count)
+        if count == self.count:
+            return False
+
+        ring = HashRing(count)
+        locations = [location for location in self.all_locations if ring.owner(self._key(location)) == self.index]
+        previous = {id(location) for location in self.locations}
+        current = {id(location) for location in locations}
+        if self.count is not None:
+            self.rebalances += 1
+            logger.info(
+                f"Shard count {self.count} -> {count}: shard {self.index} gained {len(current - previous)} "
+                f"and lost {len(previous - current)} location(s)"
+            )
+        self.count = count
+        self.locations = locations
+        logger.info(f"Shard {self.index}/{count} owns {len(locations)}/{len(self.all_locations)} location(s)")
+        return True
+
+    def stagger_offset(self, interval_seconds):
+        """Delay of this shard's ticks within an interval (0 when not staggered)"""
+        if not SHARDING["stagger"] or self.count <= 1:
+            return 0.0
+        return interval_seconds * (self.index % self.count) / self.count
+
+    def stats(self):
+        return {
+            "index": self.index,
+            "count": self.count,
+            "locations": len(self.locations),
+            "rebalances": self.rebalances,
+        }
+
+    def _key(self, location):
+        cell = self.location_index.cell_location(location)
+        return f"{cell['latitude']},{cell['longitude']},{cell['timezone']}"
+
+def run_shards(count, args, poll_seconds=2.0, restart_delay_seconds=5.0):
+    """Run one ``main.py`` process per shard until interrupted
+
+    Args:
+        count (int): Shard count, unless SHARD_CONFIG sets one
+        args (list): Command-line arguments for every shard process
+        poll_seconds (float): Interval between checks of the processes and
+            of SHARD_CONFIG
+        restart_delay_seconds (float): Minimum delay before restarting a
+            shard that exited
+    """
+    main_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "main.py")
+    processes = {}
+    exited_at = {}
+
+    def start(index, shard_count):
+        env = {**os.environ, "SHARD_INDEX": str(index), "SHARD_COUNT": str(shard_count)}
+        # In its own session: Ctrl+C reaches the supervisor only, which then
+        # interrupts each shard once so it can drain its exports and outbox
+        processes[index] = subprocess.Popen([sys.executable, main_path, *args], env=env, start_new_session=True)
+        logger.info(f"Started shard {index}/{shard_count} (pid {processes[index].pid})")
+
+    def stop(index):
+        process = processes.pop(index)
+        process.send_signal(signal.SIGINT)
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        logger.info(f"Stopped shard {index}")
+
+    try:
+        while True:
+            shard_count = read_shard_count(default=count)
+            for index in [index for index in processes if index >= shard_count]:
+                stop(index)
+            for index in range(shard_count):
+                process = processes.get(index)
+                if process is not None and process.poll() is not None:
+                    logger.warning(f"Shard {index} exited with status {process.returncode}")
+                    del processes[index]
+                    exited_at[index] = time.monotonic()
+                if index not in processes and time.monotonic() - exited_at.get(index, 0) >= restart_delay_seconds:
+                    start(index, shard_count)
+            time.sleep(poll_seconds)
+    finally:
+        for index in list(processes):
+            stop(index)
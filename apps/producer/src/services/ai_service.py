@@ -1,43 +1,61 @@
 import json
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from openai import OpenAI
-from config.settings import OPENAI_API_KEY, OPENAI_MODEL
+from config.settings import OPENAI_API_KEY, OPENAI_MODEL, AI_BATCH
+from src.utils.parsers import describe_weather
+from src.utils.rate_limit import TokenBucket
 
 logger = logging.getLogger(__name__)
 
+# Returned when the completion fails; never cached
+FALLBACK_INSIGHT = "Condições normais - sem alertas especiais"
+
+# (payload key, label, unit) of the current conditions in the prompt
+CURRENT_PROMPT_FIELDS = (
+    ("temperature", "Temperatura", "°C"),
+    ("relativeHumidity", "Umidade", "%"),
+    ("uv", "Índice UV", ""),
+    ("weatherCode", "Condição", ""),
+    ("precipitationProbability", "Probabilidade de Chuva", "%"),
+)
+
 class AIService:
     # Service for AI-powered weather insights
     
-    def __init__(self):
-        # Initialize AI service
-        self.client = OpenAI(api_key=OPENAI_API_KEY)
+    def __init__(self, client=None):
+        # Initialize AI service; concurrent requests share one client
+        self.client = client or OpenAI(api_key=OPENAI_API_KEY)
+        self.rate_limiter = TokenBucket(AI_BATCH["requests_per_minute"] / 60, AI_BATCH["burst"])
+        self.executor = ThreadPoolExecutor(max_workers=AI_BATCH["concurrency"], thread_name_prefix="ai-insight")
         logger.info("AI service initialized")
     
-    def generate_insight(self, weather_data):
+    def submit_insight(self, weather_data):
+        # Schedule an insight on the worker pool; returns a Future
+        return self.executor.submit(self._rate_limited_insight, weather_data)
+    
+    def generate_insights(self, payloads, timeout=None):
+        # Generate insights for many payloads concurrently (bounded by the pool
+        # size and the rate limit). Insights not ready within timeout are None
+        futures = [self.submit_insight(payload) for payload in payloads]
+        done, _ = wait(futures, timeout=timeout)
+        return [future.result() if future in done else None for future in futures]
+    
+    def _rate_limited_insight(self, weather_data):
+        # Wait for a rate-limit token, then call the API with what is left of the deadline
+        deadline = time.monotonic() + AI_BATCH["request_timeout_seconds"]
+        if not self.rate_limiter.acquire(timeout=AI_BATCH["request_timeout_seconds"]):
+            logger.warning("AI insight rate limit wait exceeded the request deadline")
+            return FALLBACK_INSIGHT
+        return self.generate_insight(weather_data, timeout=max(deadline - time.monotonic(), 0.1))
+    
+    def generate_insight(self, weather_data, timeout=None):
         # Generate a short weather insight in Portuguese
         logger.info("Generating AI insight")
         
-        current = weather_data["current"]
-        daily = weather_data["daily"][:3]
-        
-        prompt = f"""
-Analise os dados meteorológicos e gere APENAS UMA FRASE curta com um alerta ou recomendação importante.
-
-DADOS ATUAIS:
-- Temperatura: {current["temperature"]}°C
-- Umidade: {current["relativeHumidity"]}%
-- Índice UV: {current["uv"]}
-- Condição: {current["weatherCode"]}
-- Probabilidade de Chuva: {current["precipitationProbability"]}%
-
-PRÓXIMOS 3 DIAS:
-{json.dumps(daily, indent=2, ensure_ascii=False)}
-
-Retorne apenas UMA frase objetiva (máximo 15 palavras) com um alerta ou recomendação útil.
-Exemplos: "Alto índice UV - use protetor solar" ou "Chuva prevista amanhã - leve guarda-chuva"
-"""
-
         try:
+            prompt = self._build_prompt(weather_data)
             response = self.client.chat.completions.create(
                 model=OPENAI_MODEL,
                 messages=[
@@ -51,7 +69,8 @@ Exemplos: "Alto índice UV - use protetor solar" ou "Chuva prevista amanhã - le
                     }
                 ],
                 temperature=0.7,
-                max_tokens=50
+                max_tokens=50,
+                timeout=timeout or AI_BATCH["request_timeout_seconds"]
             )
             insight = response.choices[0].message.content.strip()
             logger.info(f"AI insight generated: {insight}")
@@ -59,4 +78,31 @@ Exemplos: "Alto índice UV - use protetor solar" ou "Chuva prevista amanhã - le
             
         except Exception as e:
             logger.error(f"Error generating AI insight: {e}")
-            return "Condições normais - sem alertas especiais"
+            return FALLBACK_INSIGHT
+    
+    def _build_prompt(self, weather_data):
+        # Fields left out by the insight profile are left out of the prompt
+        current = weather_data.get("current", {})
+        lines = []
+        for key, label, unit in CURRENT_PROMPT_FIELDS:
+            value = current.get(key)
+            if value is not None:
+                lines.append(f"- {label}: {describe_weather(value) if key == 'weatherCode' else value}{unit}")
+        current_lines = "\n".join(lines)
+        daily = [
+            {**day, "weatherCode": describe_weather(day["weatherCode"])} if "weatherCode" in day else day
+            for day in weather_data.get("daily", [])[:3]
+        ]
+        
+        return f"""
+Analise os dados meteorológicos e gere APENAS UMA FRASE curta com um alerta ou recomendação importante.
+
+DADOS ATUAIS:
+{current_lines}
+
+PRÓXIMOS 3 DIAS:
+{json.dumps(daily, indent=2, ensure_ascii=False)}
+
+Retorne apenas UMA frase objetiva (máximo 15 palavras) com um alerta ou recomendação útil.
+Exemplos: "Alto índice UV - use protetor solar" ou "Chuva prevista amanhã - leve guarda-chuva"
+"""
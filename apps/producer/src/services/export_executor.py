@@ -0,0 +1,266 @@
+"""Process-pool executor for CSV/Excel exports
+
+Exports are CPU-heavy (pandas, openpyxl restyling) and hold the GIL, so
+running them inline after publishing delays the next tick. The executor
+takes payloads without blocking and writes them in worker processes. At most
+``max_in_flight`` jobs are handed to the pool; the rest wait in a queue
+keyed by location, so while the pool is backed up a newer payload for a
+location replaces the queued one. Jobs for the same location never run
+concurrently. Failed jobs are retried with exponential backoff and then
+written to a dead-letter directory. ``shutdown`` drains queued and in-flight
+work.
+"""
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+from config.logging_config import setup_worker_logging
+from config.settings import EXCEL_WRITER, EXPORT_EXECUTOR, EXPORT_MODE, EXPORT_PATHS, PROFILES
+from src.models.weather_data import to_wire
+from src.utils.parsers import slugify
+from src.utils.metrics import LOCATION_STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Export service of the current worker process, created by _init_worker
+_worker_service = None
+
+def _init_worker(mode, settings, log_level, log_disabled):
+    # Runs once in each worker process, before its first job. Workers are not
+    # forked from the parent, so they get its export settings and log level
+    global _worker_service
+    setup_worker_logging(log_level)
+    logging.disable(log_disabled)
+    for target, values in zip((EXPORT_PATHS, EXCEL_WRITER, PROFILES), settings):
+        target.update(values)
+    from src.services.export_service import ExportService
+    _worker_service = ExportService(mode)
+
+def _run_export(mode, payload):
+    # Runs in a worker process. ExportService logs and swallows its errors and
+    # returns None instead of a path, which is turned into a failure here.
+    # Returns {stage: seconds}, recorded in the parent's metrics
+    if mode == "rolling":
+        stages = [("rolling", _worker_service.export_rolling)]
+    else:
+        stages = [("csv", _worker_service.export_csv), ("excel", _worker_service.export_excel)]
+    timings = {}
+    for stage, export in stages:
+        started = time.perf_counter()
+        if export(payload) is None:
+            raise RuntimeError(f"{stage} export failed")
+        timings[stage] = time.perf_counter() - started
+    return timings
+
+def _pool_context():
+    # Never fork the parent: by the first export it runs the logging listener,
+    # the outbox drainer, Flask and the AI pool, and a child could inherit a
+    # lock held by one of those threads. Forkserver workers are forked from a
+    # clean single-threaded server; spawn is the fallback
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+class _ExportJob:
+    """One payload to export, with its retry state"""
+
+    __slots__ = ("key", "payload", "attempts", "not_before")
+
+    def __init__(self, key, payload):
+        self.key = key
+        self.payload = payload
+        self.attempts = 0
+        self.not_before = 0.0
+
+class ExportExecutor:
+    """Non-blocking, coalescing export queue backed by a process pool"""
+
+    def __init__(self, mode=None, workers=None, max_in_flight=None, max_retries=None,
+                 retry_backoff_seconds=None, dead_letter_path=None):
+        """Initialize the executor and start its dispatcher thread
+
+        Args:
+            mode (str): Export mode, as for ExportService (default: EXPORT_MODE).
+                Rolling exports use a single worker, as the rolling store
+                keeps its deduplication state in memory
+            workers (int): Worker processes (default: EXPORT_EXECUTOR["workers"])
+            max_in_flight (int): Jobs handed to the pool at once
+            max_retries (int): Retries before a job is dead-lettered
+            retry_backoff_seconds (float): Delay before the first retry,
+                doubled on each further one
+            dead_letter_path (str): Directory for payloads that kept failing
+        """
+        def setting(value, name):
+            return EXPORT_EXECUTOR[name] if value is None else value
+
+        self.mode = mode or EXPORT_MODE
+        self.workers = 1 if self.mode == "rolling" else setting(workers, "workers")
+        self.max_in_flight = max(setting(max_in_flight, "max_in_flight"), 1)
+        self.max_retries = setting(max_retries, "max_retries")
+        self.retry_backoff_seconds = setting(retry_backoff_seconds, "retry_backoff_seconds")
+        self.dead_letter_path = setting(dead_letter_path, "dead_letter_path")
+
+        self.counters = {"submitted": 0, "coalesced": 0, "completed": 0, "retried": 0, "dead_lettered": 0}
+        # location key -> queued job (latest payload wins)
+        self._queued = OrderedDict()
+        # location key -> job currently in the pool
+        self._in_flight = {}
+        self._closing = False
+        self._pool = None
+        self._condition = threading.Condition()
+        self._dispatcher = threading.Thread(target=self._dispatch, name="export-dispatcher", daemon=True)
+        self._dispatcher.start()
+        logger.info(f"Export executor started ({self.mode} mode, {self.workers} worker process(es))")
+
+    def export(self, payload):
+        """Queue a payload for export and return immediately
+
+        Same interface as ExportService.export, so the executor can stand in
+        for it on the publish path.
+
+        Args:
+            payload (WeatherPayload): Weather payload
+        """
+        key = slugify(payload.get("location", {}).get("city", "")) or "unknown"
+        with self._condition:
+            if self._closing:
+                logger.warning(f"Export executor is shut down, dropping export for {key}")
+                return
+            self.counters["submitted"] += 1
+            if key in self._queued:
+                # Still waiting for a slot: only the latest snapshot is exported
+                self.counters["coalesced"] += 1
+                self._queued[key].payload = payload
+            else:
+                self._queued[key] = _ExportJob(key, payload)
+            self._condition.notify_all()
+
+    def stats(self):
+        """Return job counters and the current queue depth"""
+        with self._condition:
+            return {**self.counters, "queued": len(self._queued), "in_flight": len(self._in_flight)}
+
+    def shutdown(self, timeout=None):
+        """Stop accepting payloads, wait for queued and in-flight exports
+
+        Args:
+            timeout (float): Maximum seconds to wait (default: no limit)
+
+        Returns:
+            bool: True if every job finished before the timeout
+        """
+        with self._condition:
+            self._closing = True
+            self._condition.notify_all()
+        self._dispatcher.join(timeout)
+        drained = not self._dispatcher.is_alive()
+        if self._pool is not None:
+            self._pool.shutdown(wait=drained, cancel_futures=not drained)
+        logger.info(f"Export executor stopped (drained: {drained}): {self.stats()}")
+        return drained
+
+    def _dispatch(self):
+        # Hand queued jobs to the pool as slots free up, until shut down and drained
+        with self._condition:
+            while True:
+                job, wait = self._next_job()
+                if job is None:
+                    if self._closing and not self._queued and not self._in_flight:
+                        return
+                    self._condition.wait(wait)
+                    continue
+                del self._queued[job.key]
+                self._in_flight[job.key] = job
+                try:
+                    future = self._submit(job)
+                except Exception as e:
+                    # No pool to run it: fail the job, so it is retried or dead-lettered
+                    future = Future()
+                    future.set_exception(e)
+                future.add_done_callback(lambda f, job=job: self._on_done(job, f))
+
+    def _submit(self, job):
+        try:
+            return self._get_pool().submit(_run_export, self.mode, job.payload)
+        except BrokenProcessPool:
+            # A worker died: start a new pool and submit the job once more
+            self._pool = None
+            return self._get_pool().submit(_run_export, self.mode, job.payload)
+
+    def _next_job(self):
+        # First queued job that may run now, or (None, seconds to wait)
+        if len(self._in_flight) >= self.max_in_flight:
+            return None, None
+        now = time.monotonic()
+        wait = None
+        for key, job in self._queued.items():
+            if key in self._in_flight:
+                continue
+            if job.not_before <= now:
+                return job, None
+            delay = job.not_before - now
+            wait = delay if wait is None else min(wait, delay)
+        return None, wait
+
+    def _get_pool(self):
+        if self._pool is None:
+            settings = (dict(EXPORT_PATHS), dict(EXCEL_WRITER), dict(PROFILES))
+            root = logging.getLogger()
+            self._pool = ProcessPoolExecutor(
+                self.workers, mp_context=_pool_context(), initializer=_init_worker,
+                initargs=(self.mode, settings, root.level, root.manager.disable)
+            )
+        return self._pool
+
+    def _on_done(self, job, future):
+        error = future.exception()
+        dead = False
+        if error is None:
+            city = job.payload.get("location", {}).get("city", "")
+            for stage, seconds in future.result().items():
+                LOCATION_STAGE_SECONDS.observe(seconds, stage, city)
+        with self._condition:
+            del self._in_flight[job.key]
+            if error is None:
+                self.counters["completed"] += 1
+            elif job.key in self._queued:
+                # A newer payload for the location is already queued and supersedes this one
+                logger.warning(f"Export for {job.key} failed ({error}), superseded by a newer payload")
+            elif job.attempts < self.max_retries:
+                job.attempts += 1
+                job.not_before = time.monotonic() + self.retry_backoff_seconds * 2 ** (job.attempts - 1)
+                self._queued[job.key] = job
+                self.counters["retried"] += 1
+                logger.warning(f"Export for {job.key} failed ({error}), retry {job.attempts}/{self.max_retries}")
+            else:
+                self.counters["dead_lettered"] += 1
+                dead = True
+            if isinstance(error, BrokenProcessPool):
+                self._pool = None
+            self._condition.notify_all()
+        if dead:
+            self._dead_letter(job, error)
+
+    def _dead_letter(self, job, error):
+        # Keep the payload and the last error so the export can be replayed
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        path = os.path.join(self.dead_letter_path, f"{job.key}_{timestamp}.json")
+        try:
+            os.makedirs(self.dead_letter_path, exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({
+                    "mode": self.mode,
+                    "attempts": job.attempts + 1,
+                    "error": str(error),
+                    "payload": job.payload
+                }, f, ensure_ascii=False, default=lambda value: to_wire(value, str))
+            logger.error(f"Export for {job.key} failed after {job.attempts + 1} attempts, saved to {path}")
+        except OSError as e:
+            logger.error(f"Export for {job.key} failed and could not be dead-lettered: {e}")
@@ -1,49 +1,133 @@
-"""Export service for CSV and Excel generation"""
+"""Export service for CSV and Excel generation
+
+pandas, xlsxwriter and openpyxl are imported by the methods that use them,
+so importing the service (or running in rolling mode) does not load them.
+"""
 import json
 import logging
 import os
-import pandas as pd
+import time
+from collections.abc import Mapping
 from datetime import datetime
-from openpyxl import load_workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils import get_column_letter
 
-from config.settings import EXPORT_PATHS
+from config.settings import EXPORT_PATHS, EXPORT_MODE, EXCEL_WRITER, PROFILES
+from src.models.profiles import get_profile
+from src.models.weather_data import WeatherPayload, daily_columns
+from src.services.export_store import RollingExportStore
+from src.utils.parsers import describe_weather, slugify
+from src.utils.metrics import LOCATION_STAGE_SECONDS
 
 logger = logging.getLogger(__name__)
 
+# Columns of every export row, in file order
+EXPORT_COLUMNS = [
+    "Type",
+    "City",
+    "Date/Time",
+    "Temperature (°C)",
+    "Apparent Temperature (°C)",
+    "Humidity (%)",
+    "UV Index",
+    "Weather",
+    "Precipitation (%)",
+    "Max Temp (°C)",
+    "Min Temp (°C)"
+]
+
 class ExportService:
     """Service for exporting weather data to files"""
     
-    def __init__(self):
-        """Initialize export service"""
+    def __init__(self, mode=None):
+        """Initialize export service
+        
+        Args:
+            mode (str): "snapshot" or "rolling" (default: EXPORT_MODE)
+        """
+        self.mode = mode or EXPORT_MODE
+        # Payloads are exported through the export profile's fields and days
+        self.profile = get_profile(PROFILES["export"])
         self._ensure_export_dirs()
-        logger.info("Export service initialized")
+        self._rolling_store = None
+        logger.info(f"Export service initialized ({self.mode} mode)")
     
     def _ensure_export_dirs(self):
         """Ensure export directories exist"""
         os.makedirs(EXPORT_PATHS["csv"], exist_ok=True)
         os.makedirs(EXPORT_PATHS["excel"], exist_ok=True)
     
+    def export(self, weather_json):
+        """Export weather data in the configured mode
+        
+        Args:
+            weather_json (dict | str): Weather payload, or its JSON string
+        """
+        if self.mode == "rolling":
+            self.export_rolling(weather_json)
+        else:
+            self.export_csv(weather_json)
+            self.export_excel(weather_json)
+    
+    def export_rolling(self, weather_json):
+        """Append new or changed rows to the rolling per-city, per-day CSV
+        
+        Args:
+            weather_json (dict | str): Weather payload, or its JSON string
+            
+        Returns:
+            int: Number of rows appended
+        """
+        try:
+            started = time.perf_counter()
+            data = self._load_payload(weather_json)
+            written = self.rolling_store.append(self._prepare_rows(data))
+            self._observe("rolling", data, started)
+            logger.info("Rolling export: %d new/changed rows", written, extra=self._log_fields(data))
+            return written
+            
+        except Exception as e:
+            logger.error(f"Error writing rolling export: {e}")
+            return None
+    
+    def read_rolling(self, start, end, city=None):
+        """Read rolling export rows recorded between start and end
+        
+        Args:
+            start (datetime): Range start
+            end (datetime): Range end
+            city (str): Optional city filter
+            
+        Returns:
+            pd.DataFrame: Matching rows
+        """
+        return self.rolling_store.read_range(start, end, city)
+    
+    @property
+    def rolling_store(self):
+        """Rolling export store, created on first use"""
+        if self._rolling_store is None:
+            self._rolling_store = RollingExportStore(EXPORT_PATHS["rolling"], EXPORT_COLUMNS)
+        return self._rolling_store
+    
     def export_csv(self, weather_json):
         """Export weather data to CSV
         
         Args:
-            weather_json (str): JSON string with weather data
+            weather_json (dict | str): Weather payload, or its JSON string
             
         Returns:
             str: Path to generated CSV file
         """
         try:
             logger.info("Generating CSV export")
-            data = json.loads(weather_json)
+            started = time.perf_counter()
+            data = self._load_payload(weather_json)
             df = self._prepare_dataframe(data)
             
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"{EXPORT_PATHS['csv']}/weather_data_{timestamp}.csv"
+            filename = self._build_filename(EXPORT_PATHS["csv"], data, "csv")
             
             df.to_csv(filename, index=False, encoding='utf-8-sig')
-            logger.info(f"CSV exported: {filename}")
+            self._observe("csv", data, started)
+            logger.info("CSV exported: %s", filename, extra=self._log_fields(data))
             return filename
             
         except Exception as e:
@@ -54,72 +138,138 @@ class ExportService:
         """Export weather data to Excel
         
         Args:
-            weather_json (str): JSON string with weather data
+            weather_json (dict | str): Weather payload, or its JSON string
             
         Returns:
             str: Path to generated Excel file
         """
         try:
             logger.info("Generating Excel export")
-            data = json.loads(weather_json)
+            started = time.perf_counter()
+            data = self._load_payload(weather_json)
             df = self._prepare_dataframe(data)
             
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"{EXPORT_PATHS['excel']}/weather_data_{timestamp}.xlsx"
+            filename = self._build_filename(EXPORT_PATHS["excel"], data, "xlsx")
             
-            df.to_excel(filename, index=False, engine='openpyxl')
-            self._style_excel(filename)
+            if EXCEL_WRITER["engine"] == "openpyxl":
+                df.to_excel(filename, index=False, engine='openpyxl')
+                self._style_excel(filename)
+            else:
+                self._write_excel(df, filename)
             
-            logger.info(f"Excel exported: {filename}")
+            self._observe("excel", data, started)
+            logger.info("Excel exported: %s", filename, extra=self._log_fields(data))
             return filename
             
         except Exception as e:
             logger.error(f"Error exporting Excel: {e}")
             return None
     
+    def _observe(self, stage, data, started):
+        """Record the duration of an export stage for the payload's city"""
+        city = data.get("location", {}).get("city", "")
+        LOCATION_STAGE_SECONDS.observe(time.perf_counter() - started, stage, city)
+    
+    def _log_fields(self, data):
+        """Structured log fields for the payload's city"""
+        return {"location": data.get("location", {}).get("city")}
+    
+    def _load_payload(self, weather_json):
+        """Accept the in-memory payload, or parse legacy JSON strings"""
+        if isinstance(weather_json, WeatherPayload):
+            return weather_json.project(self.profile)
+        if isinstance(weather_json, Mapping):
+            return weather_json
+        return json.loads(weather_json)
+    
+    def _build_filename(self, directory, data, extension):
+        """Build a timestamped export filename, tagged with the city so that
+        several locations exported in the same second don't collide"""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        city = data.get("location", {}).get("city", "")
+        slug = slugify(city)
+        if slug:
+            return f"{directory}/weather_data_{slug}_{timestamp}.{extension}"
+        return f"{directory}/weather_data_{timestamp}.{extension}"
+    
     def _prepare_dataframe(self, data):
-        """Prepare DataFrame from weather data"""
+        """Prepare DataFrame from weather data, column by column"""
+        import pandas as pd
+        return pd.DataFrame(self._prepare_columns(data), columns=EXPORT_COLUMNS)
+    
+    def _prepare_rows(self, data):
+        """Prepare export row dicts from weather data"""
+        columns = self._prepare_columns(data)
+        return [dict(zip(columns, values)) for values in zip(*columns.values())]
+    
+    def _prepare_columns(self, data):
+        """Prepare the export columns: the current row, then one row per day
+        
+        Daily values are taken from the payload's columns, so no per-day
+        dicts are built for WeatherPayloads.
+        """
         location = data.get("location", {})
         current = data.get("current", {})
-        daily = data.get("daily", [])
+        daily = daily_columns(data.get("daily", []))
+        days = len(daily.get("date", []))
+        blank = [""] * days
         
-        rows = []
+        return {
+            "Type": ["Current"] + ["Forecast"] * days,
+            "City": [location.get("city", "")] * (days + 1),
+            "Date/Time": [current.get("time", "")] + daily.get("date", blank),
+            "Temperature (°C)": [current.get("temperature", "")] + blank,
+            "Apparent Temperature (°C)": [current.get("apparentTemperature", "")] + blank,
+            "Humidity (%)": [current.get("relativeHumidity", "")] + blank,
+            "UV Index": [current.get("uv", "")] + daily.get("uvIndexMax", blank),
+            "Weather": [
+                describe_weather(code) for code in [current.get("weatherCode", ""), *daily.get("weatherCode", blank)]
+            ],
+            "Precipitation (%)": [current.get("precipitationProbability", "")] + daily.get("precipitationProbability", blank),
+            "Max Temp (°C)": [""] + daily.get("temperatureMax", blank),
+            "Min Temp (°C)": [""] + daily.get("temperatureMin", blank)
+        }
+    
+    def _write_excel(self, df, filename):
+        """Write and style an Excel file in a single pass with xlsxwriter
         
-        # Current weather row
-        rows.append({
-            "Type": "Current",
-            "City": location.get("city", ""),
-            "Date/Time": current.get("time", ""),
-            "Temperature (°C)": current.get("temperature", ""),
-            "Apparent Temperature (°C)": current.get("apparentTemperature", ""),
-            "Humidity (%)": current.get("relativeHumidity", ""),
-            "UV Index": current.get("uv", ""),
-            "Weather": current.get("weatherCode", ""),
-            "Precipitation (%)": current.get("precipitationProbability", ""),
-            "Max Temp (°C)": "",
-            "Min Temp (°C)": ""
-        })
+        Header style and column widths are computed from the DataFrame, so
+        the file is never re-opened. Rows are written in order, so the
+        workbook runs in constant-memory mode and flushes each row to disk as
+        soon as it is written.
+        """
+        import xlsxwriter
         
-        # Daily forecast rows
-        for day in daily:
-            rows.append({
-                "Type": "Forecast",
-                "City": location.get("city", ""),
-                "Date/Time": day.get("date", ""),
-                "Temperature (°C)": "",
-                "Apparent Temperature (°C)": "",
-                "Humidity (%)": "",
-                "UV Index": day.get("uvIndexMax", ""),
-                "Weather": day.get("weatherCode", ""),
-                "Precipitation (%)": day.get("precipitationProbability", ""),
-                "Max Temp (°C)": day.get("temperatureMax", ""),
-                "Min Temp (°C)": day.get("temperatureMin", "")
+        workbook = xlsxwriter.Workbook(filename, {"constant_memory": True})
+        try:
+            ws = workbook.add_worksheet()
+            header_format = workbook.add_format({
+                "bold": True,
+                "font_color": "#FFFFFF",
+                "bg_color": "#4472C4",
+                "align": "center",
+                "valign": "vcenter"
             })
-        
-        return pd.DataFrame(rows)
+            
+            # Column widths: longest header/value text, capped like _style_excel;
+            # missing values are written as blank cells
+            for col, name in enumerate(df.columns):
+                values_width = df[name].fillna("").astype(str).str.len().max() if len(df) else 0
+                ws.set_column(col, col, min(max(len(str(name)), values_width) + 2, 50))
+            
+            ws.write_row(0, 0, df.columns, header_format)
+            values = df.astype(object).where(df.notna(), None)
+            for row, record in enumerate(values.itertuples(index=False, name=None), start=1):
+                ws.write_row(row, 0, record)
+        finally:
+            workbook.close()
     
     def _style_excel(self, filename):
         """Apply styling to Excel file"""
+        from openpyxl import load_workbook
+        from openpyxl.styles import Font, PatternFill, Alignment
+        from openpyxl.utils import get_column_letter
+        
         try:
             wb = load_workbook(filename)
             ws = wb.active
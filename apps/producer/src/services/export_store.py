@@ -0,0 +1,191 @@
+"""Rolling append-only export store
+
+Instead of a new CSV per tick, rows are appended to one CSV per city per day
+(``<root>/<YYYY-MM-DD>/<city-slug>.csv``), and only when they are new or
+changed since the last row written for the same key. Past days are
+compacted to the latest version of each row once a new day starts.
+"""
+import csv
+import logging
+import os
+from datetime import datetime, timedelta
+
+from src.utils.parsers import slugify
+
+logger = logging.getLogger(__name__)
+
+RECORDED_AT = "Recorded At"
+RECORDED_AT_FORMAT = "%Y-%m-%dT%H:%M:%S"
+DAY_FORMAT = "%Y-%m-%d"
+COMPACTED_MARKER = ".compacted"
+
+class RollingExportStore:
+    """Append-only, per-day, per-city CSV store for export rows"""
+
+    def __init__(self, root, columns):
+        """Initialize the store
+
+        Args:
+            root (str): Directory holding one sub-directory per day
+            columns (list): Export row columns, in file order
+        """
+        self.root = root
+        self.columns = [RECORDED_AT] + list(columns)
+        # (day, city slug) -> {row key: row values} for the last written rows
+        self._last_rows = {}
+        self._compacted_before = None
+        os.makedirs(self.root, exist_ok=True)
+
+    def append(self, rows, recorded_at=None):
+        """Append the rows that are new or changed
+
+        Args:
+            rows (list): Export row dicts for one city
+            recorded_at (datetime): Tick time (default: now)
+
+        Returns:
+            int: Number of rows written
+        """
+        if not rows:
+            return 0
+        recorded_at = recorded_at or datetime.now()
+        day = recorded_at.strftime(DAY_FORMAT)
+        self._compact_past_days(day)
+
+        city = slugify(str(rows[0].get("City", ""))) or "unknown"
+        last_rows = self._load_last_rows(day, city)
+
+        changed = []
+        for row in rows:
+            key, values = self._row_identity(row)
+            if last_rows.get(key) != values:
+                last_rows[key] = values
+                changed.append(row)
+        if not changed:
+            return 0
+
+        path = self._partition_path(day, city)
+        is_new = not os.path.exists(path)
+        with open(path, "a", newline="", encoding="utf-8-sig") as f:
+            writer = csv.DictWriter(f, fieldnames=self.columns, extrasaction="ignore")
+            if is_new:
+                writer.writeheader()
+            stamp = recorded_at.strftime(RECORDED_AT_FORMAT)
+            writer.writerows({RECORDED_AT: stamp, **row} for row in changed)
+        return len(changed)
+
+    def read_range(self, start, end, city=None):
+        """Read the rows recorded between ``start`` and ``end`` (inclusive)
+
+        Only the day partitions inside the range are opened.
+
+        Args:
+            start (datetime): Range start
+            end (datetime): Range end
+            city (str): Optional city name to restrict the read to
+
+        Returns:
+            pd.DataFrame: Matching rows ordered by recording time
+        """
+        import pandas as pd
+
+        frames = []
+        day = start.date()
+        while day <= end.date():
+            day_dir = os.path.join(self.root, day.strftime(DAY_FORMAT))
+            if os.path.isdir(day_dir):
+                names = [f"{slugify(city)}.csv"] if city else sorted(os.listdir(day_dir))
+                for name in names:
+                    path = os.path.join(day_dir, name)
+                    if name.endswith(".csv") and os.path.exists(path):
+                        frames.append(pd.read_csv(path, encoding="utf-8-sig", dtype=str, keep_default_na=False))
+            day += timedelta(days=1)
+
+        if not frames:
+            return pd.DataFrame(columns=self.columns)
+        df = pd.concat(frames, ignore_index=True)
+        recorded = pd.to_datetime(df[RECORDED_AT], format=RECORDED_AT_FORMAT)
+        mask = (recorded >= pd.Timestamp(start.replace(tzinfo=None))) & (recorded <= pd.Timestamp(end.replace(tzinfo=None)))
+        return df[mask].sort_values(RECORDED_AT, kind="stable").reset_index(drop=True)
+
+    def compact(self, day):
+        """Rewrite a day's files keeping only the latest version of each row
+
+        Args:
+            day (str): Partition day, formatted YYYY-MM-DD
+
+        Returns:
+            int: Number of rows removed
+        """
+        day_dir = os.path.join(self.root, day)
+        removed = 0
+        if not os.path.isdir(day_dir):
+            return removed
+        for name in sorted(os.listdir(day_dir)):
+            if not name.endswith(".csv"):
+                continue
+            path = os.path.join(day_dir, name)
+            rows = self._read_rows(path)
+            # Every distinct current reading is kept; forecast rows keep their last version
+            latest = {}
+            for row in rows:
+                key = (row.get("Type"), row.get("Date/Time"))
+                latest.pop(key, None)
+                latest[key] = row
+            removed += len(rows) - len(latest)
+
+            # Shards on one host may compact the same past day; never share a temp file
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", newline="", encoding="utf-8-sig") as f:
+                writer = csv.DictWriter(f, fieldnames=self.columns, extrasaction="ignore")
+                writer.writeheader()
+                writer.writerows(latest.values())
+            os.replace(tmp_path, path)
+
+        open(os.path.join(day_dir, COMPACTED_MARKER), "w").close()
+        self._last_rows = {k: v for k, v in self._last_rows.items() if k[0] != day}
+        logger.info(f"Compacted export partition {day}: {removed} superseded rows removed")
+        return removed
+
+    def _compact_past_days(self, today):
+        # Compact finished days once, the first time a later day is written
+        if self._compacted_before == today:
+            return
+        for day in sorted(os.listdir(self.root)):
+            day_dir = os.path.join(self.root, day)
+            if day < today and os.path.isdir(day_dir) and not os.path.exists(os.path.join(day_dir, COMPACTED_MARKER)):
+                try:
+                    self.compact(day)
+                except Exception as e:
+                    logger.warning(f"Could not compact export partition {day}: {e}")
+        self._compacted_before = today
+
+    def _row_identity(self, row):
+        # Forecast rows are keyed by date; current readings have a single key and
+        # their timestamp is left out, so an unchanged reading is not re-appended
+        values = tuple("" if row.get(c) is None else str(row.get(c)) for c in self.columns[1:] if c != "Date/Time")
+        if row.get("Type") == "Current":
+            return ("Current",), values
+        return (row.get("Type"), str(row.get("Date/Time"))), values
+
+    def _load_last_rows(self, day, city):
+        # Rebuild the last written version of each key from disk after a restart
+        key = (day, city)
+        if key not in self._last_rows:
+            path = self._partition_path(day, city)
+            last_rows = {}
+            if os.path.exists(path):
+                for row in self._read_rows(path):
+                    row_key, values = self._row_identity(row)
+                    last_rows[row_key] = values
+            self._last_rows[key] = last_rows
+        return self._last_rows[key]
+
+    def _partition_path(self, day, city):
+        day_dir = os.path.join(self.root, day)
+        os.makedirs(day_dir, exist_ok=True)
+        return os.path.join(day_dir, f"{city}.csv")
+
+    def _read_rows(self, path):
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            return list(csv.DictReader(f))
@@ -0,0 +1,215 @@
+"""Store of finalized past days of the daily series, per location
+
+Lets the weather service re-request only the most recent past days.
+"""
+import logging
+import os
+import threading
+from functools import lru_cache
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from src.utils.parsers import slugify
+
+logger = logging.getLogger(__name__)
+
+EPOCH = date(1970, 1, 1)
+
+def _today(timezone):
+    # Local calendar day number (days since 1970-01-01)
+    return (datetime.now(ZoneInfo(timezone)).date() - EPOCH).days
+
+def _day_number(timestamp, timezone):
+    # Local calendar day of a daily timestamp. Daily timestamps are local
+    # midnight, give or take an hour when the series crosses a DST change
+    local = datetime.fromtimestamp(timestamp, ZoneInfo(timezone))
+    day = local.date() + timedelta(days=1 if local.hour >= 12 else 0)
+    return (day - EPOCH).days
+
+class _Values:
+    """Mimics openmeteo_sdk VariableWithValues for a merged column"""
+
+    def __init__(self, values):
+        self._values = values
+
+    def ValuesAsNumpy(self):
+        return self._values
+
+    def ValuesLength(self):
+        return len(self._values)
+
+class HistoryDaily:
+    """Daily block with the Open-Meteo SDK interface: stored days + fresh window"""
+
+    def __init__(self, start, interval, columns):
+        self._start = start
+        self._interval = interval
+        self._columns = [_Values(column) for column in columns]
+
+    def Time(self):
+        return self._start
+
+    def TimeEnd(self):
+        return self._start + self._interval * len(self._columns[0].ValuesAsNumpy())
+
+    def Interval(self):
+        return self._interval
+
+    def Variables(self, index):
+        return self._columns[index]
+
+    def VariablesLength(self):
+        return len(self._columns)
+
+class DailyHistoryStore:
+    """Finalized past days per location, in memory and on disk
+
+    A location's days are kept as one contiguous run (first day number plus
+    a (days x variables) array): the refresh window always overlaps the
+    stored run, and a location whose run has a gap gets a full window,
+    which replaces it.
+    """
+
+    def __init__(self, root, past_days, refresh_days):
+        """Initialize the store
+
+        Args:
+            root (str): Directory holding one .npy file per location
+            past_days (int): Past days the payload must cover
+            refresh_days (int): Most recent past days that are always
+                re-requested; older days are served from the store
+        """
+        self.root = root
+        self.past_days = past_days
+        self.refresh_days = refresh_days
+        # location key -> (first day number, values of shape (days, variables))
+        self._histories = {}
+        # Reentrant: update holds it while reading the stored run through _get
+        self._lock = threading.RLock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def has_history(self, location):
+        """Whether every day older than the refresh window is stored"""
+        today = _today(location["timezone"])
+        first, values = self._get(location)
+        return first <= today - self.past_days and first + len(values) >= today - self.refresh_days
+
+    def merge(self, location, daily):
+        """Prepend the stored days to a daily block covering the refresh window
+
+        Args:
+            location (dict): Location of the response
+            daily: Daily block of a response requested with past_days=refresh_days
+
+        Returns:
+            HistoryDaily: Block covering PAST_DAYS past days plus the forecast,
+                or None when a stored day is missing
+        """
+        start_day = _day_number(daily.Time(), location["timezone"])
+        count = self.past_days - self.refresh_days
+        first, values = self._get(location)
+        lo = start_day - count - first
+        if lo < 0 or start_day - first > len(values) or values.shape[1] != daily.VariablesLength():
+            return None
+
+        fresh = np.column_stack([daily.Variables(i).ValuesAsNumpy() for i in range(values.shape[1])])
+        merged = np.concatenate([values[lo:lo + count], fresh.astype(values.dtype, copy=False)])
+        interval = daily.Interval() or 86400
+        return HistoryDaily(daily.Time() - count * interval, interval, list(merged.T))
+
+    def update(self, location, daily):
+        """Store the finalized days of a daily block (full or refresh window)"""
+        timezone = location["timezone"]
+        today = _today(timezone)
+        start_day = _day_number(daily.Time(), timezone)
+        count = min(daily.Variables(0).ValuesLength(), today - self.refresh_days - start_day + 1)
+        if count <= 0:
+            return
+        new_values = np.column_stack(
+            [daily.Variables(i).ValuesAsNumpy()[:count] for i in range(daily.VariablesLength())]
+        ).astype(np.float32, copy=False)
+
+        key = self._key(location)
+        with self._lock:
+            first, values = self._get(location)
+            end = first + len(values)
+            offset = start_day - first
+            if (
+                values.shape[1] == new_values.shape[1]
+                and first <= start_day and start_day + count <= end
+                and np.array_equal(values[offset:offset + count], new_values, equal_nan=True)
+            ):
+                # Common case on a refresh window: the finalized days are already stored
+                return
+
+            if values.shape[1] != new_values.shape[1] or start_day > end or start_day + count < first:
+                # Not contiguous with the stored run: start over from this block
+                first, values = start_day, new_values
+            else:
+                lo, hi = min(first, start_day), max(end, start_day + count)
+                merged = np.full((hi - lo, new_values.shape[1]), np.nan, dtype=np.float32)
+                merged[first - lo:end - lo] = values
+                merged[start_day - lo:start_day - lo + count] = new_values
+                first, values = lo, merged
+
+            # Keep only the days the payload can still need
+            oldest = today - self.past_days
+            if first < oldest:
+                values = values[oldest - first:]
+                first = oldest
+            self._histories[key] = (first, values)
+            self._save(key, first, values)
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _location_key(city, latitude, longitude):
+        return f"{slugify(city)}_{float(latitude):.4f}_{float(longitude):.4f}"
+
+    def _key(self, location):
+        return self._location_key(location.get("city", ""), location["latitude"], location["longitude"])
+
+    def _path(self, key):
+        return os.path.join(self.root, f"{key}.npy")
+
+    def _get(self, location):
+        # Days of a location, loaded from disk on first use. Fetch workers of
+        # the adaptive runner call this concurrently
+        key = self._key(location)
+        with self._lock:
+            history = self._histories.get(key)
+            if history is None:
+                history = self._load(key)
+                self._histories[key] = history
+            return history
+
+    def _load(self, key):
+        path = self._path(key)
+        try:
+            stored = np.load(path, mmap_mode="r")
+            days = np.array(stored["day"])
+            if len(days):
+                # Keep the trailing contiguous run of days
+                breaks = np.flatnonzero(np.diff(days) != 1)
+                start = breaks[-1] + 1 if len(breaks) else 0
+                return int(days[start]), np.array(stored["values"][start:])
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable history file {path}: {e}")
+        return 0, np.empty((0, 0), dtype=np.float32)
+
+    def _save(self, key, first, values):
+        # Columnar record: day number + one float32 per daily variable
+        record = np.empty(len(values), dtype=[("day", "<i4"), ("values", "<f4", (values.shape[1],))])
+        record["day"] = first + np.arange(len(values))
+        record["values"] = values
+        path = self._path(key)
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                np.save(f, record)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not save history file {path}: {e}")
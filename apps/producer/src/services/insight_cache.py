@@ -0,0 +1,129 @@
+"""Cache for AI insights keyed on a quantized weather fingerprint
+
+Insights only depend on coarse conditions, so payloads whose rounded
+readings match (same city an hour later, or neighbouring cities) reuse the
+same insight instead of issuing another chat completion.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from src.utils.parsers import describe_weather
+
+logger = logging.getLogger(__name__)
+
+def _quantize(value, step):
+    try:
+        return round(float(value) / step) * step
+    except (TypeError, ValueError):
+        return None
+
+def insight_fingerprint(payload, steps):
+    """Build the cache key for a payload
+
+    Args:
+        payload (dict): Weather payload
+        steps (dict): Quantization steps (temperature_step, humidity_step,
+            uv_step, rain_step)
+
+    Returns:
+        str: Fingerprint of the conditions the insight prompt depends on
+    """
+    current = payload.get("current", {})
+    rain = current.get("precipitationProbability")
+    parts = [
+        _quantize(current.get("temperature"), steps["temperature_step"]),
+        _quantize(current.get("relativeHumidity"), steps["humidity_step"]),
+        _quantize(current.get("uv"), steps["uv_step"]),
+        describe_weather(current.get("weatherCode")),
+        None if rain is None else int(rain) // steps["rain_step"],
+    ]
+    parts.extend(describe_weather(day.get("weatherCode")) for day in payload.get("daily", [])[:3])
+    return "|".join(str(part) for part in parts)
+
+class InsightCache:
+    """Thread-safe TTL + LRU cache of insights, optionally persisted to JSON"""
+
+    def __init__(self, ttl_seconds, max_entries, path=None):
+        """Initialize the cache
+
+        Args:
+            ttl_seconds (int): Lifetime of an entry
+            max_entries (int): Entries kept before the least recently used is evicted
+            path (str): Optional JSON file to persist entries across restarts
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._load()
+
+    def get(self, key):
+        """Return the cached insight for ``key``, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] < time.time():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, insight):
+        """Store an insight, evicting the least recently used entries"""
+        with self._lock:
+            self._entries[key] = (insight, time.time() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._save()
+
+    def stats(self):
+        """Return hit/miss/eviction counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hitRate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+    def _load(self):
+        # Restore unexpired entries persisted by a previous run
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                stored = json.load(f)
+            now = time.time()
+            for key, (insight, expires_at) in stored.items():
+                if expires_at > now:
+                    self._entries[key] = (insight, expires_at)
+            logger.info(f"Loaded {len(self._entries)} cached AI insights from {self.path}")
+        except Exception as e:
+            logger.warning(f"Could not load AI insight cache: {e}")
+
+    def _save(self):
+        # Persist entries atomically; called with the lock held
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning(f"Could not persist AI insight cache: {e}")
@@ -0,0 +1,75 @@
+"""Index of monitored locations by forecast model grid cell"""
+from collections import Counter, OrderedDict
+
+class LocationIndex:
+    """Groups locations by grid cell
+
+    Cities configured in the same cell and timezone (daily aggregates depend
+    on it) are fetched once at the cell centre; a city alone in its cell
+    keeps its own coordinates.
+    """
+
+    def __init__(self, resolution_degrees, locations=()):
+        """Initialize the index
+
+        Args:
+            resolution_degrees (float): Grid spacing; 0 only merges locations
+                with identical coordinates
+            locations (list): Configured locations; only cells holding
+                several of them are fetched at the cell centre, so a
+                location's fetch coordinates do not depend on the batch
+        """
+        self.resolution_degrees = resolution_degrees
+        counts = Counter(self._cell_key(location) for location in locations)
+        self._shared = {key for key, count in counts.items() if count > 1}
+
+    def snap(self, latitude, longitude):
+        """Return the coordinates of the cell centre for a point"""
+        step = self.resolution_degrees
+        if not step:
+            return round(float(latitude), 4), round(float(longitude), 4)
+        return round(round(float(latitude) / step) * step, 4), round(round(float(longitude) / step) * step, 4)
+
+    def cell_location(self, location):
+        """Return the location dict used to fetch the cell of ``location``"""
+        key = self._cell_key(location)
+        if key in self._shared:
+            latitude, longitude = key[:2]
+        else:
+            latitude, longitude = location["latitude"], location["longitude"]
+        return {
+            "city": f"cell {location['timezone']}",
+            "latitude": latitude,
+            "longitude": longitude,
+            "timezone": location["timezone"],
+        }
+
+    def group(self, locations):
+        """Group locations by cell, in first-seen order
+
+        Args:
+            locations (list): Location dicts
+
+        Returns:
+            list: (cell location, [locations in the cell]) pairs
+        """
+        cells = OrderedDict()
+        for location in locations:
+            cell = self.cell_location(location)
+            key = (cell["latitude"], cell["longitude"], cell["timezone"])
+            if key not in cells:
+                cells[key] = (cell, [])
+            cells[key][1].append(location)
+        return list(cells.values())
+
+    def plan_batches(self, locations, batch_size):
+        """Split locations into batches of at most ``batch_size`` cells,
+        keeping every city of a cell in the same batch"""
+        cells = self.group(locations)
+        return [
+            [location for _, members in cells[start:start + batch_size] for location in members]
+            for start in range(0, len(cells), batch_size)
+        ]
+
+    def _cell_key(self, location):
+        return (*self.snap(location["latitude"], location["longitude"]), location["timezone"])
@@ -1,156 +1,411 @@
 # Weather data service - main business logic
-import pandas as pd
 from datetime import datetime
 from zoneinfo import ZoneInfo
+import hashlib
 import json
 import numpy as np
 import logging
+import os
+import threading
+import time
+from concurrent.futures import wait
 
 from src.api.weather_client import WeatherAPIClient
-from src.utils.parsers import parse_weather_code, convert_numpy_to_python
-from config.settings import LOCATION, PAST_DAYS
+from src.models.profiles import DAILY_VARIABLES, api_variables, get_profile, merge_profiles
+from src.models.weather_data import DAILY_FIELDS, CurrentConditions, DailyForecast, WeatherPayload, to_wire
+from src.services.insight_cache import InsightCache, insight_fingerprint
+from src.services.history_store import DailyHistoryStore
+from src.services.location_index import LocationIndex
+from src.utils.parsers import parse_weather_code, normalize_weather_code, convert_numpy_to_python
+from src.utils.metrics import STAGE_SECONDS, LOCATION_STAGE_SECONDS
+from config.settings import (
+    LOCATION, LOCATIONS, LOCATIONS_BATCH_SIZE, OPEN_METEO_MODEL, GRID_RESOLUTION_DEGREES,
+    HOURLY_WINDOW, DAILY_HISTORY, PROFILES,
+    WEATHER_CODE_FORMAT, AI_INSIGHT_CACHE, AI_BATCH
+)
 
 logger = logging.getLogger(__name__)
 
 class WeatherService:
     # Service for processing weather data
     
-    def __init__(self):
+    def __init__(self, api_client=None):
         #Initialize weather service
-        self.api_client = WeatherAPIClient()
+        self.api_client = api_client or WeatherAPIClient()
+        # Weather codes go out as descriptions or as compact WMO integers
+        self.encode_weather_code = normalize_weather_code if WEATHER_CODE_FORMAT == "wmo" else parse_weather_code
+        # Payloads are read through their consumer's profile; Open-Meteo is
+        # only asked for the variables and days of the union
+        self.profiles = {use: get_profile(name) for use, name in PROFILES.items()}
+        self.fetch_profile = merge_profiles(self.profiles.values())
+        self.variables = api_variables(self.fetch_profile)
+        self.past_days = self.fetch_profile.past_days
+        logger.info(
+            f"Output profiles {PROFILES}: fetching {sum(map(len, self.variables.values()))} variables, "
+            f"{self.past_days} past and {self.fetch_profile.forecast_days} forecast days"
+        )
+        self.ai_service = None
+        self._ai_service_lock = threading.Lock()
+        # (fingerprint, future, payloads) for insights that missed the inline wait
+        self._pending_insights = []
+        self._pending_lock = threading.Lock()
+        self.insight_cache = InsightCache(
+            AI_INSIGHT_CACHE["ttl_seconds"],
+            AI_INSIGHT_CACHE["max_entries"],
+            AI_INSIGHT_CACHE["path"]
+        )
+        # Cities sharing a model grid cell are fetched once
+        self.location_index = LocationIndex(GRID_RESOLUTION_DEGREES, LOCATIONS)
+        # Finalized past days are served locally; only recent days are re-requested
+        self.history = None
+        if DAILY_HISTORY["enabled"] and self.variables["daily"] and self.past_days > DAILY_HISTORY["refresh_days"]:
+            self.history = DailyHistoryStore(
+                self._history_path(), self.past_days, DAILY_HISTORY["refresh_days"]
+            )
         logger.info("Weather service initialized")
     
-    def get_weather_data(self, include_ai_insight=False):
-        # Fetch and process weather data
+    def get_weather_data(self, include_ai_insight=False, location=None):
+        # Fetch and process weather data for a single location, as a JSON string
+        payload = self.get_weather_payload(include_ai_insight, location)
+        return json.dumps(payload, ensure_ascii=False, indent=2, default=to_wire)
+    
+    def _history_path(self):
+        # Stored columns follow the requested daily variables; another
+        # variable set gets its own directory
+        full = api_variables(get_profile("full"))["daily"]
+        if self.variables["daily"] == full:
+            return DAILY_HISTORY["path"]
+        digest = hashlib.sha1(",".join(self.variables["daily"]).encode("utf-8")).hexdigest()[:8]
+        return os.path.join(DAILY_HISTORY["path"], f"variables-{digest}")
+    
+    def get_weather_payload(self, include_ai_insight=False, location=None):
+        # Fetch and process weather data for a single location, as a WeatherPayload
+        location = location or LOCATION
         logger.info(f"Fetching weather data (AI insight: {include_ai_insight})")
         
-        params = self._build_api_params()
-        response = self.api_client.fetch_weather_data(params)
+        with STAGE_SECONDS.time("fetch"):
+            (_, response, daily), = self._fetch_batch([self.location_index.cell_location(location)])
+        with STAGE_SECONDS.time("transform"):
+            daily_data = self._process_daily_data(daily)
+            payload = self._build_payload(location, response, include_ai_insight, daily_data)
+        
+        logger.info("Weather data processed successfully")
+        return payload
+    
+    def get_weather_data_batch(self, locations=None, include_ai_insight=False, refresh=False):
+        # Fetch and process weather data for many locations, one API call per batch.
+        # Returns WeatherPayloads; they are serialized once, when published.
+        # refresh=True bypasses the API cache (fast refreshes of the adaptive runner)
+        locations = locations or LOCATIONS
+        logger.info(f"Fetching weather data for {len(locations)} locations (AI insight: {include_ai_insight})")
         
+        # One fetch per grid cell; cities in a cell share the response and
+        # daily rows, with their own location metadata reattached
+        cells = self.location_index.group(locations)
+        logger.info(
+            f"Grid dedup: {len(locations)} locations -> {len(cells)} cells "
+            f"({len(locations) / max(len(cells), 1):.2f}x, {GRID_RESOLUTION_DEGREES} deg grid)"
+        )
+        
+        results = []
+        for start in range(0, len(cells), LOCATIONS_BATCH_SIZE):
+            batch = cells[start:start + LOCATIONS_BATCH_SIZE]
+            try:
+                with STAGE_SECONDS.time("fetch"):
+                    fetched = self._fetch_batch([cell for cell, _ in batch], refresh)
+            except Exception as e:
+                logger.error(f"Skipping batch of {len(batch)} cells: {e}")
+                continue
+            
+            with STAGE_SECONDS.time("transform"):
+                daily_blocks = self._process_daily_block([daily for _, _, daily in fetched])
+                for (_, members), (_, response, _), daily_data in zip(batch, fetched, daily_blocks):
+                    for location in members:
+                        started = time.perf_counter()
+                        results.append(self._build_payload(location, response, daily_data=daily_data))
+                        LOCATION_STAGE_SECONDS.observe(time.perf_counter() - started, "transform", location.get("city", ""))
+        
+        logger.info(f"Weather data processed for {len(results)}/{len(locations)} locations")
+        if include_ai_insight:
+            with STAGE_SECONDS.time("ai_insight"):
+                self._add_ai_insights(results)
+            logger.info(f"AI insight cache: {self.insight_cache.stats()}")
+        return results
+    
+    def collect_late_insights(self, timeout=None):
+        # Wait for insights left pending by get_weather_data_batch and return
+        # follow-up payloads carrying them; insights still missing are dropped
+        timeout = AI_BATCH["followup_wait_seconds"] if timeout is None else timeout
+        with self._pending_lock:
+            pending, self._pending_insights = self._pending_insights, []
+        if not pending:
+            return []
+        
+        wait([future for _, future, _ in pending], timeout=timeout)
+        followups = []
+        for key, future, payloads in pending:
+            if not future.done():
+                future.cancel()
+                logger.warning(f"AI insight missed the follow-up deadline for {len(payloads)} location(s)")
+                continue
+            insight = self._store_insight(key, future.result())
+            followups.extend(payload.with_insight(insight) for payload in payloads)
+        
+        logger.info(f"{len(followups)} follow-up insight payload(s) ready")
+        return followups
+    
+    def _build_payload(self, location, response, include_ai_insight=False, daily_data=None):
+        # Turn one Open-Meteo response into the published payload
         hourly = response.Hourly()
         current = response.Current()
         daily = response.Daily()
         
-        now = datetime.now(ZoneInfo(LOCATION["timezone"]))
+        now = datetime.now(ZoneInfo(location["timezone"]))
         current_time = now.strftime("%d/%m/%Y %H:%M:%S")
         
         # Process hourly precipitation
-        current_precip_prob = self._get_current_precipitation(hourly, now)
-        
-        # Process daily data
-        daily_data = self._process_daily_data(daily)
-        
-        # Build payload
-        payload = {
-            "location": LOCATION,
-            "current": {
-                "time": current_time,
-                "temperature": float(convert_numpy_to_python(current.Variables(0).Value())),
-                "relativeHumidity": float(convert_numpy_to_python(current.Variables(1).Value())),
-                "apparentTemperature": float(convert_numpy_to_python(current.Variables(2).Value())),
-                "isDay": bool(convert_numpy_to_python(current.Variables(3).Value())),
-                "uv": float(convert_numpy_to_python(current.Variables(4).Value())),
-                "weatherCode": parse_weather_code(int(convert_numpy_to_python(current.Variables(5).Value()))),
-                "precipitationProbability": current_precip_prob
-            },
-            "daily": daily_data,
-            "pastDays": PAST_DAYS
-        }
+        current_precip_prob = None
+        if self.variables["hourly"]:
+            current_precip_prob = self._get_current_precipitation(hourly, now, location["timezone"])
+        
+        # Process daily data (already done as a block on the batch path)
+        if daily_data is None:
+            daily_data = self._process_daily_data(daily)
+        
+        # Build payload; fields outside the fetch profile stay None
+        values = {}
+        if self.variables["current"]:
+            values = {
+                variable: convert_numpy_to_python(current.Variables(index).Value())
+                for index, variable in enumerate(self.variables["current"])
+            }
+        
+        def value(variable, convert):
+            return None if values.get(variable) is None else convert(values[variable])
+        
+        payload = WeatherPayload(
+            location,
+            CurrentConditions(
+                current_time,
+                value("temperature_2m", float),
+                value("relative_humidity_2m", float),
+                value("apparent_temperature", float),
+                value("is_day", bool),
+                value("uv_index", float),
+                value("weather_code", self.encode_weather_code),
+                current_precip_prob
+            ),
+            daily_data,
+            self.past_days,
+            profile=self.profiles["payload"]
+        )
         
         # Add AI insight if requested
         if include_ai_insight:
             payload = self._add_ai_insight(payload)
         
-        logger.info("Weather data processed successfully")
-        return json.dumps(payload, ensure_ascii=False, indent=2)
-    
-    def _build_api_params(self):
-        # Build API request parameters
-        return {
-            "latitude": LOCATION["latitude"],
-            "longitude": LOCATION["longitude"],
-            "past_days": PAST_DAYS,
-            "hourly": "precipitation_probability",
-            "daily": [
-                "temperature_2m_max",
-                "temperature_2m_min",
-                "apparent_temperature_max",
-                "apparent_temperature_min",
-                "uv_index_max",
-                "precipitation_probability_mean",
-                "weather_code"
-            ],
-            "current": [
-                "temperature_2m",
-                "relative_humidity_2m",
-                "apparent_temperature",
-                "is_day",
-                "uv_index",
-                "weather_code"
-            ],
-            "timezone": LOCATION["timezone"],
-            "models": "best_match"
+        return payload
+    
+    def _fetch_batch(self, locations, refresh=False):
+        # Fetch one batch and return (location, response, daily block) per location.
+        # Locations with stored history only request the last refresh days and
+        # get the stored days prepended; the others request all past days
+        short, full = [], []
+        for index, location in enumerate(locations):
+            (short if self.history and self.history.has_history(location) else full).append(index)
+        
+        fetched = [None] * len(locations)
+        if short:
+            refresh_days = DAILY_HISTORY["refresh_days"]
+            for index, response in self._fetch_responses(locations, short, refresh_days, refresh):
+                self.history.update(locations[index], response.Daily())
+                daily = self.history.merge(locations[index], response.Daily())
+                if daily is None:
+                    # History gap (e.g. the server already rolled over the day): refetch in full
+                    full.append(index)
+                else:
+                    fetched[index] = (locations[index], response, daily)
+        if full:
+            for index, response in self._fetch_responses(locations, full, self.past_days, refresh):
+                if self.history:
+                    self.history.update(locations[index], response.Daily())
+                fetched[index] = (locations[index], response, response.Daily())
+        
+        if self.history:
+            logger.info(f"Daily history: {len(locations) - len(full)} merged, {len(full)} full window(s)")
+        return fetched
+    
+    def _fetch_responses(self, locations, indexes, past_days, refresh=False):
+        # One API call for locations[indexes]; returns (index, response) pairs
+        batch = [locations[index] for index in indexes]
+        responses = self.api_client.fetch_weather_batch(self._build_api_params(batch, past_days), refresh)
+        if len(responses) != len(batch):
+            raise ValueError(f"Expected {len(batch)} responses, got {len(responses)}")
+        return zip(indexes, responses)
+    
+    def _build_api_params(self, locations=None, past_days=None):
+        # Build API request parameters for the fetch profile; several
+        # locations are sent comma-separated
+        locations = locations or [LOCATION]
+        params = {
+            "latitude": ",".join(str(loc["latitude"]) for loc in locations),
+            "longitude": ",".join(str(loc["longitude"]) for loc in locations),
+            "past_days": self.past_days if past_days is None else past_days,
+            "forecast_days": self.fetch_profile.forecast_days,
+            "timezone": ",".join(loc["timezone"] for loc in locations),
+            "models": OPEN_METEO_MODEL
         }
+        if self.variables["hourly"]:
+            params["past_hours"] = HOURLY_WINDOW["past_hours"]
+            params["forecast_hours"] = HOURLY_WINDOW["forecast_hours"]
+            params["hourly"] = ",".join(self.variables["hourly"])
+        for block in ("daily", "current"):
+            if self.variables[block]:
+                params[block] = self.variables[block]
+        return params
     
-    def _get_current_precipitation(self, hourly, now):
-        # Get current hour precipitation probability
-        hourly_length = hourly.Variables(0).ValuesLength()
-        hourly_start = pd.to_datetime(hourly.Time(), unit="s", utc=True).tz_convert(LOCATION["timezone"])
-        hourly_times = [hourly_start + pd.Timedelta(hours=i) for i in range(hourly_length)]
+    def _get_current_precipitation(self, hourly, now, timezone):
+        # Get current hour precipitation probability; the index is derived
+        # arithmetically from the series start and interval instead of a scan
         hourly_precip_probs = hourly.Variables(0).ValuesAsNumpy()
+        current_hour = int(now.replace(minute=0, second=0, microsecond=0).timestamp())
         
-        current_hour = now.replace(minute=0, second=0, microsecond=0)
-        
-        for i, hour_time in enumerate(hourly_times):
-            if hour_time.replace(tzinfo=None) == current_hour.replace(tzinfo=None):
-                return int(hourly_precip_probs[i]) if not np.isnan(hourly_precip_probs[i]) else 0
+        offset = current_hour - hourly.Time()
+        interval = hourly.Interval() or 3600
+        index = offset // interval
+        if offset % interval or not 0 <= index < len(hourly_precip_probs):
+            return 0
         
-        return 0
+        value = hourly_precip_probs[index]
+        return 0 if np.isnan(value) else int(value)
     
     def _process_daily_data(self, daily):
-        # Process daily forecast data
-        length = daily.Variables(0).ValuesLength()
-        start = pd.to_datetime(daily.Time(), unit="s")
-        dates = [start + pd.Timedelta(days=i) for i in range(length)]
-        
-        temp_max = daily.Variables(0).ValuesAsNumpy()
-        temp_min = daily.Variables(1).ValuesAsNumpy()
-        apparent_max = daily.Variables(2).ValuesAsNumpy()
-        apparent_min = daily.Variables(3).ValuesAsNumpy()
-        uv_index = daily.Variables(4).ValuesAsNumpy()
-        rain_probability = daily.Variables(5).ValuesAsNumpy()
-        daily_weather_codes = daily.Variables(6).ValuesAsNumpy()
-        
-        daily_data = []
-        for i in range(length):
-            rain_prob = 0 if np.isnan(rain_probability[i]) else int(rain_probability[i])
-            
-            daily_data.append({
-                "date": dates[i].strftime("%d/%m/%Y"),
-                "temperatureMax": float(temp_max[i]),
-                "temperatureMin": float(temp_min[i]),
-                "apparentTemperatureMax": float(apparent_max[i]),
-                "apparentTemperatureMin": float(apparent_min[i]),
-                "uvIndexMax": float(uv_index[i]),
-                "precipitationProbability": rain_prob,
-                "weatherCode": parse_weather_code(int(daily_weather_codes[i]))
-            })
-        
-        return daily_data
+        # Process daily forecast data for a single location
+        return self._process_daily_block([daily])[0]
+    
+    def _process_daily_block(self, dailies):
+        # Process daily forecast data for several locations at once, as
+        # (locations x days) arrays; returns one DailyForecast per location
+        if not self.variables["daily"]:
+            return [DailyForecast(np.empty(0, dtype=object), *[None] * 7) for _ in dailies]
+        lengths = {daily.Variables(0).ValuesLength() for daily in dailies}
+        if len(lengths) > 1:
+            return [self._process_daily_block([daily])[0] for daily in dailies]
+        length = lengths.pop()
+        
+        # Stack each requested variable into a 2-D block
+        blocks = {
+            variable: np.vstack([daily.Variables(index).ValuesAsNumpy() for daily in dailies])
+            for index, variable in enumerate(self.variables["daily"])
+        }
+        
+        starts = np.array([daily.Time() for daily in dailies], dtype=np.int64)
+        intervals = np.array([daily.Interval() or 86400 for daily in dailies], dtype=np.int64)
+        times = starts[:, None] + intervals[:, None] * np.arange(length)
+        # Locations in the same timezone share their dates, so format each day once
+        unique_times, inverse = np.unique(times, return_inverse=True)
+        iso_dates = np.datetime_as_string(unique_times.astype("datetime64[s]"), unit="D")
+        formatted = np.array([f"{d[8:10]}/{d[5:7]}/{d[:4]}" for d in iso_dates.tolist()], dtype=object)
+        dates = formatted[inverse].reshape(times.shape)
+        
+        rain_probability = blocks.get("precipitation_probability_mean")
+        if rain_probability is not None:
+            blocks["precipitation_probability_mean"] = np.where(
+                np.isnan(rain_probability), 0, rain_probability
+            ).astype(np.int64)
+        if "weather_code" in blocks:
+            blocks["weather_code"] = self.encode_weather_code(blocks["weather_code"])
+        
+        # Each location gets row views of the block arrays, not per-day dicts
+        columns = [dates] + [blocks.get(DAILY_VARIABLES[key]) for key, _ in DAILY_FIELDS[1:]]
+        return [
+            DailyForecast(*(None if column is None else column[row] for column in columns))
+            for row in range(len(dailies))
+        ]
     
     def _add_ai_insight(self, payload):
-        # Add AI-generated insight to payload
+        # Add AI-generated insight to payload, reusing cached insights for
+        # payloads with the same quantized conditions
         try:
-            from src.services.ai_service import AIService
-            ai_service = AIService()
-            insight = ai_service.generate_insight(payload)
+            view = payload.project(self.profiles["insight"])
+            key = insight_fingerprint(view, AI_INSIGHT_CACHE)
+            insight = self.insight_cache.get(key)
+            if insight is None:
+                insight = self._store_insight(key, self._get_ai_service().generate_insight(view))
+            else:
+                logger.debug("AI insight cache hit: %s", key)
             payload["aiInsight"] = insight
-            logger.info(f"AI insight added: {insight}")
+            logger.info("AI insight added: %s", insight, extra={"location": payload.get("location", {}).get("city")})
         except Exception as e:
             logger.error(f"Failed to add AI insight: {e}")
             payload["aiInsight"] = "No insight available"
         
         return payload
+    
+    def _add_ai_insights(self, payloads):
+        # Attach insights to a batch: cache hits inline, one concurrent request per
+        # distinct fingerprint for the misses. Payloads whose insight is not ready
+        # within inline_wait_seconds go out without it; see collect_late_insights.
+        # The insight sees the payloads through the insight profile
+        misses = {}
+        for payload in payloads:
+            key = insight_fingerprint(payload.project(self.profiles["insight"]), AI_INSIGHT_CACHE)
+            insight = self.insight_cache.get(key)
+            if insight is None:
+                misses.setdefault(key, []).append(payload)
+            else:
+                payload["aiInsight"] = insight
+        if not misses:
+            return
+        
+        try:
+            ai_service = self._get_ai_service()
+            futures = {key: ai_service.submit_insight(group[0].project(self.profiles["insight"])) for key, group in misses.items()}
+        except Exception as e:
+            logger.error(f"Failed to add AI insights: {e}")
+            for group in misses.values():
+                for payload in group:
+                    payload["aiInsight"] = "No insight available"
+            return
+        
+        done, _ = wait(futures.values(), timeout=AI_BATCH["inline_wait_seconds"])
+        late = 0
+        for key, future in futures.items():
+            if future in done:
+                insight = self._store_insight(key, future.result())
+                for payload in misses[key]:
+                    payload["aiInsight"] = insight
+            else:
+                late += len(misses[key])
+                with self._pending_lock:
+                    self._pending_insights.append((key, future, misses[key]))
+        if late:
+            logger.info(f"{late} AI insight(s) still pending; they will follow as separate messages")
+    
+    def _store_insight(self, key, insight):
+        # Cache a generated insight unless it is the failure fallback
+        from src.services.ai_service import FALLBACK_INSIGHT
+        if insight != FALLBACK_INSIGHT:
+            self.insight_cache.put(key, insight)
+        return insight
+    
+    def preload_ai_service(self):
+        # Import the OpenAI SDK and build the AI service in the background, so
+        # the first insight tick does not pay for it after its fetch
+        def preload():
+            try:
+                self._get_ai_service()
+            except Exception as e:
+                logger.warning(f"Could not preload AI service: {e}")
+        threading.Thread(target=preload, name="ai-service-preload", daemon=True).start()
+    
+    def _get_ai_service(self):
+        # Create the AI service (and its OpenAI client) once and reuse it
+        with self._ai_service_lock:
+            if self.ai_service is None:
+                from src.services.ai_service import AIService
+                self.ai_service = AIService()
+            return self.ai_service
 
 # Backward compatibility
 def data(include_ai_insight=False):
@@ -0,0 +1,248 @@
+"""In-process metrics: counters and histograms in Prometheus text format
+
+A small registry instead of a client library: recording a value is a lock,
+a dict lookup and a bisect, so instrumentation can stay on the hot path.
+``registry.render()`` produces the Prometheus text exposition served at
+``GET /metrics``. The metrics below are shared by the whole producer.
+"""
+import itertools
+import json
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from config.logging_config import log_context
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) for stage durations, from a cache hit to a slow AI call
+SECONDS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# Upper bounds (bytes) for serialized payload sizes
+BYTES_BUCKETS = (256, 512, 1024, 2048, 4096, 8192, 16384, 32768, 65536, 131072)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(value) if isinstance(value, float) else str(value)
+
+class Counter:
+    """Monotonic counter, one series per label values tuple"""
+
+    kind = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        """Add ``amount`` to the series of ``labels`` (values in labelnames order)"""
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        with self._lock:
+            return self._values.get(labels, 0)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name, _format_labels(self.labelnames, labels), value) for labels, value in sorted(items)]
+
+class Gauge(Counter):
+    """Value that can go up and down"""
+
+    kind = "gauge"
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+class Histogram:
+    """Cumulative-bucket histogram, one series per label values tuple"""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=SECONDS_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (last one is +Inf), sum, count]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        """Record one value in the series of ``labels``"""
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, *labels):
+        """Observe the duration of the ``with`` block"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def totals(self):
+        """Return {labels: (sum, count)} for every series"""
+        with self._lock:
+            return {labels: (series[1], series[2]) for labels, series in self._series.items()}
+
+    def samples(self):
+        with self._lock:
+            items = [(labels, list(series[0]), series[1], series[2]) for labels, series in self._series.items()]
+        samples = []
+        for labels, counts, total, count in sorted(items):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                samples.append((f"{self.name}_bucket", _format_labels(self.labelnames, labels, le), cumulative))
+            samples.append((f"{self.name}_sum", _format_labels(self.labelnames, labels), total))
+            samples.append((f"{self.name}_count", _format_labels(self.labelnames, labels), count))
+        return samples
+
+class Summary(Histogram):
+    """Sum and count only: cheap enough for one series per location"""
+
+    kind = "summary"
+
+    def __init__(self, name, help_text, labelnames=()):
+        super().__init__(name, help_text, labelnames, buckets=())
+
+    def samples(self):
+        return [sample for sample in super().samples() if not sample[0].endswith("_bucket")]
+
+class MetricsRegistry:
+    """Set of metrics rendered together, plus stats providers exported as gauges"""
+
+    def __init__(self):
+        self._metrics = []
+        self._providers = {}
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._register(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=SECONDS_BUCKETS):
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def summary(self, name, help_text, labelnames=()):
+        return self._register(Summary(name, help_text, labelnames))
+
+    def add_stats_provider(self, component, provider):
+        """Export the numeric values of ``provider()`` (a dict of counters, as
+        reported by /health) as ``weather_component_stat`` gauges"""
+        self._providers[component] = provider
+
+    def render(self):
+        """Return every metric in the Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        if self._providers:
+            lines.append("# HELP weather_component_stat Counters reported by producer components")
+            lines.append("# TYPE weather_component_stat gauge")
+            for component, provider in self._providers.items():
+                try:
+                    stats = provider()
+                except Exception as e:
+                    logger.warning(f"Metrics: stats provider {component} failed: {e}")
+                    continue
+                for key, value in stats.items():
+                    if isinstance(value, (int, float)) and not isinstance(value, bool):
+                        labels = _format_labels(("component", "name"), (component, key))
+                        lines.append(f"weather_component_stat{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+registry = MetricsRegistry()
+
+# Per-call stages: fetch, transform, ai_insight, publish, outbox_append, tick
+STAGE_SECONDS = registry.histogram(
+    "weather_stage_seconds", "Duration of pipeline stages per call", ("stage",)
+)
+# Per-location stages: transform, serialize, csv, excel, rolling. Per-location
+# series are summaries (sum/count) to keep the page small with many cities
+LOCATION_STAGE_SECONDS = registry.summary(
+    "weather_location_stage_seconds", "Duration of per-location stages", ("stage", "location")
+)
+PAYLOAD_BYTES = registry.histogram(
+    "weather_payload_bytes", "Serialized size of published messages", (), BYTES_BUCKETS
+)
+LOCATION_PAYLOAD_BYTES = registry.summary(
+    "weather_location_payload_bytes", "Serialized size of published messages per location", ("location",)
+)
+API_CACHE_REQUESTS = registry.counter(
+    "weather_api_cache_requests_total", "Open-Meteo cache lookups by tier and result", ("tier", "result")
+)
+PUBLISH_RETRIES = registry.counter(
+    "weather_publish_retries_total", "Broker connection retries and failed deliveries", ("reason",)
+)
+MESSAGES_PUBLISHED = registry.counter(
+    "weather_messages_published_total", "Messages confirmed by the broker"
+)
+TICKS = registry.counter("weather_ticks_total", "Scheduler ticks by result", ("result",))
+
+# Sequence number of each tick, attached to the records it logs
+_tick_ids = itertools.count(1)
+
+@contextmanager
+def tick(name, summary=False):
+    """Time one scheduler tick and optionally log a JSON summary line
+
+    The summary holds the tick duration and the time spent in each stage
+    during the tick (from the stage histogram sums). Records logged during
+    the tick carry its ``tick`` name and ``tick_id``.
+    """
+    before = STAGE_SECONDS.totals() if summary else None
+    started = time.perf_counter()
+    result = "ok"
+    try:
+        with log_context(tick=name, tick_id=next(_tick_ids)):
+            yield
+    except Exception:
+        result = "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, "tick")
+        TICKS.inc(result)
+        if summary:
+            stages = {}
+            for labels, (total, count) in STAGE_SECONDS.totals().items():
+                previous_total, previous_count = before.get(labels, (0.0, 0))
+                if count > previous_count and labels[0] != "tick":
+                    stages[labels[0]] = round(total - previous_total, 4)
+            fields = {"tick": name, "result": result, "seconds": round(elapsed, 4), "stages": stages}
+            logger.info("tick_summary %s", json.dumps(fields, separators=(",", ":")), extra={"tick_summary": fields})
@@ -1,27 +1,77 @@
+import re
+import sys
+import unicodedata
+
+import numpy as np
+
+# Sentinels for codes outside the WMO table (or missing values)
+UNKNOWN_WEATHER_CODE = -1
+UNKNOWN_WEATHER_DESCRIPTION = "Desconhecido"
+
+# WMO weather code groups and their descriptions
+WEATHER_CODE_GROUPS = {
+    "Céu limpo": (0,),
+    "Parcialmente nublado": (1, 2),
+    "Nublado": (3,),
+    "Neblina": (45, 48),
+    "Chuvisco": (51, 53, 55, 56, 57),
+    "Chuva": (61, 63, 65, 66, 67, 80, 81, 82),
+    "Neve": (71, 73, 75, 77, 85, 86),
+    "Tempestade": (95, 96, 99),
+}
+
+# Precomputed description for every WMO code (0-99); the extra last slot holds
+# the unknown sentinel. Every payload references these same interned strings.
+WEATHER_CODE_TABLE = np.full(101, sys.intern(UNKNOWN_WEATHER_DESCRIPTION), dtype=object)
+for _description, _codes in WEATHER_CODE_GROUPS.items():
+    WEATHER_CODE_TABLE[list(_codes)] = sys.intern(_description)
+_WEATHER_CODE_LIST = WEATHER_CODE_TABLE.tolist()
+_UNKNOWN_INDEX = len(_WEATHER_CODE_LIST) - 1
+
+def _weather_code_indexes(codes):
+    # Map an array of (float) codes to table indexes, invalid ones to the sentinel slot
+    codes = np.asarray(codes, dtype=np.float64)
+    valid = (codes >= 0) & (codes < _UNKNOWN_INDEX) & (codes == np.floor(codes))
+    return np.where(valid, codes, _UNKNOWN_INDEX).astype(np.int64)
 
 def parse_weather_code(code):
-    # Parse weather code to human-readable description
-    if code == 0:
-        return "Céu limpo"
-    elif code in [1, 2]:
-        return "Parcialmente nublado"
-    elif code == 3:
-        return "Nublado"
-    elif code in [45, 48]:
-        return "Neblina"
-    elif code in [51, 53, 55, 56, 57]:
-        return "Chuvisco"
-    elif code in [61, 63, 65, 66, 67, 80, 81, 82]:
-        return "Chuva"
-    elif code in [71, 73, 75, 77, 85, 86]:
-        return "Neve"
-    elif code in [95, 96, 99]:
-        return "Tempestade"
-    else:
-        return "Céu limpo"
+    # Parse weather code to human-readable description (O(1) table lookup).
+    # Accepts a scalar or a NumPy array of any shape; unknown codes map to UNKNOWN_WEATHER_DESCRIPTION
+    if isinstance(code, np.ndarray):
+        return WEATHER_CODE_TABLE[_weather_code_indexes(code)]
+    try:
+        index = int(code)
+    except (TypeError, ValueError):
+        return UNKNOWN_WEATHER_DESCRIPTION
+    if index != code or not 0 <= index < _UNKNOWN_INDEX:
+        return UNKNOWN_WEATHER_DESCRIPTION
+    return _WEATHER_CODE_LIST[index]
+
+def normalize_weather_code(code):
+    # Convert weather code(s) to compact integers for the payload, with
+    # UNKNOWN_WEATHER_CODE for missing/out-of-range values. Scalar or NumPy array
+    if isinstance(code, np.ndarray):
+        indexes = _weather_code_indexes(code)
+        return np.where(indexes == _UNKNOWN_INDEX, UNKNOWN_WEATHER_CODE, indexes)
+    try:
+        index = int(code)
+    except (TypeError, ValueError):
+        return UNKNOWN_WEATHER_CODE
+    return index if index == code and 0 <= index < _UNKNOWN_INDEX else UNKNOWN_WEATHER_CODE
+
+def describe_weather(value):
+    # Description for a payload weatherCode, whether it holds text or a compact integer
+    if isinstance(value, str):
+        return value
+    return parse_weather_code(value)
 
 def convert_numpy_to_python(value):
     # Convert numpy types to native Python types
     if hasattr(value, "item"):
         return value.item()
     return value
+
+def slugify(text):
+    # Convert a city name into a lowercase ASCII token safe for filenames
+    ascii_text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode()
+    return re.sub(r"[^A-Za-z0-9]+", "-", ascii_text).strip("-").lower()
@@ -0,0 +1,121 @@
+"""Shared test helpers"""
+import numpy as np
+import pytest
+
+from src.models.weather_data import CurrentConditions, DailyForecast, WeatherPayload
+
+
+def build_location(city="Itaguaí-Rj", latitude=-22.8765, longitude=-43.777, timezone="America/Sao_Paulo"):
+    """Return a location dict as configured in LOCATIONS"""
+    return {"city": city, "latitude": latitude, "longitude": longitude, "timezone": timezone}
+
+
+def build_payload(city="Itaguaí-Rj", temperature=25.0, weather_code="Nublado", precipitation=10, days=3):
+    """Return a WeatherPayload with ``days`` forecast days and no past days"""
+    location = build_location(city)
+    current = CurrentConditions(
+        "17/10/2026 09:00:00", temperature, 80.0, temperature + 1, True, 5.0, weather_code, precipitation
+    )
+    dates = np.array([f"{17 + day:02d}/10/2026" for day in range(days)], dtype=object)
+    daily = DailyForecast(
+        dates,
+        np.full(days, temperature + 5, dtype=np.float32),
+        np.full(days, temperature - 5, dtype=np.float32),
+        np.full(days, temperature + 6, dtype=np.float32),
+        np.full(days, temperature - 4, dtype=np.float32),
+        np.full(days, 8.0, dtype=np.float32),
+        np.full(days, precipitation, dtype=np.int64),
+        np.array([weather_code] * days, dtype=object),
+    )
+    return WeatherPayload(location, current, daily, 0)
+
+
+@pytest.fixture
+def make_location():
+    return build_location
+
+
+@pytest.fixture
+def make_payload():
+    return build_payload
+
+
+@pytest.fixture
+def weather_service(monkeypatch):
+    """WeatherService over fake Open-Meteo responses, without the on-disk history"""
+    from benchmarks.fakes import FakeWeatherAPIClient
+    from config.settings import DAILY_HISTORY
+    from src.services.weather_service import WeatherService
+
+    monkeypatch.setitem(DAILY_HISTORY, "enabled", False)
+    return WeatherService(api_client=FakeWeatherAPIClient())
+
+
+# Reference transforms as written before the vectorized path; the payloads
+# built from the same response must match them on the wire
+
+def legacy_current_precipitation(hourly, now, timezone):
+    """Return the current hour's precipitation probability by scanning the hours"""
+    import pandas as pd
+
+    hourly_length = hourly.Variables(0).ValuesLength()
+    hourly_start = pd.to_datetime(hourly.Time(), unit="s", utc=True).tz_convert(timezone)
+    hourly_times = [hourly_start + pd.Timedelta(hours=i) for i in range(hourly_length)]
+    hourly_precip_probs = hourly.Variables(0).ValuesAsNumpy()
+    current_hour = now.replace(minute=0, second=0, microsecond=0)
+    for i, hour_time in enumerate(hourly_times):
+        if hour_time.replace(tzinfo=None) == current_hour.replace(tzinfo=None):
+            return int(hourly_precip_probs[i]) if not np.isnan(hourly_precip_probs[i]) else 0
+    return 0
+
+
+def legacy_daily(daily):
+    """Return the daily rows as the per-day loop built them"""
+    import pandas as pd
+    from src.utils.parsers import parse_weather_code
+
+    length = daily.Variables(0).ValuesLength()
+    start = pd.to_datetime(daily.Time(), unit="s")
+    values = [daily.Variables(index).ValuesAsNumpy() for index in range(7)]
+    temp_max, temp_min, apparent_max, apparent_min, uv_index, rain_probability, codes = values
+    return [
+        {
+            "date": (start + pd.Timedelta(days=i)).strftime("%d/%m/%Y"),
+            "temperatureMax": float(temp_max[i]),
+            "temperatureMin": float(temp_min[i]),
+            "apparentTemperatureMax": float(apparent_max[i]),
+            "apparentTemperatureMin": float(apparent_min[i]),
+            "uvIndexMax": float(uv_index[i]),
+            "precipitationProbability": 0 if np.isnan(rain_probability[i]) else int(rain_probability[i]),
+            "weatherCode": parse_weather_code(int(codes[i])),
+        }
+        for i in range(length)
+    ]
+
+
+def legacy_payload(location, response, now, past_days):
+    """Return the payload dict as it was built before WeatherPayload"""
+    from src.utils.parsers import convert_numpy_to_python, parse_weather_code
+
+    current = response.Current()
+
+    def value(index):
+        return convert_numpy_to_python(current.Variables(index).Value())
+
+    return {
+        "location": location,
+        "current": {
+            "time": now.strftime("%d/%m/%Y %H:%M:%S"),
+            "temperature": float(value(0)),
+            "relativeHumidity": float(value(1)),
+            "apparentTemperature": float(value(2)),
+            "isDay": bool(value(3)),
+            "uv": float(value(4)),
+            "weatherCode": parse_weather_code(int(value(5))),
+            "precipitationProbability": legacy_current_precipitation(
+                response.Hourly(), now, location["timezone"]
+            ),
+        },
+        "daily": legacy_daily(response.Daily()),
+        "pastDays": past_days,
+    }
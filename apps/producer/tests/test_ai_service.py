@@ -0,0 +1,51 @@
+"""Tests for the AI insight prompt"""
+from types import SimpleNamespace
+
+from src.models.profiles import get_profile
+from src.services.ai_service import FALLBACK_INSIGHT, AIService
+
+
+class FakeCompletions:
+    def __init__(self, error=None):
+        self.error = error
+        self.prompts = []
+
+    def create(self, messages, **kwargs):
+        self.prompts.append(messages[-1]["content"])
+        if self.error:
+            raise self.error
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=" Leve guarda-chuva "))])
+
+
+def make_service(completions):
+    return AIService(client=SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+
+
+def test_prompt_covers_current_conditions_and_next_days(make_payload):
+    completions = FakeCompletions()
+    insight = make_service(completions).generate_insight(make_payload(precipitation=80))
+    assert insight == "Leve guarda-chuva"
+    prompt, = completions.prompts
+    assert "- Temperatura: 25.0°C" in prompt
+    assert "- Probabilidade de Chuva: 80%" in prompt
+    assert prompt.count('"date"') == 3
+
+
+def test_profile_without_prompt_fields_still_gets_an_insight(make_payload):
+    # The dashboard profile leaves out the current precipitation probability
+    completions = FakeCompletions()
+    view = make_payload().project(get_profile("dashboard"))
+    assert make_service(completions).generate_insight(view) == "Leve guarda-chuva"
+    assert "Probabilidade de Chuva" not in completions.prompts[0]
+
+
+def test_missing_fields_fall_back_instead_of_raising():
+    completions = FakeCompletions()
+    assert make_service(completions).generate_insight({"current": {}, "daily": [{"date": "17/10/2026"}]}) \
+        == "Leve guarda-chuva"
+    assert make_service(completions).generate_insight(None) == FALLBACK_INSIGHT
+
+
+def test_failed_completion_returns_the_fallback(make_payload):
+    assert make_service(FakeCompletions(RuntimeError("timeout"))).generate_insight(make_payload()) \
+        == FALLBACK_INSIGHT
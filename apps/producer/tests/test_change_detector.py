@@ -0,0 +1,90 @@
+"""Tests for change detection and delta publishing"""
+from src.messaging.change_detector import ChangeDetector
+
+
+class CountingPublisher:
+    """Confirms the first ``confirm`` messages of every batch (all by default)"""
+
+    def __init__(self, confirm=None):
+        self.confirm = confirm
+        self.batches = []
+
+    def publish_many(self, messages):
+        self.batches.append(list(messages))
+        return len(messages) if self.confirm is None else min(self.confirm, len(messages))
+
+
+def test_full_mode_publishes_everything(make_payload):
+    detector = ChangeDetector("full", 3600)
+    publisher = CountingPublisher()
+    for _ in range(2):
+        detector.publish(publisher, [make_payload()])
+    assert [len(batch) for batch in publisher.batches] == [1, 1]
+    assert detector.stats() == {"full": 2, "delta": 0, "suppressed": 0, "unconfirmed": 0}
+
+
+def test_suppress_skips_payload_differing_only_in_time(make_payload):
+    detector = ChangeDetector("suppress", 3600)
+    publisher = CountingPublisher()
+    detector.publish(publisher, [make_payload()])
+    again = make_payload().to_wire()
+    again["current"]["time"] = "17/10/2026 09:15:00"
+    assert detector.publish(publisher, [again]) == 0
+    assert len(publisher.batches) == 1
+    assert detector.stats()["suppressed"] == 1
+
+
+def test_suppress_publishes_changed_payload_in_full(make_payload):
+    detector = ChangeDetector("suppress", 3600)
+    publisher = CountingPublisher()
+    detector.publish(publisher, [make_payload()])
+    detector.publish(publisher, [make_payload(temperature=27.0)])
+    message = publisher.batches[-1][0]
+    assert "delta" not in message and len(message["daily"]) == 3
+
+
+def test_keyframe_interval_forces_a_full_message(make_payload):
+    detector = ChangeDetector("suppress", 0)
+    publisher = CountingPublisher()
+    detector.publish(publisher, [make_payload()])
+    detector.publish(publisher, [make_payload()])
+    assert detector.stats() == {"full": 2, "delta": 0, "suppressed": 0, "unconfirmed": 0}
+
+
+def test_delta_carries_changed_sections_and_days(make_payload):
+    detector = ChangeDetector("delta", 3600)
+    publisher = CountingPublisher()
+    detector.publish(publisher, [make_payload(days=3)])
+    changed = make_payload(days=3).to_wire()
+    del changed["daily"][2]
+    changed["daily"][1]["precipitationProbability"] = 90
+    detector.publish(publisher, [changed])
+
+    keyframe, delta = publisher.batches[0][0], publisher.batches[1][0]
+    assert keyframe["keyframe"] is True and keyframe["seq"] == 1
+    assert delta["delta"] is True
+    assert (delta["seq"], delta["baseSeq"]) == (2, 1)
+    assert [day["date"] for day in delta["dailyChanges"]] == ["18/10/2026"]
+    assert delta["dailyRemoved"] == ["19/10/2026"]
+    assert "daily" not in delta
+    assert detector.stats()["delta"] == 1
+
+
+def test_insight_is_always_published(make_payload):
+    detector = ChangeDetector("delta", 3600)
+    publisher = CountingPublisher()
+    detector.publish(publisher, [make_payload()])
+    detector.publish(publisher, [make_payload().with_insight("Dia nublado")])
+    delta = publisher.batches[-1][0]
+    assert delta["delta"] is True and delta["aiInsight"] == "Dia nublado"
+
+
+def test_unconfirmed_message_resyncs_with_a_keyframe(make_payload):
+    detector = ChangeDetector("delta", 3600)
+    detector.publish(CountingPublisher(confirm=0), [make_payload()])
+    assert detector.unconfirmed == 1
+
+    publisher = CountingPublisher()
+    detector.publish(publisher, [make_payload()])
+    message = publisher.batches[0][0]
+    assert message["keyframe"] is True and message["seq"] == 1
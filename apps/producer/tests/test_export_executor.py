@@ -0,0 +1,64 @@
+"""Tests for the export process pool"""
+import threading
+from concurrent.futures.process import BrokenProcessPool
+
+from config.settings import EXPORT_PATHS
+from src.services.export_executor import ExportExecutor, _pool_context
+from src.utils.metrics import LOCATION_STAGE_SECONDS
+
+
+def test_workers_are_not_forked_from_the_parent():
+    assert _pool_context().get_start_method() in ("forkserver", "spawn")
+
+
+def test_export_completes_while_a_parent_thread_holds_a_lock(make_payload, monkeypatch, tmp_path):
+    # A forked worker would inherit the held metrics lock and hang in _observe
+    for name in EXPORT_PATHS:
+        monkeypatch.setitem(EXPORT_PATHS, name, str(tmp_path / name))
+    executor = ExportExecutor("snapshot", workers=1, max_retries=0, dead_letter_path=str(tmp_path / "dead_letter"))
+    held, release = threading.Event(), threading.Event()
+
+    def hold_lock():
+        with LOCATION_STAGE_SECONDS._lock:
+            held.set()
+            release.wait(10)
+
+    holder = threading.Thread(target=hold_lock)
+    holder.start()
+    held.wait()
+    try:
+        executor.export(make_payload())
+        # Let the dispatcher start the worker while the lock is held
+        threading.Event().wait(0.5)
+    finally:
+        release.set()
+        holder.join()
+
+    assert executor.shutdown(timeout=60)
+    assert executor.stats()["completed"] == 1
+    assert len(list((tmp_path / "csv").iterdir())) == 1
+    assert len(list((tmp_path / "excel").iterdir())) == 1
+
+
+class BrokenPool:
+    """Pool whose workers are all dead"""
+
+    def submit(self, *args):
+        raise BrokenProcessPool("worker died")
+
+    def shutdown(self, **kwargs):
+        pass
+
+
+def test_broken_pool_dead_letters_instead_of_stopping_the_dispatcher(make_payload, monkeypatch, tmp_path):
+    dead_letter = tmp_path / "dead_letter"
+    executor = ExportExecutor("snapshot", workers=1, max_retries=1, retry_backoff_seconds=0,
+                              dead_letter_path=str(dead_letter))
+    monkeypatch.setattr(executor, "_get_pool", BrokenPool)
+    executor.export(make_payload("Itaguaí-Rj"))
+    executor.export(make_payload("Niterói-Rj"))
+
+    assert executor.shutdown(timeout=10)
+    stats = executor.stats()
+    assert (stats["retried"], stats["dead_lettered"], stats["in_flight"], stats["queued"]) == (2, 2, 0, 0)
+    assert len(list(dead_letter.iterdir())) == 2
@@ -0,0 +1,29 @@
+"""Tests for the single-pass Excel writer"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.services.export_service import ExportService
+
+openpyxl = pytest.importorskip("openpyxl")
+pytest.importorskip("xlsxwriter")
+
+
+def test_missing_values_are_blank_and_do_not_widen_columns(tmp_path):
+    df = pd.DataFrame({
+        "City": ["Itaguaí-Rj", "Itaguaí-Rj"],
+        "A": [None, "x"],
+        "BB": [np.nan, np.nan],
+    })
+    path = tmp_path / "export.xlsx"
+    ExportService()._write_excel(df, str(path))
+
+    ws = openpyxl.load_workbook(path).active
+    assert [cell.value for cell in ws[1]] == ["City", "A", "BB"]
+    assert [[cell.value for cell in row] for row in ws.iter_rows(min_row=2)] == [
+        ["Itaguaí-Rj", None, None],
+        ["Itaguaí-Rj", "x", None],
+    ]
+    assert ws[1][0].font.bold
+    # Header or longest value + 2; "nan"/"None" are not measured
+    assert [int(ws.column_dimensions[letter].width) for letter in "ABC"] == [12, 3, 4]
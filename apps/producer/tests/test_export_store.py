@@ -0,0 +1,67 @@
+"""Tests for the rolling export store and its day compaction"""
+import os
+from datetime import datetime
+
+from src.services.export_store import COMPACTED_MARKER, RollingExportStore
+
+COLUMNS = ["City", "Type", "Date/Time", "Temperature"]
+DAY_ONE = datetime(2026, 10, 17, 9)
+DAY_TWO = datetime(2026, 10, 18, 9)
+
+
+def rows(current_time, current, forecast):
+    return [
+        {"City": "Itaguaí-Rj", "Type": "Current", "Date/Time": current_time, "Temperature": current},
+        {"City": "Itaguaí-Rj", "Type": "Forecast", "Date/Time": "18/10/2026", "Temperature": forecast},
+    ]
+
+
+def read_lines(path):
+    with open(path, encoding="utf-8-sig") as f:
+        return f.read().splitlines()
+
+
+def test_only_new_or_changed_rows_are_appended(tmp_path):
+    store = RollingExportStore(str(tmp_path), COLUMNS)
+    assert store.append(rows("09:00", 25.0, 30.0), DAY_ONE) == 2
+    # Same reading at a later time and the same forecast: nothing new
+    assert store.append(rows("09:15", 25.0, 30.0), DAY_ONE.replace(minute=15)) == 0
+    assert store.append(rows("09:30", 26.0, 30.0), DAY_ONE.replace(minute=30)) == 1
+
+    # A restarted store rebuilds the last rows from disk
+    restarted = RollingExportStore(str(tmp_path), COLUMNS)
+    assert restarted.append(rows("09:45", 26.0, 30.0), DAY_ONE.replace(minute=45)) == 0
+    assert len(read_lines(tmp_path / "2026-10-17" / "itaguai-rj.csv")) == 4
+
+
+def test_past_day_is_compacted_once_when_the_next_day_starts(tmp_path):
+    store = RollingExportStore(str(tmp_path), COLUMNS)
+    store.append(rows("09:00", 25.0, 30.0), DAY_ONE)
+    store.append(rows("10:00", 26.0, 31.0), DAY_ONE.replace(hour=10))
+    store.append(rows("11:00", 27.0, 32.0), DAY_ONE.replace(hour=11))
+    day_one = tmp_path / "2026-10-17"
+    assert len(read_lines(day_one / "itaguai-rj.csv")) == 7
+
+    store.append(rows("09:00", 25.0, 30.0), DAY_TWO)
+    lines = read_lines(day_one / "itaguai-rj.csv")
+    # Every current reading is kept; the forecast keeps its last version only
+    assert len(lines) == 5
+    assert [line.split(",")[-1] for line in lines[1:]] == ["25.0", "26.0", "27.0", "32.0"]
+    assert (day_one / COMPACTED_MARKER).exists()
+    assert not [name for name in os.listdir(day_one) if name.endswith(".tmp")]
+
+    # The marker keeps a restarted store from compacting the day again
+    with open(day_one / "itaguai-rj.csv", "a", encoding="utf-8") as f:
+        f.write(lines[-1] + "\n")
+    RollingExportStore(str(tmp_path), COLUMNS).append(rows("10:00", 28.0, 30.0), DAY_TWO.replace(hour=10))
+    assert len(read_lines(day_one / "itaguai-rj.csv")) == 6
+
+
+def test_read_range_opens_only_the_days_in_range(tmp_path):
+    store = RollingExportStore(str(tmp_path), COLUMNS)
+    store.append(rows("09:00", 25.0, 30.0), DAY_ONE)
+    store.append(rows("09:00", 26.0, 31.0), DAY_TWO)
+
+    df = store.read_range(DAY_TWO.replace(hour=0), DAY_TWO.replace(hour=23), city="Itaguaí-Rj")
+    assert df["Temperature"].tolist() == ["26.0", "31.0"]
+    assert store.read_range(DAY_ONE, DAY_TWO, city="Mangaratiba").empty
@@ -0,0 +1,49 @@
+"""Tests for the read API"""
+import gzip
+import json
+
+import pytest
+
+from src.api.flask_server import create_app
+from src.api.snapshot import PayloadSnapshot
+
+
+@pytest.fixture
+def client(make_payload):
+    snapshot = PayloadSnapshot()
+    snapshot.update([make_payload("Itaguaí-Rj")])
+    return create_app(snapshot).test_client()
+
+
+def test_each_encoding_has_its_own_etag(client):
+    plain = client.get("/weather/itaguai-rj", headers={"Accept-Encoding": "identity"})
+    gzipped = client.get("/weather/itaguai-rj", headers={"Accept-Encoding": "gzip"})
+    assert gzipped.headers["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(gzipped.data)) == json.loads(plain.data)
+    assert gzipped.headers["ETag"] != plain.headers["ETag"]
+    assert gzipped.headers["Vary"] == "Accept-Encoding"
+
+
+@pytest.mark.parametrize("encoding", ["identity", "gzip"])
+def test_matching_etag_gets_not_modified(client, encoding):
+    first = client.get("/weather/itaguai-rj", headers={"Accept-Encoding": encoding})
+    again = client.get(
+        "/weather/itaguai-rj",
+        headers={"Accept-Encoding": encoding, "If-None-Match": first.headers["ETag"]},
+    )
+    assert again.status_code == 304
+    assert again.headers["ETag"] == first.headers["ETag"]
+
+
+def test_etag_of_the_other_encoding_gets_the_body(client):
+    gzipped = client.get("/weather/itaguai-rj", headers={"Accept-Encoding": "gzip"})
+    plain = client.get(
+        "/weather/itaguai-rj",
+        headers={"Accept-Encoding": "identity", "If-None-Match": gzipped.headers["ETag"]},
+    )
+    assert plain.status_code == 200
+    assert json.loads(plain.data)["location"]["city"] == "Itaguaí-Rj"
+
+
+def test_unknown_city_is_not_found(client):
+    assert client.get("/weather/seropedica-rj").status_code == 404
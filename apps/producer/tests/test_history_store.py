@@ -0,0 +1,132 @@
+"""Tests for the finalized past-days history store"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from src.services import history_store
+from src.services.history_store import DailyHistoryStore
+
+TODAY = 20000
+DAY = 86400
+LOCATION = {"city": "Itaguaí-Rj", "latitude": -22.8765, "longitude": -43.777, "timezone": "UTC"}
+
+
+class FakeVariable:
+    def __init__(self, values):
+        self.values = np.asarray(values, dtype=np.float32)
+
+    def ValuesAsNumpy(self):
+        return self.values
+
+    def ValuesLength(self):
+        return len(self.values)
+
+
+class FakeDaily:
+    """Daily block of an Open-Meteo response: two variables, derived from the day number"""
+
+    def __init__(self, first_day, days):
+        self.first_day = first_day
+        numbers = np.arange(first_day, first_day + days)
+        self.variables = [FakeVariable(numbers), FakeVariable(numbers % 7)]
+
+    def Time(self):
+        return self.first_day * DAY
+
+    def Interval(self):
+        return DAY
+
+    def Variables(self, index):
+        return self.variables[index]
+
+    def VariablesLength(self):
+        return len(self.variables)
+
+
+@pytest.fixture
+def today(monkeypatch):
+    day = [TODAY]
+    monkeypatch.setattr(history_store, "_today", lambda timezone: day[0])
+    return day
+
+
+def columns(daily):
+    return [daily.Variables(i).ValuesAsNumpy().tolist() for i in range(daily.VariablesLength())]
+
+
+def test_merge_prepends_stored_days_to_the_refresh_window(tmp_path, today):
+    store = DailyHistoryStore(str(tmp_path), past_days=5, refresh_days=2)
+    assert not store.has_history(LOCATION)
+
+    full = FakeDaily(TODAY - 5, 8)
+    store.update(LOCATION, full)
+    assert store.has_history(LOCATION)
+
+    merged = store.merge(LOCATION, FakeDaily(TODAY - 2, 5))
+    assert merged.Time() == full.Time()
+    assert merged.TimeEnd() == full.Time() + 8 * DAY
+    assert columns(merged) == columns(full)
+
+
+def test_merge_without_stored_days_returns_none(tmp_path, today):
+    store = DailyHistoryStore(str(tmp_path), past_days=5, refresh_days=2)
+    assert store.merge(LOCATION, FakeDaily(TODAY - 2, 5)) is None
+
+
+def test_only_finalized_days_are_stored(tmp_path, today):
+    store = DailyHistoryStore(str(tmp_path), past_days=5, refresh_days=2)
+    store.update(LOCATION, FakeDaily(TODAY - 5, 8))
+    # Days up to today - refresh_days; the forecast and yesterday are left out
+    first, values = store._get(LOCATION)
+    assert (first, len(values)) == (TODAY - 5, 4)
+
+
+def test_history_is_reloaded_from_disk(tmp_path, today):
+    DailyHistoryStore(str(tmp_path), past_days=5, refresh_days=2).update(LOCATION, FakeDaily(TODAY - 5, 8))
+    store = DailyHistoryStore(str(tmp_path), past_days=5, refresh_days=2)
+    assert store.has_history(LOCATION)
+    assert columns(store.merge(LOCATION, FakeDaily(TODAY - 2, 5))) == columns(FakeDaily(TODAY - 5, 8))
+
+
+def test_refresh_windows_extend_the_history_across_days(tmp_path, today):
+    store = DailyHistoryStore(str(tmp_path), past_days=5, refresh_days=2)
+    store.update(LOCATION, FakeDaily(TODAY - 5, 8))
+    store.update(LOCATION, FakeDaily(TODAY - 2, 5))
+
+    # Next day: the stored run still covers the window, and the oldest day is dropped
+    today[0] += 1
+    assert store.has_history(LOCATION)
+    merged = store.merge(LOCATION, FakeDaily(TODAY - 1, 5))
+    assert columns(merged) == columns(FakeDaily(TODAY - 4, 8))
+    store.update(LOCATION, FakeDaily(TODAY - 1, 5))
+    first, values = store._get(LOCATION)
+    assert (first, len(values)) == (TODAY - 4, 4)
+
+
+def test_gap_in_the_history_requires_a_full_window(tmp_path, today):
+    store = DailyHistoryStore(str(tmp_path), past_days=5, refresh_days=2)
+    store.update(LOCATION, FakeDaily(TODAY - 5, 8))
+
+    # Two days without a run: the refresh window no longer reaches the stored days
+    today[0] += 2
+    assert not store.has_history(LOCATION)
+    assert store.merge(LOCATION, FakeDaily(TODAY, 5)) is None
+
+
+def test_concurrent_lookups_load_a_location_once(tmp_path, today, monkeypatch):
+    store = DailyHistoryStore(str(tmp_path), past_days=5, refresh_days=2)
+    store.update(LOCATION, FakeDaily(TODAY - 5, 8))
+    reloaded = DailyHistoryStore(str(tmp_path), past_days=5, refresh_days=2)
+    load, loads = reloaded._load, []
+
+    def slow_load(key):
+        loads.append(key)
+        time.sleep(0.01)
+        return load(key)
+
+    monkeypatch.setattr(reloaded, "_load", slow_load)
+    with ThreadPoolExecutor(8) as pool:
+        assert all(pool.map(lambda _: reloaded.has_history(LOCATION), range(8)))
+    assert len(loads) == 1
@@ -0,0 +1,72 @@
+"""Tests for the AI insight cache and its fingerprint"""
+import json
+
+import pytest
+
+from config.settings import AI_INSIGHT_CACHE
+from src.services import insight_cache
+from src.services.insight_cache import InsightCache, insight_fingerprint
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(insight_cache, "time", clock)
+    return clock
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = InsightCache(ttl_seconds=60, max_entries=10)
+    cache.put("a", "Sol")
+    clock.now += 59
+    assert cache.get("a") == "Sol"
+    clock.now += 2
+    assert cache.get("a") is None
+    assert cache.stats() == {"entries": 0, "hits": 1, "misses": 1, "evictions": 0, "hitRate": 0.5}
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = InsightCache(ttl_seconds=60, max_entries=2)
+    cache.put("a", "Sol")
+    cache.put("b", "Chuva")
+    cache.get("a")
+    cache.put("c", "Neblina")
+    assert cache.get("b") is None
+    assert cache.get("a") == "Sol"
+    assert cache.get("c") == "Neblina"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_unexpired_entries_survive_a_restart(clock, tmp_path):
+    path = tmp_path / "insights.json"
+    cache = InsightCache(ttl_seconds=60, max_entries=10, path=str(path))
+    cache.put("old", "Sol")
+    clock.now += 30
+    cache.put("new", "Chuva")
+    clock.now += 40
+
+    restarted = InsightCache(ttl_seconds=60, max_entries=10, path=str(path))
+    assert restarted.get("old") is None
+    assert restarted.get("new") == "Chuva"
+    assert set(json.loads(path.read_text(encoding="utf-8"))) == {"old", "new"}
+
+
+def test_corrupt_file_starts_an_empty_cache(tmp_path):
+    path = tmp_path / "insights.json"
+    path.write_text("{not json", encoding="utf-8")
+    assert InsightCache(ttl_seconds=60, max_entries=10, path=str(path)).stats()["entries"] == 0
+
+
+def test_similar_conditions_share_a_fingerprint(make_payload):
+    key = insight_fingerprint(make_payload(temperature=24.0), AI_INSIGHT_CACHE)
+    assert insight_fingerprint(make_payload(city="Mangaratiba", temperature=24.6), AI_INSIGHT_CACHE) == key
+    assert insight_fingerprint(make_payload(temperature=24.0, weather_code="Chuva"), AI_INSIGHT_CACHE) != key
+    assert insight_fingerprint(make_payload(temperature=24.0, precipitation=90), AI_INSIGHT_CACHE) != key
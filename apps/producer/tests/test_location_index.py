@@ -0,0 +1,53 @@
+"""Tests for grid-cell grouping of locations"""
+from src.services.location_index import LocationIndex
+from tests.conftest import build_location
+
+
+ITAGUAI = build_location("Itaguaí-Rj", -22.8765, -43.777)
+SEROPEDICA = build_location("Seropédica-Rj", -22.8891, -43.7502)
+NITEROI = build_location("Niterói-Rj", -22.8832, -43.1034)
+
+
+def test_default_resolution_keeps_own_coordinates():
+    index = LocationIndex(0, [ITAGUAI, SEROPEDICA])
+    cells = index.group([ITAGUAI, SEROPEDICA])
+    assert [members for _, members in cells] == [[ITAGUAI], [SEROPEDICA]]
+    assert (cells[0][0]["latitude"], cells[0][0]["longitude"]) == (-22.8765, -43.777)
+
+
+def test_identical_coordinates_are_merged_without_a_grid():
+    twin = build_location("Itaguaí Centro", -22.8765, -43.777)
+    cells = LocationIndex(0, [ITAGUAI, twin]).group([ITAGUAI, twin])
+    assert [members for _, members in cells] == [[ITAGUAI, twin]]
+
+
+def test_shared_cell_is_fetched_once_at_its_centre():
+    index = LocationIndex(0.1, [ITAGUAI, SEROPEDICA, NITEROI])
+    cells = index.group([ITAGUAI, SEROPEDICA, NITEROI])
+    assert [members for _, members in cells] == [[ITAGUAI, SEROPEDICA], [NITEROI]]
+    assert (cells[0][0]["latitude"], cells[0][0]["longitude"]) == (-22.9, -43.8)
+
+
+def test_location_alone_in_its_cell_keeps_own_coordinates():
+    index = LocationIndex(0.1, [ITAGUAI, SEROPEDICA, NITEROI])
+    cell = index.cell_location(NITEROI)
+    assert (cell["latitude"], cell["longitude"]) == (-22.8832, -43.1034)
+
+
+def test_fetch_coordinates_do_not_depend_on_the_batch():
+    # Only one city of a shared cell is due: still fetched at the cell centre
+    index = LocationIndex(0.1, [ITAGUAI, SEROPEDICA])
+    (cell, members), = index.group([SEROPEDICA])
+    assert members == [SEROPEDICA]
+    assert (cell["latitude"], cell["longitude"]) == (-22.9, -43.8)
+
+
+def test_timezone_splits_a_cell():
+    elsewhere = build_location("Itaguaí UTC", -22.88, -43.78, "UTC")
+    cells = LocationIndex(0.1, [ITAGUAI, SEROPEDICA, elsewhere]).group([ITAGUAI, elsewhere, SEROPEDICA])
+    assert [members for _, members in cells] == [[ITAGUAI, SEROPEDICA], [elsewhere]]
+
+
+def test_plan_batches_keeps_cells_together():
+    index = LocationIndex(0.1, [ITAGUAI, SEROPEDICA, NITEROI])
+    assert index.plan_batches([ITAGUAI, NITEROI, SEROPEDICA], 1) == [[ITAGUAI, SEROPEDICA], [NITEROI]]
@@ -0,0 +1,64 @@
+"""Tests for the JSON formatter and the non-blocking queue handler"""
+import json
+import logging
+import queue
+import sys
+
+from config.logging_config import ContextFilter, DroppingQueueHandler, JsonFormatter, log_context
+
+
+def make_record(msg="Fetched %d locations", args=(3,), exc_info=None, **extra):
+    record = logging.LogRecord("src.test", logging.INFO, __file__, 1, msg, args, exc_info)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_formatter_writes_message_and_extra_fields():
+    entry = json.loads(JsonFormatter().format(make_record(location="Itaguaí-Rj", tick_id=7)))
+    assert entry["message"] == "Fetched 3 locations"
+    assert entry["level"] == "INFO" and entry["logger"] == "src.test"
+    assert entry["location"] == "Itaguaí-Rj" and entry["tick_id"] == 7
+    assert "args" not in entry and "exception" not in entry
+
+
+def test_json_formatter_includes_the_exception():
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = make_record(exc_info=sys.exc_info())
+    entry = json.loads(JsonFormatter().format(record))
+    assert "ValueError: boom" in entry["exception"]
+
+
+def test_context_fields_are_copied_onto_records():
+    record = make_record(location="kept")
+    with log_context(tick="data", location="Mangaratiba"):
+        ContextFilter().filter(record)
+    assert record.tick == "data"
+    assert record.location == "kept"
+
+
+def test_full_queue_drops_records_instead_of_blocking():
+    handler = DroppingQueueHandler(queue.Queue(2))
+    for _ in range(5):
+        handler.handle(make_record())
+    assert handler.queue.qsize() == 2
+    assert handler.dropped == 3
+
+
+def test_message_is_merged_when_enqueued():
+    handler = DroppingQueueHandler(queue.SimpleQueue())
+    stats = {"hits": 1}
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = make_record("Cache %s", (stats,), exc_info=sys.exc_info())
+    handler.handle(record)
+    stats["hits"] = 2
+
+    queued = handler.queue.get_nowait()
+    assert queued.getMessage() == "Cache {'hits': 1}"
+    assert queued.args is None
+    assert queued.exc_info is not None
+    # The caller's record is left untouched for other handlers
+    assert record.args is stats
@@ -0,0 +1,129 @@
+"""Tests for the success flags of the one-shot run and the adaptive tick"""
+import pytest
+
+import main
+from src.messaging.change_detector import ChangeDetector
+
+
+class FakeWeatherService:
+    def __init__(self, make_payload, missing=0, error=None, late_insights=()):
+        self.make_payload = make_payload
+        self.missing = missing
+        self.error = error
+        self.late_insights = late_insights
+
+    def get_weather_data_batch(self, locations, include_ai_insight=False, refresh=False):
+        if self.error:
+            raise self.error
+        return [self.make_payload(location["city"]) for location in locations[self.missing:]]
+
+    def collect_late_insights(self):
+        return [self.make_payload(city).with_insight("Leve guarda-chuva") for city in self.late_insights]
+
+
+class FakePublisher:
+    """Confirms every batch, or per batch as listed in ``confirm``"""
+
+    def __init__(self, confirm=True):
+        self.confirm = confirm
+
+    def publish_many(self, messages, queue=None):
+        confirm = self.confirm.pop(0) if isinstance(self.confirm, list) else self.confirm
+        return len(messages) if confirm else 0
+
+
+class FakeExporter:
+    def __init__(self):
+        self.exported = []
+
+    def export(self, payload):
+        self.exported.append(payload["location"]["city"])
+
+
+class FakeScheduler:
+    """Every location is due, with an insight and through the API cache"""
+
+    def __init__(self, locations):
+        self.locations = locations
+        self.completed = None
+
+    def pop_due(self):
+        return self.locations
+
+    def split_insight(self, locations):
+        return [], locations
+
+    def split_refresh(self, locations):
+        return locations, []
+
+    def complete(self, locations, payloads):
+        self.completed = [payload["location"]["city"] for payload in payloads]
+
+
+@pytest.fixture
+def services(monkeypatch, make_payload):
+    locations = [{"city": f"City {i}"} for i in range(3)]
+    monkeypatch.setattr(main, "monitored_locations", lambda: locations)
+    monkeypatch.setattr(main, "change_detector", ChangeDetector("full"))
+    monkeypatch.setattr(main, "exporter", FakeExporter())
+    monkeypatch.setattr(main.snapshot, "update", lambda payloads: None)
+
+    def install(publisher=None, **service):
+        monkeypatch.setattr(main, "weather_service", FakeWeatherService(make_payload, **service))
+        monkeypatch.setattr(main, "publisher", publisher or FakePublisher())
+    return install
+
+
+@pytest.mark.parametrize("include_ai_insight", [False, True])
+def test_run_once_succeeds_when_everything_is_published(services, include_ai_insight):
+    services()
+    assert main.run_once(include_ai_insight) is True
+
+
+@pytest.mark.parametrize("include_ai_insight", [False, True])
+def test_run_once_fails_when_the_fetch_fails(services, include_ai_insight):
+    services(error=ConnectionError("Open-Meteo unreachable"))
+    assert main.run_once(include_ai_insight) is False
+
+
+def test_run_once_fails_when_a_location_is_missing(services):
+    services(missing=1)
+    assert main.run_once() is False
+
+
+def test_run_once_fails_when_the_publish_is_not_confirmed(services):
+    services(publisher=FakePublisher(confirm=False))
+    assert main.run_once() is False
+
+
+def test_once_exits_with_status_1_on_failure(services, monkeypatch):
+    services(error=ConnectionError("Open-Meteo unreachable"))
+    monkeypatch.setattr(main, "init_services", lambda once=False: None)
+    monkeypatch.setattr(main, "setup_logging", lambda: None)
+    monkeypatch.setattr("sys.argv", ["main.py", "--once"])
+    with pytest.raises(SystemExit) as exit_info:
+        main.main()
+    assert exit_info.value.code == 1
+
+
+def test_adaptive_tick_completes_published_locations(services):
+    services(late_insights=["City 1"])
+    scheduler = FakeScheduler(main.monitored_locations())
+    main.refresh_due_locations(scheduler)
+    assert scheduler.completed == ["City 0", "City 1", "City 2"]
+    # Follow-ups are published, not exported again
+    assert main.exporter.exported == ["City 0", "City 1", "City 2"]
+
+
+def test_adaptive_tick_retries_unconfirmed_batches(services):
+    services(publisher=FakePublisher(confirm=False))
+    scheduler = FakeScheduler(main.monitored_locations())
+    main.refresh_due_locations(scheduler)
+    assert scheduler.completed == []
+
+
+def test_adaptive_tick_retries_unconfirmed_follow_ups(services):
+    services(publisher=FakePublisher(confirm=[True, False]), late_insights=["City 1"])
+    scheduler = FakeScheduler(main.monitored_locations())
+    main.refresh_due_locations(scheduler)
+    assert scheduler.completed == ["City 0", "City 2"]
@@ -0,0 +1,83 @@
+"""Tests for the metrics registry and its Prometheus text rendering"""
+import json
+import logging
+
+import pytest
+
+from src.utils import metrics
+from src.utils.metrics import MetricsRegistry
+
+
+def test_counters_and_gauges_render_one_line_per_series():
+    registry = MetricsRegistry()
+    published = registry.counter("published_total", "Messages published", ("queue",))
+    queued = registry.gauge("queued", "Messages queued")
+    published.inc("weather")
+    published.inc("weather", amount=2)
+    published.inc('we"ird\n')
+    queued.set(1.5)
+
+    assert registry.render().splitlines() == [
+        "# HELP published_total Messages published",
+        "# TYPE published_total counter",
+        'published_total{queue="we\\"ird\\n"} 1',
+        'published_total{queue="weather"} 3',
+        "# HELP queued Messages queued",
+        "# TYPE queued gauge",
+        "queued 1.5",
+    ]
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    seconds = registry.histogram("stage_seconds", "Stage duration", ("stage",), buckets=(0.1, 1))
+    for value in (0.05, 0.1, 0.5, 3):
+        seconds.observe(value, "fetch")
+
+    lines = registry.render().splitlines()
+    assert lines[2:] == [
+        'stage_seconds_bucket{stage="fetch",le="0.1"} 2',
+        'stage_seconds_bucket{stage="fetch",le="1"} 3',
+        'stage_seconds_bucket{stage="fetch",le="+Inf"} 4',
+        'stage_seconds_sum{stage="fetch"} 3.65',
+        'stage_seconds_count{stage="fetch"} 4',
+    ]
+    assert seconds.totals() == {("fetch",): (3.65, 4)}
+
+
+def test_summary_renders_sum_and_count_only():
+    registry = MetricsRegistry()
+    registry.summary("location_seconds", "Per location", ("location",)).observe(0.25, "Itaguaí-Rj")
+    assert registry.render().splitlines()[2:] == [
+        'location_seconds_sum{location="Itaguaí-Rj"} 0.25',
+        'location_seconds_count{location="Itaguaí-Rj"} 1',
+    ]
+
+
+def test_stats_providers_export_numeric_values_as_gauges():
+    registry = MetricsRegistry()
+    registry.add_stats_provider("cache", lambda: {"hits": 3, "hitRate": 0.75, "enabled": True, "path": "/tmp"})
+
+    def broken():
+        raise RuntimeError("down")
+
+    registry.add_stats_provider("broken", broken)
+    assert registry.render().splitlines()[2:] == [
+        'weather_component_stat{component="cache",name="hits"} 3',
+        'weather_component_stat{component="cache",name="hitRate"} 0.75',
+    ]
+
+
+def test_tick_logs_a_summary_of_its_stages(caplog):
+    with caplog.at_level(logging.INFO, logger=metrics.__name__):
+        with metrics.tick("data", summary=True):
+            metrics.STAGE_SECONDS.observe(0.5, "fetch")
+    fields = json.loads(caplog.records[-1].getMessage().split(" ", 1)[1])
+    assert fields["tick"] == "data" and fields["result"] == "ok"
+    assert fields["stages"] == {"fetch": 0.5}
+
+    ticks = metrics.TICKS.value("error")
+    with pytest.raises(ValueError):
+        with metrics.tick("data"):
+            raise ValueError("boom")
+    assert metrics.TICKS.value("error") == ticks + 1
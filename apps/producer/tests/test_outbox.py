@@ -0,0 +1,173 @@
+"""Tests for the durable outbox"""
+import json
+import os
+import time
+
+import pytest
+
+from src.messaging.outbox import ACK_FILE, SEGMENT_SUFFIX, Outbox, OutboxPublisher
+from src.messaging.publisher import EncodedMessage
+
+
+def encoded(*values):
+    return [EncodedMessage(json.dumps(value).encode("utf-8"), "application/json") for value in values]
+
+
+def bodies(records):
+    return [json.loads(record.message.body) for record in records]
+
+
+def segment_files(path):
+    return sorted(name for name in os.listdir(path) if name.endswith(SEGMENT_SUFFIX))
+
+
+class FlakyBroker:
+    """Publisher stand-in for OutboxPublisher that fails on a script
+
+    Each publish_many call takes the next outcome: "ok" confirms the batch,
+    "down" refuses the connection, "lost" stores the batch but loses the
+    confirm, and an integer confirms only that many messages (all stored).
+    Once the script runs out every call succeeds.
+    """
+
+    def __init__(self, script=()):
+        self.config = {"queue": "weather"}
+        self.script = list(script)
+        self.received = []
+        self.calls = 0
+
+    def encode(self, message):
+        return encoded(message)[0]
+
+    def connect(self, max_retries=None):
+        if self.script and self.script[0] == "down":
+            self.script.pop(0)
+            return None, None
+        return self, None
+
+    def publish_many(self, messages, queue=None):
+        self.calls += 1
+        outcome = self.script.pop(0) if self.script else "ok"
+        self.received.extend(json.loads(message.body) for message in messages)
+        if outcome == "lost":
+            return 0
+        if isinstance(outcome, int):
+            return outcome
+        return len(messages)
+
+    def close(self):
+        pass
+
+
+def wait_until_drained(publisher, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while publisher.outbox.pending() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return publisher.outbox.pending() == 0
+
+
+def test_restart_replays_undelivered_messages_in_order(tmp_path):
+    outbox = Outbox(str(tmp_path))
+    outbox.append("weather", encoded(1, 2, 3))
+    outbox.append("alerts", encoded(4))
+    outbox.append("weather", encoded(5))
+    outbox.ack(outbox.read_batch(2)[-1])
+    outbox.close()
+
+    reopened = Outbox(str(tmp_path))
+    assert reopened.pending() == 3
+    records = reopened.read_batch(10)
+    assert bodies(records) == [3, 4, 5]
+    assert [record.queue for record in records] == ["weather", "alerts", "weather"]
+    assert [record.seq for record in records] == [3, 4, 5]
+    # New messages continue the sequence after the recovered ones
+    assert reopened.append("weather", encoded(6)) == 6
+
+
+def test_ack_is_persisted_and_delivered_segments_are_deleted(tmp_path):
+    # A 1-byte segment limit starts a new segment after every append
+    outbox = Outbox(str(tmp_path), segment_max_bytes=1)
+    for value in range(1, 4):
+        outbox.append("weather", encoded(value))
+    assert len(segment_files(tmp_path)) == 3
+
+    records = outbox.read_batch(10)
+    outbox.ack(records[1])
+    assert (tmp_path / ACK_FILE).read_text() == "2"
+    assert len(segment_files(tmp_path)) == 1
+    assert bodies(outbox.read_batch(10)) == [3]
+
+    outbox.ack(records[2])
+    assert outbox.pending() == 0
+    assert outbox.read_batch(10) == []
+    assert outbox.stats()["bytes"] == 0
+    # Acking an older record again is a no-op
+    outbox.ack(records[0])
+    assert (tmp_path / ACK_FILE).read_text() == "3"
+
+
+@pytest.mark.parametrize("tail", [
+    b"\x00\x00\x00",  # header cut short
+    lambda record: record[:-2],  # payload cut short
+    lambda record: record[:-1] + b"?",  # payload corrupted (CRC mismatch)
+])
+def test_torn_tail_record_is_truncated_on_startup(tmp_path, tail):
+    outbox = Outbox(str(tmp_path))
+    outbox.append("weather", encoded(1, 2))
+    segment = tmp_path / segment_files(tmp_path)[-1]
+    intact = segment.read_bytes()
+    outbox.append("weather", encoded(3))
+    outbox.close()
+
+    # Tear the third record as a crash mid-write would
+    third = segment.read_bytes()[len(intact):]
+    segment.write_bytes(intact + (tail if isinstance(tail, bytes) else tail(third)))
+
+    recovered = Outbox(str(tmp_path))
+    assert segment.read_bytes() == intact
+    assert recovered.pending() == 2
+    assert recovered.append("weather", encoded(3)) == 3
+    assert bodies(recovered.read_batch(10)) == [1, 2, 3]
+
+
+def test_lost_confirms_are_redelivered_in_order(tmp_path):
+    broker = FlakyBroker(["down", "lost", 2, "down"])
+    publisher = OutboxPublisher(
+        broker, Outbox(str(tmp_path)), batch_size=4, retry_initial_seconds=0.01, retry_max_seconds=0.02
+    )
+    assert publisher.publish_many(list(range(1, 7))) == 6
+    assert wait_until_drained(publisher)
+    publisher.close(timeout=1)
+
+    # At least once: every message arrived, first deliveries in publish order
+    first_seen = list(dict.fromkeys(broker.received))
+    assert first_seen == [1, 2, 3, 4, 5, 6]
+    # The batch whose confirm was lost went out again; so did the unconfirmed tail
+    assert broker.received[:4] == [1, 2, 3, 4]
+    assert broker.received[4:10] == [1, 2, 3, 4, 3, 4]
+    assert publisher.stats()["delivered"] == 6
+
+
+def test_undelivered_messages_survive_a_restart(tmp_path):
+    broker = FlakyBroker(["down"] * 1000)
+    publisher = OutboxPublisher(broker, Outbox(str(tmp_path)), retry_initial_seconds=0.01, retry_max_seconds=0.01)
+    publisher.publish_many([1, 2, 3])
+    publisher.close(timeout=0.1)
+    assert broker.received == []
+
+    broker = FlakyBroker()
+    publisher = OutboxPublisher(broker, Outbox(str(tmp_path)), retry_initial_seconds=0.01)
+    assert wait_until_drained(publisher)
+    publisher.close(timeout=1)
+    assert broker.received == [1, 2, 3]
+
+
+def test_flush_waits_for_delivery(tmp_path):
+    broker = FlakyBroker(["down"] * 1000)
+    publisher = OutboxPublisher(broker, Outbox(str(tmp_path)), retry_initial_seconds=0.01, retry_max_seconds=0.01)
+    publisher.publish_many([1, 2])
+    assert publisher.flush(timeout=0.2) is False
+    broker.script = []
+    assert publisher.flush(timeout=5) is True
+    assert broker.received == [1, 2]
+    publisher.close(timeout=1)
@@ -0,0 +1,51 @@
+"""Tests for the weather code lookup table"""
+import numpy as np
+import pytest
+
+from src.utils.parsers import (
+    UNKNOWN_WEATHER_CODE, UNKNOWN_WEATHER_DESCRIPTION, WEATHER_CODE_GROUPS, describe_weather,
+    normalize_weather_code, parse_weather_code,
+)
+
+WMO_CODES = [code for codes in WEATHER_CODE_GROUPS.values() for code in codes]
+
+
+@pytest.mark.parametrize("description,codes", WEATHER_CODE_GROUPS.items())
+def test_every_code_maps_to_its_group(description, codes):
+    for code in codes:
+        assert parse_weather_code(code) == description
+        assert parse_weather_code(float(code)) == description
+
+
+def test_compact_code_round_trips_to_the_same_description():
+    for code in WMO_CODES:
+        compact = normalize_weather_code(float(code))
+        assert compact == code
+        assert describe_weather(compact) == parse_weather_code(code)
+
+
+def test_text_code_is_described_as_is():
+    assert describe_weather("Chuva") == "Chuva"
+
+
+def test_ungrouped_code_keeps_its_value_and_reads_as_unknown():
+    assert normalize_weather_code(4) == 4
+    assert describe_weather(4) == parse_weather_code(4) == UNKNOWN_WEATHER_DESCRIPTION
+
+
+@pytest.mark.parametrize("code", [-1, 100, 2.5, None, "x", float("nan")])
+def test_invalid_codes_map_to_the_sentinels(code):
+    assert parse_weather_code(code) == UNKNOWN_WEATHER_DESCRIPTION
+    assert normalize_weather_code(code) == UNKNOWN_WEATHER_CODE
+    assert describe_weather(UNKNOWN_WEATHER_CODE) == UNKNOWN_WEATHER_DESCRIPTION
+
+
+def test_array_lookup_matches_scalar_lookup():
+    codes = np.array([0, 3, 61, 99, 4, 100, -1, 2.5, np.nan], dtype=np.float32)
+    assert parse_weather_code(codes).tolist() == [parse_weather_code(float(code)) for code in codes]
+    assert parse_weather_code(codes.reshape(3, 3)).shape == (3, 3)
+    assert normalize_weather_code(codes).tolist() == [normalize_weather_code(float(code)) for code in codes]
+
+
+def test_descriptions_are_shared_strings():
+    assert parse_weather_code(61) is parse_weather_code(np.array([80.0]))[0]
@@ -0,0 +1,74 @@
+"""Tests for RabbitMQPublisher against the fake broker"""
+import pika
+import pytest
+
+from benchmarks.fakes import FakeBlockingChannel, FakeBlockingConnection, FakeBroker
+from config.settings import PUBLISHER
+from src.messaging.publisher import RabbitMQPublisher
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setitem(PUBLISHER, "backoff_initial_seconds", 0)
+    monkeypatch.setitem(PUBLISHER, "max_retries", 2)
+
+
+class LosingBroker(FakeBroker):
+    """Loses the connection on the ``fail_at``-th confirmed publish (1-based)"""
+
+    def __init__(self, fail_at):
+        super().__init__()
+        self.fail_at = fail_at
+        self.publishes = 0
+
+    def __call__(self, parameters):
+        return FakeBlockingConnection(self)
+
+    def should_fail(self):
+        self.publishes += 1
+        return self.publishes == self.fail_at
+
+
+def test_batch_is_confirmed_over_one_connection():
+    broker = FakeBroker()
+    publisher = RabbitMQPublisher(connection_factory=broker)
+    assert publisher.publish_many(['{"n": 1}', '{"n": 2}']) == 2
+    assert publisher.publish_many(['{"n": 3}']) == 1
+    assert broker.queues["weather"] == [b'{"n": 1}', b'{"n": 2}', b'{"n": 3}']
+    assert broker.connections_opened == 1
+    assert publisher.channel._confirming
+
+
+def test_lost_confirm_counts_the_confirmed_prefix_and_reconnects():
+    broker = LosingBroker(fail_at=3)
+    publisher = RabbitMQPublisher(connection_factory=broker)
+    assert publisher.publish_many(['{"n": 1}', '{"n": 2}', '{"n": 3}', '{"n": 4}']) == 2
+    assert not publisher.is_connected()
+
+    # The message whose confirm was lost reached the queue: at-least-once
+    assert len(broker.queues["weather"]) == 3
+    assert publisher.publish('{"n": 5}')
+    assert broker.connections_opened == 2
+
+
+def test_nack_stops_the_batch_but_keeps_the_connection(monkeypatch):
+    publish = FakeBlockingChannel.basic_publish
+
+    def nack_second(channel, exchange, routing_key, body, properties=None, mandatory=False):
+        if body == b'{"n": 2}':
+            raise pika.exceptions.NackError([body])
+        return publish(channel, exchange, routing_key, body, properties, mandatory)
+
+    monkeypatch.setattr(FakeBlockingChannel, "basic_publish", nack_second)
+    broker = FakeBroker()
+    publisher = RabbitMQPublisher(connection_factory=broker)
+    assert publisher.publish_many(['{"n": 1}', '{"n": 2}', '{"n": 3}']) == 1
+    assert publisher.is_connected()
+
+
+def test_broker_down_confirms_nothing():
+    broker = FakeBroker()
+    broker.down = True
+    publisher = RabbitMQPublisher(connection_factory=broker)
+    assert publisher.publish_many(['{"n": 1}']) == 0
+    assert broker.failures == 2
@@ -0,0 +1,63 @@
+"""Tests for the adaptive refresh scheduler"""
+from src.pipeline.refresh_scheduler import RefreshScheduler
+from src.services.location_index import LocationIndex
+from tests.conftest import build_location
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_scheduler(locations, clock=None):
+    return RefreshScheduler(locations, LocationIndex(0), jitter_seconds=0, clock=clock or FakeClock())
+
+
+def test_empty_scheduler_waits_a_full_interval():
+    scheduler = make_scheduler([])
+    assert scheduler.seconds_until_due() is None
+    assert scheduler.next_wakeup() == scheduler.fixed_interval_seconds
+
+
+def test_scheduler_emptied_by_rebalance_waits_a_full_interval():
+    scheduler = make_scheduler([build_location("Itaguaí-Rj")])
+    assert scheduler.next_wakeup() == 0.0
+    scheduler.set_locations([])
+    assert scheduler.pop_due() == []
+    assert scheduler.next_wakeup() == scheduler.fixed_interval_seconds
+
+
+def test_next_wakeup_is_capped_at_the_data_interval():
+    clock = FakeClock()
+    location = build_location("Itaguaí-Rj")
+    scheduler = make_scheduler([location], clock)
+    scheduler.complete(scheduler.pop_due(), [{"location": location, "current": {}}])
+    assert 0 < scheduler.next_wakeup() <= scheduler.fixed_interval_seconds
+
+
+def test_fast_refresh_before_the_model_update_bypasses_the_cache():
+    clock = FakeClock()
+    storm, calm = build_location("Itaguaí-Rj"), build_location("Seropédica-Rj", -22.74, -43.71)
+    scheduler = make_scheduler([storm, calm], clock)
+    scheduler.fast_interval_seconds = 300
+    scheduler.model_update_seconds = 3600
+    clock.now = 1_000_800.0  # 2400 s before the next model update
+    scheduler.complete(scheduler.pop_due(), [
+        {"location": storm, "current": {"weatherCode": "Tempestade"}},
+        {"location": calm, "current": {"weatherCode": "Nublado"}},
+    ])
+    clock.now += 300
+    due = scheduler.pop_due()
+    assert due == [storm]
+    assert scheduler.split_refresh(due) == ([], [storm])
+
+    # The storm clearing is itself a change, refreshed fast once more; calm
+    # after that, the next refresh follows the model update, through the cache
+    scheduler.complete(due, [{"location": storm, "current": {"weatherCode": "Nublado"}}])
+    assert scheduler.split_refresh([storm]) == ([], [storm])
+    clock.now += 300
+    scheduler.complete(scheduler.pop_due(), [{"location": storm, "current": {"weatherCode": "Nublado"}}])
+    assert scheduler.split_refresh([storm, calm]) == ([storm, calm], [])
@@ -0,0 +1,72 @@
+"""Tests for the in-memory Open-Meteo response cache"""
+from types import SimpleNamespace
+
+import pytest
+
+from src.api.response_cache import DEFAULT_ENTRY_BYTES, ResponseCache, cache_key, next_model_update
+
+
+def response(size):
+    # Decoded response exposing its FlatBuffers buffer like openmeteo_sdk
+    return SimpleNamespace(_tab=SimpleNamespace(Bytes=bytearray(size)))
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_are_bounded_by_response_bytes():
+    cache = ResponseCache(max_bytes=250, clock=FakeClock())
+    cache.put("a", [response(100)], expires_at=2000)
+    cache.put("b", [response(100)], expires_at=2000)
+    assert cache.get("a") is not None
+    cache.put("c", [response(100)], expires_at=2000)
+    # "b" was the least recently used
+    assert cache.get("b") is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "evictions": 1, "entries": 2, "bytes": 200}
+
+
+def test_response_larger_than_the_bound_is_not_cached():
+    cache = ResponseCache(max_bytes=250, clock=FakeClock())
+    cache.put("a", [response(100)], expires_at=2000)
+    cache.put("big", [response(300)], expires_at=2000)
+    assert cache.get("big") is None
+    assert cache.stats()["bytes"] == 100
+
+
+def test_responses_without_a_buffer_use_the_default_size():
+    cache = ResponseCache(max_bytes=10 * DEFAULT_ENTRY_BYTES, clock=FakeClock())
+    cache.put("a", [object(), object()], expires_at=2000)
+    assert cache.stats()["bytes"] == 2 * DEFAULT_ENTRY_BYTES
+
+
+def test_entries_expire_at_their_deadline():
+    clock = FakeClock()
+    cache = ResponseCache(max_bytes=1000, clock=clock)
+    cache.put("a", [response(100)], expires_at=1060)
+    cache.put("a", [response(50)], expires_at=1060)
+    assert cache.stats()["bytes"] == 50
+    clock.now = 1059
+    assert cache.get("a") is not None
+    clock.now = 1060
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] == 0
+
+
+@pytest.mark.parametrize("now, expected", [
+    (0, 600),
+    (3600 + 599, 3600 + 600),
+    (3600 + 600, 7200 + 600),
+    (7200 + 601, 10800 + 600),
+])
+def test_next_model_update_follows_the_offset_grid(now, expected):
+    assert next_model_update(now, 3600, 600) == expected
+
+
+def test_cache_key_ignores_param_order_and_list_form():
+    assert cache_key({"daily": ["a", "b"], "latitude": 1.5}) == cache_key({"latitude": "1.5", "daily": "a,b"})
+    assert cache_key({"daily": ["a", "b"]}) != cache_key({"daily": ["b", "a"]})
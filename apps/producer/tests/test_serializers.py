@@ -0,0 +1,40 @@
+"""Tests for the payload wire formats"""
+import sys
+
+import pytest
+
+from src.messaging.serializers import JSON, get_serializer, get_serializer_for_content_type
+
+
+@pytest.mark.parametrize("name", ["json", "msgpack", "cbor"])
+def test_payload_round_trips_to_its_wire_form(make_payload, name):
+    if name != "json":
+        pytest.importorskip({"msgpack": "msgpack", "cbor": "cbor2"}[name])
+    serializer = get_serializer(name)
+    assert serializer.name == name
+    payload = make_payload().with_insight("Dia nublado")
+    assert serializer.loads(serializer.dumps(payload)) == payload.to_wire()
+
+
+def test_json_is_minified_utf8(make_payload):
+    body = JSON.dumps(make_payload(city="São Paulo"))
+    assert isinstance(body, bytes)
+    assert "São Paulo".encode("utf-8") in body
+    assert b", " not in body and b": " not in body
+
+
+@pytest.mark.parametrize("name", [None, "", "json", "xml"])
+def test_json_and_unknown_formats_use_json(name):
+    assert get_serializer(name) is JSON
+
+
+def test_missing_binary_package_falls_back_to_json(monkeypatch):
+    monkeypatch.setitem(sys.modules, "cbor2", None)
+    assert get_serializer("cbor") is JSON
+
+
+def test_serializer_is_found_by_content_type():
+    pytest.importorskip("msgpack")
+    assert get_serializer_for_content_type("application/msgpack").name == "msgpack"
+    assert get_serializer_for_content_type("application/json") is JSON
+    assert get_serializer_for_content_type(None) is JSON
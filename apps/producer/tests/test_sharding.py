@@ -0,0 +1,77 @@
+"""Tests for consistent-hash location partitioning"""
+import json
+
+from src.pipeline.sharding import HashRing, ShardAssignment
+from src.services.location_index import LocationIndex
+from tests.conftest import build_location
+
+KEYS = [f"{-20 - i * 0.01:.2f},{-43 - i * 0.013:.3f},America/Sao_Paulo" for i in range(2000)]
+
+
+def make_locations(count, cities_per_cell=1):
+    # ``count`` locations 0.1 degrees apart, each with ``cities_per_cell`` close neighbours
+    return [
+        build_location(f"Cidade {i}-{j}", -22.0 - i * 0.1 - j * 0.01, -43.0 - i * 0.1)
+        for i in range(count)
+        for j in range(cities_per_cell)
+    ]
+
+
+def test_owner_is_stable_across_rings():
+    first, second = HashRing(4, 64), HashRing(4, 64)
+    assert [first.owner(key) for key in KEYS] == [second.owner(key) for key in KEYS]
+
+
+def test_every_shard_gets_a_fair_share():
+    ring = HashRing(4, 128)
+    shares = [0] * 4
+    for key in KEYS:
+        shares[ring.owner(key)] += 1
+    assert min(shares) > len(KEYS) / 4 * 0.6
+
+
+def test_adding_a_shard_only_moves_keys_to_it():
+    before, after = HashRing(4, 128), HashRing(5, 128)
+    moved = [key for key in KEYS if before.owner(key) != after.owner(key)]
+    assert all(after.owner(key) == 4 for key in moved)
+    assert len(moved) < len(KEYS) / 5 * 1.4
+
+
+def test_removing_a_shard_only_moves_its_keys():
+    before, after = HashRing(5, 128), HashRing(4, 128)
+    assert all(before.owner(key) == 4 for key in KEYS if before.owner(key) != after.owner(key))
+
+
+def test_shards_partition_the_locations():
+    locations = make_locations(50)
+    index = LocationIndex(0, locations)
+    owned = [ShardAssignment(locations, index, shard, 3).locations for shard in range(3)]
+    assert sorted(id(location) for shard in owned for location in shard) == sorted(map(id, locations))
+
+
+def test_cities_sharing_a_cell_stay_on_one_shard():
+    locations = make_locations(40, cities_per_cell=2)
+    index = LocationIndex(0.25, locations)
+    cells = {location["city"]: tuple(index.cell_location(location).values()) for location in locations}
+    assert len(set(cells.values())) < len(locations)
+    owners = {}
+    for shard in range(3):
+        for location in ShardAssignment(locations, index, shard, 3).locations:
+            owners.setdefault(cells[location["city"]], set()).add(shard)
+    assert all(len(shards) == 1 for shards in owners.values())
+
+
+def test_refresh_repartitions_when_the_config_changes(tmp_path):
+    config_path = tmp_path / "shards.json"
+    config_path.write_text(json.dumps({"shard_count": 2}))
+    locations = make_locations(60)
+    assignment = ShardAssignment(locations, LocationIndex(0, locations), 0, 1, str(config_path))
+    assert assignment.count == 2
+
+    before = {id(location) for location in assignment.locations}
+    config_path.write_text(json.dumps({"shard_count": 3}))
+    assert assignment.refresh(force=True)
+    after = {id(location) for location in assignment.locations}
+    assert after <= before
+    assert (assignment.count, assignment.rebalances) == (3, 1)
+    assert not assignment.refresh(force=True)
@@ -0,0 +1,55 @@
+"""Tests for the read API snapshot"""
+import gzip
+import json
+
+from src.api import snapshot as snapshot_module
+from src.api.snapshot import PayloadSnapshot
+
+
+def count_entries(monkeypatch):
+    built = []
+    make_entry = snapshot_module._make_entry
+
+    def counting(body, updated_at):
+        built.append(body)
+        return make_entry(body, updated_at)
+
+    monkeypatch.setattr(snapshot_module, "_make_entry", counting)
+    return built
+
+
+def test_entries_per_location(make_payload):
+    snapshot = PayloadSnapshot()
+    snapshot.update([make_payload("Itaguaí-Rj"), make_payload("Niterói-Rj", temperature=22.0)])
+    entry = snapshot.get("niteroi-rj")
+    assert json.loads(entry.body)["current"]["temperature"] == 22.0
+    assert gzip.decompress(entry.gzip_body) == entry.body
+    assert snapshot.get("Itaguaí-Rj").etag != entry.etag
+    assert snapshot.get("Seropédica-Rj") is None
+    assert snapshot.locations() == ["Itaguaí-Rj", "Niterói-Rj"]
+
+
+def test_all_locations_is_built_on_first_read(make_payload, monkeypatch):
+    built = count_entries(monkeypatch)
+    snapshot = PayloadSnapshot()
+    assert snapshot.get() is None
+    for temperature in (20.0, 21.0, 22.0):
+        snapshot.update([make_payload("Itaguaí-Rj", temperature=temperature), make_payload("Niterói-Rj")])
+    assert len(built) == 6
+
+    first = snapshot.get()
+    assert snapshot.get() is first
+    assert len(built) == 7
+    cities = [payload["location"]["city"] for payload in json.loads(first.body)]
+    assert cities == ["Itaguaí-Rj", "Niterói-Rj"]
+    assert json.loads(first.body)[0]["current"]["temperature"] == 22.0
+
+
+def test_all_locations_follows_updates(make_payload):
+    snapshot = PayloadSnapshot()
+    snapshot.update([make_payload("Itaguaí-Rj")])
+    before = snapshot.get()
+    snapshot.update([make_payload("Niterói-Rj")])
+    after = snapshot.get()
+    assert after.etag != before.etag
+    assert len(json.loads(after.body)) == 2
@@ -0,0 +1,17 @@
+"""Startup budget: importing main.py stays cheap and loads no heavy dependency"""
+import os
+import statistics
+
+from benchmarks.bench_startup import LAZY_MODULES, STARTUP_BUDGET_MS, import_profile
+
+PRODUCER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_main_imports_within_budget_and_without_lazy_dependencies():
+    # The first run also compiles .pyc files; it is not counted
+    import_profile("main", PRODUCER_DIR)
+    profiles = [import_profile("main", PRODUCER_DIR) for _ in range(3)]
+
+    assert not [name for name in LAZY_MODULES if name in profiles[-1]]
+    median_ms = statistics.median(profile["main"] / 1000 for profile in profiles)
+    assert median_ms <= STARTUP_BUDGET_MS
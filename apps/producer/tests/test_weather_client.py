@@ -0,0 +1,27 @@
+"""Tests for the Open-Meteo client cache stats"""
+import pytest
+
+pytest.importorskip("openmeteo_requests")
+pytest.importorskip("requests_cache")
+
+from src.api import weather_client
+from src.api.weather_client import WeatherAPIClient
+
+
+def test_cache_stats_cover_both_tiers(tmp_path):
+    stats = WeatherAPIClient(cache_path=str(tmp_path / "cache")).cache_stats()
+    assert stats["entries"] == 0
+    assert stats["disk_responses"] == 0
+    assert stats["disk_bytes"] > 0
+
+
+def test_unreadable_disk_tier_keeps_the_memory_stats(tmp_path, monkeypatch):
+    client = WeatherAPIClient(cache_path=str(tmp_path / "cache"))
+
+    def missing(path):
+        raise FileNotFoundError(path)
+
+    monkeypatch.setattr(weather_client.os.path, "getsize", missing)
+    stats = client.cache_stats()
+    assert stats["hits"] == 0
+    assert "disk_bytes" not in stats
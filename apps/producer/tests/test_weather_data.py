@@ -0,0 +1,29 @@
+"""Regression test: WeatherPayload goes on the wire exactly as the old dict payload"""
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from benchmarks.fakes import FakeWeatherAPIClient, make_locations
+from config.settings import PAST_DAYS
+from src.messaging.serializers import JSON
+from tests.conftest import build_location, legacy_payload
+
+
+def test_wire_form_matches_the_dict_payload(weather_service):
+    locations = [build_location()] + make_locations(4)
+    payloads = weather_service.get_weather_data_batch(locations)
+    cells = [weather_service.location_index.cell_location(location) for location in locations]
+    responses = FakeWeatherAPIClient().fetch_weather_batch(weather_service._build_api_params(cells))
+    assert len(payloads) == len(responses) == 5
+
+    for location, payload, response in zip(locations, payloads, responses):
+        # Build the legacy payload for the time the payload was built
+        now = datetime.strptime(payload["current"]["time"], "%d/%m/%Y %H:%M:%S")
+        now = now.replace(tzinfo=ZoneInfo(location["timezone"]))
+        expected = legacy_payload(location, response, now, PAST_DAYS)
+
+        assert payload.to_wire() == expected
+        # Same keys in the same order: consumers see the same document
+        assert JSON.dumps(payload) == JSON.dumps(expected)
+
+        payload["aiInsight"] = expected["aiInsight"] = "Sol"
+        assert JSON.dumps(payload) == JSON.dumps(expected)
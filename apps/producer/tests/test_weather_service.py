@@ -0,0 +1,93 @@
+"""Tests for the vectorized daily transform and the hourly precipitation index"""
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pytest
+
+from benchmarks.fakes import FakeVariable, FakeVariablesWithTime, FakeWeatherApiResponse, make_locations
+from src.utils.parsers import UNKNOWN_WEATHER_CODE, normalize_weather_code, parse_weather_code
+from tests.conftest import legacy_current_precipitation, legacy_daily
+
+TIMEZONE = ZoneInfo("America/Sao_Paulo")
+START = datetime(2026, 10, 17, 9, tzinfo=TIMEZONE)
+
+
+def daily_block(start, rain, codes):
+    # Daily block in the full profile's variable order
+    values = np.arange(len(rain), dtype=np.float32)
+    return FakeVariablesWithTime(int(start.timestamp()), 86400, [
+        FakeVariable(values=values + 30), FakeVariable(values=values + 20),
+        FakeVariable(values=values + 32), FakeVariable(values=values + 21),
+        FakeVariable(values=values + 5),
+        FakeVariable(values=np.array(rain, dtype=np.float32)),
+        FakeVariable(values=np.array(codes, dtype=np.float32)),
+    ])
+
+
+def hourly_block(start, values):
+    return FakeVariablesWithTime(int(start.timestamp()), 3600, [FakeVariable(values=np.array(values, dtype=np.float32))])
+
+
+def responses(weather_service, count, past_days=30):
+    return [
+        FakeWeatherApiResponse(
+            location, past_days, seed=seed, daily_variables=weather_service.variables["daily"]
+        )
+        for seed, location in enumerate(make_locations(count))
+    ]
+
+
+def test_daily_block_matches_the_per_day_loop(weather_service):
+    fetched = responses(weather_service, 5)
+    block = weather_service._process_daily_block([response.Daily() for response in fetched])
+    assert len(block) == 5
+    for response, daily in zip(fetched, block):
+        assert daily.to_wire() == legacy_daily(response.Daily())
+
+
+def test_daily_block_with_different_lengths_matches_the_per_day_loop(weather_service):
+    fetched = responses(weather_service, 2) + responses(weather_service, 1, past_days=5)
+    block = weather_service._process_daily_block([response.Daily() for response in fetched])
+    assert [len(daily) for daily in block] == [37, 37, 12]
+    for response, daily in zip(fetched, block):
+        assert daily.to_wire() == legacy_daily(response.Daily())
+
+
+def test_daily_block_formats_dates_and_fills_missing_rain(weather_service):
+    midnight = datetime(2026, 10, 17, tzinfo=TIMEZONE)
+    (daily,) = weather_service._process_daily_block([daily_block(midnight, [np.nan, 40.7], [61, 95])])
+    rows = daily.to_wire()
+    assert [row["date"] for row in rows] == ["17/10/2026", "18/10/2026"]
+    assert [row["precipitationProbability"] for row in rows] == [0, 40]
+    assert [row["weatherCode"] for row in rows] == [parse_weather_code(61), parse_weather_code(95)]
+
+
+def test_daily_block_encodes_wmo_codes(weather_service):
+    weather_service.encode_weather_code = normalize_weather_code
+    midnight = datetime(2026, 10, 17, tzinfo=TIMEZONE)
+    (daily,) = weather_service._process_daily_block([daily_block(midnight, [10, 20, 30], [61, 4, np.nan])])
+    codes = [row["weatherCode"] for row in daily.to_wire()]
+    assert codes == [61, 4, UNKNOWN_WEATHER_CODE]
+    assert all(type(code) is int for code in codes)
+
+
+@pytest.mark.parametrize("now, expected", [
+    (START + timedelta(minutes=59), 10),
+    (START + timedelta(hours=1, minutes=25), 20),
+    (START + timedelta(hours=2), 0),  # missing value
+    (START + timedelta(hours=3, minutes=5), 40),
+    (START - timedelta(minutes=1), 0),  # before the series
+    (START + timedelta(hours=4), 0),  # after the series
+])
+def test_current_precipitation_is_indexed_by_hour(weather_service, now, expected):
+    hourly = hourly_block(START, [10, 20, np.nan, 40])
+    assert weather_service._get_current_precipitation(hourly, now, "America/Sao_Paulo") == expected
+    assert legacy_current_precipitation(hourly, now, "America/Sao_Paulo") == expected
+
+
+def test_current_precipitation_off_the_hour_grid_is_zero(weather_service):
+    hourly = hourly_block(START + timedelta(minutes=30), [10, 20, 30])
+    now = START + timedelta(hours=1, minutes=40)
+    assert weather_service._get_current_precipitation(hourly, now, "America/Sao_Paulo") == 0
+    assert legacy_current_precipitation(hourly, now, "America/Sao_Paulo") == 0